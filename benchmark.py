@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""Benchmark the aggregation and rendering pipeline on seeded synthetic data.
+
+Times and memory-profiles every compute_*/generate_* function in sync.py
+plus an end-to-end fetch_intervals_data against a local stub API, and
+writes the results as JSON so runs can be compared between versions:
+
+    python benchmark.py --sizes 100,10000 --output bench.json
+    python benchmark.py --sizes 100,10000 --compare bench.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+import sync
+
+DEFAULT_SIZES = (100, 10_000, 100_000)
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 42
+DEFAULT_OUTPUT = "benchmark-results.json"
+ZONES = ("Z1", "Z2", "Z3", "Z4", "Z5", "Z6", "Z7", "SS")
+SPORTS = (
+    ("Ride", 0.35),
+    ("VirtualRide", 0.15),
+    ("Run", 0.25),
+    ("TrailRun", 0.05),
+    ("Swim", 0.1),
+    ("WeightTraining", 0.1),
+)
+
+
+def synthetic_activities(
+    count: int, seed: int = DEFAULT_SEED, days: int = 365, now: datetime = None
+) -> list[dict[str, Any]]:
+    """``count`` Intervals.icu-shaped activity summaries spread over ``days``."""
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    names, weights = zip(*SPORTS)
+    activities = []
+    for i in range(count):
+        sport = rng.choices(names, weights)[0]
+        start = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        moving = rng.randint(1200, 18000)
+        watts = rng.uniform(120, 320) if "Ride" in sport else None
+        zone_secs = [rng.randint(0, moving // 4) for _ in ZONES]
+        activities.append(
+            {
+                "id": f"i{seed}{i:07d}",
+                "start_date_local": start.strftime("%Y-%m-%dT%H:%M:%S"),
+                "startDate": (start - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "type": sport,
+                "name": f"{sport} #{i}, seeded",
+                "moving_time": moving,
+                "elapsed_time": moving + rng.randint(0, 900),
+                "distance": moving * rng.uniform(2.5, 9.0) if sport != "WeightTraining" else 0,
+                "total_elevation_gain": rng.uniform(0, 2000),
+                "icu_training_load": round(moving / 3600 * rng.uniform(30, 90), 1),
+                "icu_intensity": rng.uniform(50, 105),
+                "icu_joules": watts * moving if watts else None,
+                "calories": moving / 3600 * rng.uniform(400, 900),
+                "average_heartrate": rng.uniform(110, 165),
+                "max_heartrate": rng.uniform(165, 195),
+                "icu_average_watts": watts,
+                "icu_zone_times": [
+                    {"id": zone, "secs": secs} for zone, secs in zip(ZONES, zone_secs)
+                ],
+            }
+        )
+    return activities
+
+
+def synthetic_wellness(
+    days: int, seed: int = DEFAULT_SEED, now: datetime = None
+) -> list[dict[str, Any]]:
+    """One wellness row per day for the last ``days`` days."""
+    rng = random.Random(seed + 1)
+    now = now or datetime.now()
+    rows, ctl, atl = [], 50.0, 50.0
+    for offset in range(days - 1, -1, -1):
+        ctl += rng.uniform(-1, 1.2)
+        atl += rng.uniform(-6, 6)
+        rows.append(
+            {
+                "id": (now - timedelta(days=offset)).strftime("%Y-%m-%d"),
+                "ctl": round(ctl, 1),
+                "atl": round(max(atl, 0), 1),
+                "rampRate": round(rng.uniform(-3, 6), 2),
+                "sleepSecs": rng.randint(18000, 34000),
+                "restingHR": rng.randint(40, 60),
+                "hrv": rng.randint(40, 110),
+                "weight": round(70 + rng.uniform(-2, 2), 1),
+                "readiness": rng.randint(30, 100),
+                "soreness": rng.randint(1, 4),
+                "fatigue": rng.randint(1, 4),
+                "steps": rng.randint(2000, 20000),
+            }
+        )
+    return rows
+
+
+def synthetic_curve(activity: dict[str, Any], seed: int = DEFAULT_SEED) -> dict[str, Any]:
+    """A plausible mean-maximal curve for ``activity`` in the cached-curve format."""
+    rng = random.Random(f"{seed}:{activity['id']}")
+    moving = activity.get("moving_time") or 0
+    watts = activity.get("icu_average_watts")
+    speed = (activity.get("distance") or 0) / moving if moving else 0
+    curve: dict[str, Any] = {"watts": [], "velocity_smooth": []}
+    for d in sync.MMP_DURATIONS:
+        if d > moving:
+            curve["watts"].append(None)
+            curve["velocity_smooth"].append(None)
+            continue
+        boost = 1 + 2.5 / (1 + d / 30) + rng.uniform(0, 0.05)
+        curve["watts"].append(round(watts * boost, 1) if watts else 0.0)
+        curve["velocity_smooth"].append(round(speed * (1 + 0.4 / (1 + d / 60)), 3))
+    return curve
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves the synthetic payloads for the athlete endpoints."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit("/", 1)[-1]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        payloads = self.server.payloads
+        if endpoint == "activities":
+            body = [
+                a
+                for a in payloads["activities"]
+                if query["oldest"] <= a["start_date_local"][:10] <= query["newest"]
+            ]
+        elif endpoint == "wellness":
+            body = [
+                w
+                for w in payloads["wellness"]
+                if query["oldest"] <= w["id"] <= query["newest"]
+            ]
+        elif endpoint == "profile":
+            body = {"id": "bench", "name": "Benchmark"}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        encoded = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+
+def _end_to_end(activities, wellness, days: int, workdir: Path) -> Callable[[], Any]:
+    """fetch_intervals_data against a stub server, from a cold store and cache each call."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.payloads = {"activities": activities, "wellness": wellness}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    runs = iter(range(1_000_000))
+
+    def run():
+        run_dir = workdir / f"run{next(runs)}"
+        sync.CACHE_DIR = run_dir / "cache"
+        sync.RESPONSE_CACHE.clear_memory()
+        config = {
+            "athlete_id": "bench",
+            "api_key": "bench",
+            "verify_ssl": True,
+            "days": days,
+            "api_url": f"http://127.0.0.1:{server.server_address[1]}/api/v1",
+            "store_path": run_dir / "store.sqlite3",
+        }
+        try:
+            return sync.fetch_intervals_data(config)
+        finally:
+            sync.close_clients()
+            sync.close_stores()
+
+    run.server = server
+    return run
+
+
+def run_suite(
+    sizes=DEFAULT_SIZES,
+    repeat: int = DEFAULT_REPEAT,
+    seed: int = DEFAULT_SEED,
+    only: str = "",
+    end_to_end: bool = True,
+) -> dict[str, Any]:
+    """Run every case at every size and return the JSON-ready results."""
+    results = []
+    original_cache_dir = sync.CACHE_DIR
+    now = datetime.now()
+    with tempfile.TemporaryDirectory(prefix="intervals-bench-") as tmp:
+        for rows in sizes:
+            days = 365
+            activities = synthetic_activities(rows, seed, days, now)
+            wellness = synthetic_wellness(days, seed, now)
+            store = sync.LocalStore(Path(tmp) / f"report{rows}.sqlite3")
+            store.upsert_activities("bench", activities)
+            store.upsert_wellness("bench", wellness)
+            for a in activities:
+                store.set_curve("bench", a["id"], "synthetic", synthetic_curve(a, seed))
+            report = sync.build_report_data(
+                store, "bench", now - timedelta(days=days), now
+            )
+            start, end = report["date_range"]["start"], report["date_range"]["end"]
+            snapshot = sync.report_snapshot(report)
+            # A previous sync that lacked every 10th activity and saw every 7th differently.
+            previous = {
+                **snapshot,
+                "activities": {
+                    key: [day, "stale" if i % 7 == 0 else digest]
+                    for i, (key, (day, digest)) in enumerate(snapshot["activities"].items())
+                    if i % 10
+                },
+            }
+
+            cases: dict[str, Callable[[], Any]] = {
+                "compute_sport_totals": lambda: sync.compute_sport_totals(activities),
+                "compute_zone_distribution": lambda: sync.compute_zone_distribution(activities),
+                "compute_week_comparison": lambda: sync.compute_week_comparison(activities),
+                "compute_weekly_tss_distribution": lambda: sync.compute_weekly_tss_distribution(
+                    activities
+                ),
+                "compute_daily_load": lambda: sync.compute_daily_load(activities),
+                "compute_weekly_summary": lambda: sync.compute_weekly_summary(wellness),
+                "compute_pmc": lambda: sync.compute_pmc(report["daily_load"], start, end),
+                "compute_power_curve": lambda: sync.compute_power_curve(store, "bench", end),
+                "compute_delta": lambda: sync.compute_delta(previous, snapshot, report),
+                "calculate_stats": lambda: sync.calculate_stats(activities, days),
+                "aggregate_activities": lambda: sync.aggregate_activities(activities, days),
+                "generate_csv": lambda: sync.generate_csv(report),
+                "generate_markdown_report": lambda: sync.generate_markdown_report(report),
+                "generate_html_report": lambda: sync.generate_html_report(report),
+                "generate_html_shell": sync.generate_html_shell,
+                "write_json_stream": lambda: sync.write_json_stream(
+                    report, Path(tmp) / "latest.json"
+                ),
+            }
+            if sync.np is not None:
+                cases["aggregate_activities_columnar"] = (
+                    lambda: sync.aggregate_activities_columnar(activities, days)
+                )
+                # One hour of 1 Hz power per 100 activities.
+                samples = sync.np.random.default_rng(seed).normal(
+                    220, 60, 36 * rows
+                ).astype(sync.np.float32)
+                cases["mean_max_curve"] = lambda: sync.mean_max_curve(samples)
+            if end_to_end:
+                cases["fetch_intervals_data"] = _end_to_end(
+                    activities, wellness, days, Path(tmp) / f"e2e{rows}"
+                )
+
+            for name, func in cases.items():
+                if only and only not in name:
+                    continue
+                print(f"  {name} @ {rows} rows", file=sys.stderr)
+                results.append({"name": name, "rows": rows, "repeat": repeat, **_measure(func, repeat)})
+            store.close()
+            if end_to_end:
+                cases["fetch_intervals_data"].server.shutdown()
+    sync.CACHE_DIR = original_cache_dir
+
+    return {"meta": _meta(seed), "results": results}
+
+
+def _meta(seed: int) -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": getattr(sync.np, "__version__", None),
+        "orjson": getattr(sync.orjson, "__version__", None),
+        "seed": seed,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """One line per case present in both runs: median time ratio and peak memory ratio."""
+    before = {(r["name"], r["rows"]): r for r in baseline["results"]}
+    lines = []
+    for r in current["results"]:
+        old = before.get((r["name"], r["rows"]))
+        if not old:
+            continue
+        time_ratio = r["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        mem_ratio = r["peak_kib"] / old["peak_kib"] if old["peak_kib"] else float("inf")
+        flag = "  REGRESSION" if time_ratio > 1.2 else ""
+        lines.append(
+            f"{r['name']:<34} {r['rows']:>7}  time x{time_ratio:5.2f}  mem x{mem_ratio:5.2f}{flag}"
+        )
+    return lines
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda raw: tuple(int(s) for s in raw.split(",")),
+        default=DEFAULT_SIZES,
+        help="Comma-separated activity counts (default: 100,10000,100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", default="", help="Run only cases whose name contains this")
+    parser.add_argument(
+        "--no-end-to-end", action="store_true", help="Skip the fetch_intervals_data case"
+    )
+    parser.add_argument("--output", type=Path, default=Path(DEFAULT_OUTPUT))
+    parser.add_argument("--compare", type=Path, help="Earlier results JSON to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    results = run_suite(
+        args.sizes, args.repeat, args.seed, args.only, not args.no_end_to_end
+    )
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+    if args.compare:
+        for line in compare(json.loads(args.compare.read_text()), results):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
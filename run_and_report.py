@@ -8,7 +8,15 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
     
-    result = subprocess.run([sys.executable, "sync.py"], capture_output=True, text=True)
+    result = None
+    if os.path.exists(os.environ.get("DAEMON_SOCKET", os.path.join(".cache", "daemon.sock"))):
+        # A resident `sync.py daemon` may be running: ask it for a sync instead of a cold start
+        result = subprocess.run(
+            [sys.executable, "sync.py", "daemon", "--send", "sync"], capture_output=True, text=True
+        )
+    if result is None or result.returncode != 0:
+        # No daemon, a stale socket left by a crashed one, or a failed daemon sync
+        result = subprocess.run([sys.executable, "sync.py"], capture_output=True, text=True)
     print(result.stdout)
     if result.stderr:
         print(result.stderr, file=sys.stderr)
@@ -2,16 +2,39 @@
 """Sync training data from Intervals.icu for AI coaching."""
 
 import os
+import sys
 import html
+import asyncio
 import json
 import re
+import math
 import logging
+import signal
+import socket
+import socketserver
+import sqlite3
 import time
+import random
+import argparse
+import contextlib
+import cProfile
 import functools
+import pstats
+import gzip
+import hashlib
+import io
+import zipfile
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, fields, replace
 from pathlib import Path
-from typing import Any, Optional
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
 
 try:
     from dotenv import load_dotenv
@@ -20,72 +43,676 @@ try:
 except ImportError:
     pass
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
 import requests
+from requests.adapters import HTTPAdapter
 
 DEFAULT_DAYS = 28
 DEFAULT_TIMEOUT = 30
+API_BASE_URL = "https://intervals.icu/api/v1"
+MAX_WORKERS = 3
+ASYNC_MAX_IN_FLIGHT = 64
+ASYNC_RATE_LIMIT = 10.0  # requests per second, shared by the whole async engine
 OUTPUT_FILENAME = "latest.json"
 CACHE_DIR = Path(__file__).parent / ".cache"
 CACHE_TTL = 300  # 5 minutes
+CACHE_MEMORY_ENTRIES = 128
+CACHE_DISK_ENTRIES = 512
+CACHE_STALE_WHILE_REVALIDATE = 0  # seconds past the TTL a stale entry may still be served
+WELLNESS_OVERLAP_DAYS = 3  # re-fetch recent days to pick up late edits
+ACTIVITY_OVERLAP_DAYS = 7
+ACTIVITY_WINDOW_MIN_DAYS = 62  # longer activity ranges are fetched per calendar month
+ACTIVITY_WINDOW_WORKERS = 4
+STORE_FILENAME = "store.sqlite3"
+STREAM_TYPES = ("watts", "heartrate", "cadence", "velocity_smooth")
+STREAM_WORKERS = 4
+MMP_DURATIONS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 5400, 7200)  # seconds
+MMP_WINDOWS = (28, 90, 365)  # days for the rolling best curves
+MMP_CHANNELS = ("watts", "velocity_smooth")
+FTP_FROM_20MIN = 0.95
+DEFAULT_BATCH_CONCURRENCY = 4
+BATCH_STATUS_FILENAME = "batch_status.json"
+STAMP_SUFFIX = ".stamp.json"  # latest.json -> latest.stamp.json
+DELTA_SUFFIX = ".delta.json"  # latest.json -> latest.delta.json
+SNAPSHOT_SUFFIX = ".snapshot.json"  # latest.json -> latest.snapshot.json
+REPORT_FORMATS = ("json", "markdown", "csv", "html")
+PMC_CTL_DAYS = 42  # fitness time constant
+PMC_ATL_DAYS = 7  # fatigue time constant
+WELLNESS_STALE_DAYS = 3  # older wellness CTL/ATL falls back to the PMC
+CHART_MAX_POINTS = 500  # per HTML chart; the JSON output keeps every point
+COLUMNAR_MIN_ROWS = 5000  # "auto" analytics backend switches to NumPy from here
+ANALYTICS_BACKENDS = ("auto", "python", "numpy")
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+MAX_RETRY_DELAY = 60.0
+API_RATE_LIMIT = 10.0  # requests per second across all threads
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60.0
+METRICS_FILENAME = "sync_metrics.json"
+DAEMON_INTERVAL = 900.0  # seconds between polls in daemon mode
+DAEMON_JITTER = 0.1  # each wait is the interval +/- this fraction
+DAEMON_SOCKET_FILENAME = "daemon.sock"
+DAEMON_SYNC_TIMEOUT = 300.0  # how long a "sync" socket command waits for the cycle
+DAEMON_SIGNAL_POLL = 0.5  # seconds between checks for signals while idle
+REPORT_SERVER_PORT = 8765
+GZIP_MIN_BYTES = 1024  # smaller responses are sent uncompressed
 
 logger = logging.getLogger(__name__)
 
 
-def with_retry(max_retries: int = 3, initial_delay: float = 1.0, backoff: float = 2.0):
-    """Retry decorator with exponential backoff for network operations."""
+class CircuitOpenError(requests.RequestException):
+    """Raised without contacting the API while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how fast requests start across workers."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate * 2)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it. A rate <= 0 never blocks."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stop calling the API after repeated transient failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. Once ``reset_timeout`` has passed, a single
+    trial call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"Circuit open after {self._failures} consecutive failures; "
+                    f"retrying in {max(remaining, 0):.0f}s"
+                )
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(
+                        f"Circuit breaker opened after {self._failures} consecutive failures"
+                    )
+                self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """Retry transient API errors with decorrelated jitter.
+
+    Only connection errors, timeouts and RETRYABLE_STATUS responses are retried;
+    a server ``Retry-After`` header overrides the computed delay. The token
+    bucket and circuit breaker are shared by every thread using the policy;
+    with ``max_in_flight`` set, at most that many requests run at once.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = MAX_RETRY_DELAY,
+        retry_statuses: frozenset[int] = RETRYABLE_STATUS,
+        bucket: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.bucket = bucket or TokenBucket(API_RATE_LIMIT)
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def before_request(self) -> None:
+        """Called by the client before every HTTP request."""
+        self.breaker.before_call()
+        if self.in_flight is not None:
+            self.in_flight.acquire()
+        self.bucket.acquire()
+
+    def after_request(self) -> None:
+        """Called by the client once an HTTP request has finished, successfully or not."""
+        if self.in_flight is not None:
+            self.in_flight.release()
+
+    def record_response(self, status: Optional[int]) -> None:
+        """Called by the client with the status of every HTTP response (None = no response)."""
+        if status is None or status in self.retry_statuses:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def is_retryable(self, exc: requests.RequestException) -> bool:
+        if isinstance(exc, CircuitOpenError):
+            return False
+        response = getattr(exc, "response", None)
+        if response is not None:
+            return response.status_code in self.retry_statuses
+        return isinstance(
+            exc,
+            (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ),
+        )
+
+    def retry_after(self, exc: requests.RequestException) -> Optional[float]:
+        """Seconds requested by the server's Retry-After header, if any."""
+        response = getattr(exc, "response", None)
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def next_delay(self, previous: float) -> float:
+        """Decorrelated jitter: uniform between the base delay and 3x the previous one."""
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    def call(self, func, *args, **kwargs) -> Any:
+        name = getattr(func, "__name__", "request")
+        delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except requests.RequestException as e:
+                if not self.is_retryable(e):
+                    raise
+                if attempt == self.max_retries:
+                    logger.error(
+                        f"All {self.max_retries + 1} attempts failed for {name}"
+                    )
+                    raise
+                METRICS.count("http_retries_total")
+                delay = self.next_delay(delay)
+                retry_after = self.retry_after(e)
+                wait = min(retry_after, self.max_delay) if retry_after is not None else delay
+                logger.warning(
+                    f"Attempt {attempt + 1}/{self.max_retries + 1} failed for {name}: {e}. Retrying in {wait:.1f}s..."
+                )
+                time.sleep(wait)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def with_retry(policy: Optional[RetryPolicy] = None):
+    """Retry decorator applying ``policy`` (default: the shared DEFAULT_RETRY_POLICY)."""
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            delay = initial_delay
-            last_exception = None
-            for attempt in range(max_retries + 1):
-                try:
-                    return func(*args, **kwargs)
-                except requests.RequestException as e:
-                    last_exception = e
-                    if attempt < max_retries:
-                        logger.warning(
-                            f"Attempt {attempt + 1}/{max_retries + 1} failed for {func.__name__}: {e}. Retrying in {delay:.1f}s..."
-                        )
-                        time.sleep(delay)
-                        delay *= backoff
-                    else:
-                        logger.error(
-                            f"All {max_retries + 1} attempts failed for {func.__name__}"
-                        )
-            raise last_exception
+            return (policy or DEFAULT_RETRY_POLICY).call(func, *args, **kwargs)
 
         return wrapper
 
     return decorator
 
 
+def _rounded(values: dict[str, Any]) -> dict[str, Any]:
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in values.items()}
+
+
+def _prometheus_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SyncMetrics:
+    """Wall/CPU time and byte counts for one sync run, shared by every thread.
+
+    Phases (fetch, streams, aggregate, write) are timed with the process CPU
+    clock, so their CPU time includes the worker threads they start; renderers
+    run on one thread each and use that thread's CPU clock. When several
+    athletes sync at once (``concurrent_athletes``), overlapping phases would
+    count the same process CPU once per athlete, so phases then record wall
+    time only and CPU is reported for the run as a whole. Every HTTP call is
+    recorded with its endpoint, status, duration and body size, and counters
+    track retries and response-cache hits, misses and I/O.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.now().isoformat()
+            self._wall_start = time.perf_counter()
+            self._cpu_start = time.process_time()
+            self.phases: dict[str, dict[str, float]] = {}
+            self.renderers: dict[str, dict[str, Any]] = {}
+            self.http_calls: list[dict[str, Any]] = []
+            self.counters: dict[str, float] = {}
+            self.concurrent_athletes = False
+
+    @contextlib.contextmanager
+    def _timed(
+        self, table: dict, name: str, cpu_clock: Optional[Callable[[], float]]
+    ) -> Iterator[dict[str, Any]]:
+        record = {"bytes": 0}
+        wall = time.perf_counter()
+        cpu = cpu_clock() if cpu_clock else None
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - wall
+            if cpu_clock:
+                record["cpu_s"] = cpu_clock() - cpu
+            with self._lock:
+                totals = table.setdefault(name, {"count": 0, "wall_s": 0.0, "bytes": 0})
+                totals["count"] += 1
+                for key, value in record.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        totals[key] = totals.get(key, 0) + value
+                    else:
+                        totals[key] = value
+
+    def phase(self, name: str):
+        """Time a block of the run; add to the yielded dict's ``bytes`` to count output."""
+        return self._timed(
+            self.phases, name, None if self.concurrent_athletes else time.process_time
+        )
+
+    def renderer(self, label: str):
+        """Like phase() for one report renderer running on its own thread."""
+        return self._timed(self.renderers, label, time.thread_time)
+
+    def http_call(
+        self, path: str, status: Optional[int], seconds: float, size: int
+    ) -> None:
+        endpoint = re.sub(r"/[^/]*\d[^/]*(?=/)", "/{id}", path)
+        with self._lock:
+            self.http_calls.append(
+                {
+                    "endpoint": endpoint,
+                    "status": status,
+                    "seconds": round(seconds, 6),
+                    "bytes": size,
+                }
+            )
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            endpoints: dict[str, dict[str, Any]] = {}
+            for call in self.http_calls:
+                totals = endpoints.setdefault(
+                    call["endpoint"],
+                    {"requests": 0, "errors": 0, "seconds": 0.0, "bytes": 0},
+                )
+                totals["requests"] += 1
+                totals["errors"] += call["status"] is None or call["status"] >= 400
+                totals["seconds"] = round(totals["seconds"] + call["seconds"], 6)
+                totals["bytes"] += call["bytes"]
+            return {
+                "started_at": self.started_at,
+                "wall_s": round(time.perf_counter() - self._wall_start, 6),
+                "cpu_s": round(time.process_time() - self._cpu_start, 6),
+                "phases": {name: _rounded(t) for name, t in self.phases.items()},
+                "renderers": {name: _rounded(t) for name, t in self.renderers.items()},
+                "http": {"endpoints": endpoints, "calls": list(self.http_calls)},
+                "counters": _rounded(dict(sorted(self.counters.items()))),
+            }
+
+    def prometheus(self, labels: Optional[dict[str, str]] = None) -> str:
+        """The run as Prometheus text exposition (for the node_exporter textfile collector)."""
+        summary = self.to_dict()
+
+        def line(name: str, value: float, **extra: str) -> str:
+            pairs = {**(labels or {}), **extra}
+            rendered = ",".join(f'{k}="{_prometheus_label(v)}"' for k, v in pairs.items())
+            return f"intervals_sync_{name}{{{rendered}}} {value}"
+
+        lines = [
+            line("last_run_timestamp_seconds", round(time.time(), 3)),
+            line("wall_seconds", summary["wall_s"]),
+            line("cpu_seconds", summary["cpu_s"]),
+        ]
+        for kind, table in (("phase", "phases"), ("renderer", "renderers")):
+            for name, totals in summary[table].items():
+                lines.append(line(f"{kind}_wall_seconds", totals["wall_s"], **{kind: name}))
+                if "cpu_s" in totals:
+                    lines.append(line(f"{kind}_cpu_seconds", totals["cpu_s"], **{kind: name}))
+                lines.append(line(f"{kind}_bytes", totals["bytes"], **{kind: name}))
+        for endpoint, totals in summary["http"]["endpoints"].items():
+            lines.append(line("http_requests_total", totals["requests"], endpoint=endpoint))
+            lines.append(line("http_errors_total", totals["errors"], endpoint=endpoint))
+            lines.append(line("http_seconds_total", totals["seconds"], endpoint=endpoint))
+            lines.append(line("http_bytes_total", totals["bytes"], endpoint=endpoint))
+        for name, value in summary["counters"].items():
+            lines.append(line(name, value))
+        return "\n".join(lines) + "\n"
+
+
+METRICS = SyncMetrics()
+
+
+def write_metrics(
+    path: Path, textfile: Optional[Path] = None, metrics: SyncMetrics = METRICS
+) -> None:
+    """Write ``sync_metrics.json`` and, optionally, a Prometheus textfile, atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(
+        path, lambda f: f.write(json.dumps(metrics.to_dict(), indent=2).encode())
+    )
+    if textfile is not None:
+        write_atomic(Path(textfile), lambda f: f.write(metrics.prometheus().encode()))
+
+
 def _cache_path(key: str) -> Path:
     CACHE_DIR.mkdir(exist_ok=True)
     safe_key = re.sub(r"[^a-zA-Z0-9_-]", "_", key)
     return CACHE_DIR / f"{safe_key}.json"
 
 
-def _read_cache(key: str) -> Optional[Any]:
-    path = _cache_path(key)
-    if path.exists():
+class ResponseCache:
+    """Two-tier response cache: an in-process LRU in front of JSON files on disk.
+
+    Entries keep the response's ETag/Last-Modified so expired ones can be
+    revalidated with a conditional GET. The disk tier is capped at
+    ``disk_entries`` files, evicting the least recently written. File names
+    are tracked in memory, so the directory is only scanned on the first
+    write and whenever the cap is exceeded.
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = CACHE_MEMORY_ENTRIES,
+        disk_entries: int = CACHE_DISK_ENTRIES,
+        stale_while_revalidate: float = CACHE_STALE_WHILE_REVALIDATE,
+    ):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self._memory: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._refreshing: set[str] = set()
+        self._disk_index: dict[Path, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, path: Path, entry: dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[str(path)] = entry
+            self._memory.move_to_end(str(path))
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def lookup(self, key: str) -> Optional[dict[str, Any]]:
+        """Return the entry for ``key`` whatever its age, or None."""
+        path = _cache_path(key)
+        with self._lock:
+            entry = self._memory.get(str(path))
+            if entry is not None:
+                self._memory.move_to_end(str(path))
+                return entry
+        started = time.perf_counter()
         try:
-            data = json.loads(path.read_text())
-            cached_time = datetime.fromisoformat(data["cached_at"])
-            if (datetime.now() - cached_time).total_seconds() < CACHE_TTL:
-                logger.debug(f"Cache hit for {key}")
-                return data["value"]
-        except (json.JSONDecodeError, KeyError, ValueError):
-            pass
+            text = path.read_text()
+            METRICS.count("cache_read_bytes_total", len(text))
+            raw = json.loads(text)
+            entry = {
+                "cached_at": datetime.fromisoformat(raw["cached_at"]).timestamp(),
+                "value": raw["value"],
+                "etag": raw.get("etag"),
+                "last_modified": raw.get("last_modified"),
+            }
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+        finally:
+            METRICS.count("cache_read_seconds_total", time.perf_counter() - started)
+        self._remember(path, entry)
+        return entry
+
+    @staticmethod
+    def age(entry: dict[str, Any]) -> float:
+        return time.time() - entry["cached_at"]
+
+    def store(
+        self,
+        key: str,
+        value: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        path = _cache_path(key)
+        entry = {
+            "cached_at": time.time(),
+            "value": value,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        started = time.perf_counter()
+        text = json.dumps(
+            {
+                "cached_at": datetime.fromtimestamp(entry["cached_at"]).isoformat(),
+                "value": value,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+        )
+        path.write_text(text)
+        METRICS.count("cache_write_bytes_total", len(text))
+        METRICS.count("cache_write_seconds_total", time.perf_counter() - started)
+        self._remember(path, entry)
+        self._evict(path)
+
+    def touch(self, key: str, entry: dict[str, Any]) -> None:
+        """Mark ``entry`` fresh again after the server answered 304 Not Modified."""
+        self.store(key, entry["value"], entry.get("etag"), entry.get("last_modified"))
+
+    def _evict(self, written: Path) -> None:
+        cache_dir = written.parent
+        with self._lock:
+            known = self._disk_index.get(cache_dir)
+            if known is not None:
+                known.add(written.name)
+                if len(known) <= self.disk_entries:
+                    return
+        files = [p for p in os.scandir(cache_dir) if p.name.endswith(".json")]
+        names = {p.name for p in files}
+        if len(files) > self.disk_entries:
+            files.sort(key=lambda p: p.stat().st_mtime)
+            for stale in files[: len(files) - self.disk_entries]:
+                try:
+                    os.unlink(stale.path)
+                except OSError:
+                    continue
+                names.discard(stale.name)
+                with self._lock:
+                    self._memory.pop(stale.path, None)
+        with self._lock:
+            self._disk_index[cache_dir] = names
+
+    def refresh_in_background(self, key: str, refresh) -> None:
+        """Run ``refresh()`` on a worker thread unless one is already running for ``key``."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run() -> None:
+            try:
+                refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"refresh-{key}").start()
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long responses of one endpoint stay fresh.
+
+    ``ttl`` is the freshness lifetime in seconds (``math.inf`` = immutable).
+    ``revalidate`` sends a conditional GET once expired instead of a plain one.
+    ``max_stale`` is how long past the TTL an entry may be served while it is
+    refreshed in the background (None = the cache-wide default).
+    """
+
+    ttl: float
+    revalidate: bool = True
+    max_stale: Optional[float] = None
+
+
+DEFAULT_CACHE_POLICIES = {
+    "profile": CachePolicy(ttl=7 * 86400),
+    "wellness": CachePolicy(ttl=CACHE_TTL),  # ranges that include today
+    "wellness_closed": CachePolicy(ttl=86400),  # past days rarely change
+    "activities": CachePolicy(ttl=CACHE_TTL),
+    "activities_closed": CachePolicy(ttl=math.inf),  # closed past date ranges
+}
+
+# Days after which a past range counts as closed: until then a delta sync's
+# overlap re-fetches it to pick up late edits, so it must not be served from cache.
+CLOSED_AFTER_DAYS = {
+    "wellness": WELLNESS_OVERLAP_DAYS,
+    "activities": ACTIVITY_OVERLAP_DAYS,
+}
+
+
+def parse_cache_policies(raw: str) -> dict[str, dict[str, Any]]:
+    """Parse ``{"<endpoint>": {"ttl": ..., "revalidate": ..., "max_stale": ...}}`` JSON."""
+    overrides = json.loads(raw) if raw else {}
+    allowed = {f.name for f in fields(CachePolicy)}
+    for name, override in overrides.items():
+        if name not in DEFAULT_CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy endpoint: {name}")
+        unknown = set(override) - allowed
+        if unknown:
+            raise ValueError(
+                f"Unknown cache policy field(s) for {name}: {', '.join(sorted(unknown))}"
+            )
+    return overrides
+
+
+def build_cache_policies(config: dict[str, Any]) -> dict[str, CachePolicy]:
+    """One athlete's endpoint policies: the defaults with ``config`` overrides applied.
+
+    A configured ``stale_while_revalidate`` becomes the ``max_stale`` of every
+    policy that does not set its own.
+    """
+    overrides = config.get("cache_policies") or {}
+    stale = config.get("stale_while_revalidate")
+    policies = {}
+    for name, default in DEFAULT_CACHE_POLICIES.items():
+        policy = replace(default, **overrides.get(name, {}))
+        if policy.max_stale is None and stale is not None:
+            policy = replace(policy, max_stale=stale)
+        policies[name] = policy
+    return policies
+
+
+def cache_policy_for(
+    endpoint: str,
+    end: Optional[datetime] = None,
+    policies: Optional[dict[str, CachePolicy]] = None,
+) -> CachePolicy:
+    """Policy for ``endpoint``; date ranges that ended before the overlap use the ``_closed`` one."""
+    policies = policies or DEFAULT_CACHE_POLICIES
+    if end is not None:
+        settled = datetime.now().date() - timedelta(days=CLOSED_AFTER_DAYS.get(endpoint, 0))
+        if end.date() < settled:
+            return policies.get(f"{endpoint}_closed", policies[endpoint])
+    return policies[endpoint]
+
+
+def _read_cache(key: str, ttl: Optional[float] = None) -> Optional[Any]:
+    entry = RESPONSE_CACHE.lookup(key)
+    if entry is not None and RESPONSE_CACHE.age(entry) < (ttl or CACHE_TTL):
+        logger.debug(f"Cache hit for {key}")
+        return entry["value"]
     return None
 
 
 def _write_cache(key: str, value: Any) -> None:
-    path = _cache_path(key)
-    path.write_text(
-        json.dumps({"cached_at": datetime.now().isoformat(), "value": value})
-    )
+    RESPONSE_CACHE.store(key, value)
 
 
 def _validate_numeric(
@@ -109,25 +736,96 @@ def validate_athlete_id(athlete_id: str) -> str:
     return athlete_id
 
 
+def _env_settings() -> dict[str, Any]:
+    """Settings read from the environment that every athlete's config shares."""
+    store_path = os.environ.get("STORE_PATH")
+    streams_path = os.environ.get("STREAMS_PATH")
+    return {
+        "verify_ssl": os.environ.get("VERIFY_SSL", "true").lower() == "true",
+        "days": int(os.environ.get("SYNC_DAYS", str(DEFAULT_DAYS))),
+        "store_path": Path(store_path).resolve() if store_path else None,
+        "offline": os.environ.get("SYNC_OFFLINE", "false").lower() == "true",
+        "api_url": os.environ.get("INTERVALS_API_URL", API_BASE_URL),
+        "engine": os.environ.get("FETCH_ENGINE", "threads").lower(),
+        "stale_while_revalidate": float(
+            os.environ.get(
+                "CACHE_STALE_WHILE_REVALIDATE", str(CACHE_STALE_WHILE_REVALIDATE)
+            )
+        ),
+        "cache_policies": parse_cache_policies(os.environ.get("CACHE_POLICIES", "")),
+        "analytics_backend": parse_analytics_backend(
+            os.environ.get("ANALYTICS_BACKEND", "auto")
+        ),
+        "pmc_ctl_days": float(os.environ.get("PMC_CTL_DAYS", str(PMC_CTL_DAYS))),
+        "pmc_atl_days": float(os.environ.get("PMC_ATL_DAYS", str(PMC_ATL_DAYS))),
+        "json_compact": os.environ.get("JSON_COMPACT", "false").lower() == "true",
+        "json_backend": os.environ.get("JSON_BACKEND", "auto").lower(),
+        "formats": parse_formats(os.environ.get("REPORT_FORMATS", "")),
+        "html_mode": os.environ.get("HTML_MODE", "inline").lower(),
+        "chart_js": os.environ.get("CHARTJS_SOURCE", "cdn"),
+        "chart_points": int(os.environ.get("CHART_MAX_POINTS", str(CHART_MAX_POINTS))),
+        "export_format": os.environ.get("EXPORT_FORMAT", "auto").lower(),
+        "streams": os.environ.get("SYNC_STREAMS", "false").lower() == "true",
+        "streams_path": Path(streams_path).resolve() if streams_path else None,
+    }
+
+
 def get_config() -> dict[str, Any]:
     athlete_id = os.environ.get("ATHLETE_ID")
     api_key = os.environ.get("INTERVALS_KEY")
-    verify_ssl = os.environ.get("VERIFY_SSL", "true").lower() == "true"
-    days = int(os.environ.get("SYNC_DAYS", str(DEFAULT_DAYS)))
     output_path = os.environ.get("OUTPUT_PATH", OUTPUT_FILENAME)
+    settings = _env_settings()
 
     if not athlete_id or not api_key:
         raise ValueError("Missing ATHLETE_ID or INTERVALS_KEY environment variables")
 
     return {
+        **settings,
         "athlete_id": validate_athlete_id(athlete_id),
         "api_key": api_key,
-        "verify_ssl": verify_ssl,
-        "days": days,
         "output_path": Path(output_path).resolve(),
     }
 
 
+def load_roster(path: Path, output_root: Path) -> list[dict[str, Any]]:
+    """Load a batch roster into per-athlete configs.
+
+    The roster is a JSON list (or ``{"athletes": [...]}``) of objects with
+    ``athlete_id`` and either ``api_key`` or ``api_key_env`` naming an
+    environment variable; ``days`` and ``verify_ssl`` are optional overrides.
+    Each athlete writes its reports to ``output_root/<athlete_id>/``. An
+    entry that cannot be used (invalid id, no API key) yields a config with
+    only ``athlete_id`` and ``error``, so the batch records it and goes on.
+    """
+    roster = json.loads(Path(path).read_text())
+    if isinstance(roster, dict):
+        roster = roster.get("athletes", [])
+    base = _env_settings()
+
+    configs = []
+    for entry in roster:
+        raw_id = str(entry.get("athlete_id", ""))
+        try:
+            athlete_id = validate_athlete_id(raw_id)
+            api_key = entry.get("api_key") or os.environ.get(entry.get("api_key_env", ""))
+            if not api_key:
+                raise ValueError(f"Missing API key for athlete {athlete_id}")
+        except ValueError as e:
+            configs.append({"athlete_id": raw_id, "error": str(e)})
+            continue
+        configs.append(
+            {
+                **base,
+                "athlete_id": athlete_id,
+                "api_key": api_key,
+                "verify_ssl": entry.get("verify_ssl", base["verify_ssl"]),
+                "days": int(entry.get("days", base["days"])),
+                "output_path": (Path(output_root) / athlete_id / OUTPUT_FILENAME).resolve(),
+            }
+        )
+    return configs
+
+
 def get_headers(api_key: str) -> dict[str, str]:
     import base64
 
@@ -135,62 +833,856 @@ def get_headers(api_key: str) -> dict[str, str]:
     return {"Authorization": f"Basic {credentials}", "Accept": "application/json"}
 
 
+class IntervalsClient:
+    """Intervals.icu API client backed by a pooled keep-alive session.
+
+    The session's connection pool is sized to the fetch executor so parallel
+    requests, retries and repeated syncs reuse the same TLS connections.
+    """
+
+    def __init__(
+        self,
+        athlete_id: str,
+        api_key: str,
+        verify_ssl: bool = True,
+        pool_size: int = MAX_WORKERS,
+        api_url: str = API_BASE_URL,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache_policies: Optional[dict[str, CachePolicy]] = None,
+    ):
+        self.athlete_id = athlete_id
+        self.api_url = api_url.rstrip("/")
+        self.base_url = f"{self.api_url}/athlete/{athlete_id}"
+        self.session = requests.Session()
+        self.pool_size = 0
+        self.ensure_pool_size(pool_size)
+        self.session.headers.update(get_headers(api_key))
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.session.verify = verify_ssl
+        self.retry_policy = retry_policy
+        self.cache_policies = cache_policies or DEFAULT_CACHE_POLICIES
+
+    def ensure_pool_size(self, pool_size: int) -> None:
+        """Grow the connection pool so ``pool_size`` requests can run at once."""
+        if pool_size <= self.pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+
+    def request(
+        self,
+        path: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+        athlete_scoped: bool = True,
+    ) -> requests.Response:
+        """GET an endpoint (athlete-scoped unless told otherwise); raises on 4xx/5xx but returns 304s."""
+        policy = self.retry_policy or DEFAULT_RETRY_POLICY
+        policy.before_request()
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                f"{self.base_url if athlete_scoped else self.api_url}{path}",
+                params=params,
+                headers=headers,
+                timeout=DEFAULT_TIMEOUT,
+            )
+        except requests.RequestException:
+            METRICS.http_call(path, None, time.perf_counter() - started, 0)
+            policy.record_response(None)
+            raise
+        finally:
+            policy.after_request()
+        METRICS.http_call(
+            path, response.status_code, time.perf_counter() - started, len(response.content)
+        )
+        policy.record_response(response.status_code)
+        response.raise_for_status()
+        return response
+
+    def get(self, path: str, params: Optional[dict[str, Any]] = None) -> Any:
+        """GET an athlete-scoped endpoint and return the decoded JSON body."""
+        return self.request(path, params).json()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "IntervalsClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_clients: dict[tuple[str, str, bool, str], IntervalsClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(
+    config: dict[str, Any], pool_size: int = MAX_WORKERS
+) -> IntervalsClient:
+    """Return the process-wide client for this athlete, creating it on first use.
+
+    The client carries the athlete's cache policies, so concurrent athletes
+    never see each other's overrides.
+    """
+    api_url = config.get("api_url") or API_BASE_URL
+    cache_policies = build_cache_policies(config)
+    key = (config["athlete_id"], config["api_key"], config["verify_ssl"], api_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = IntervalsClient(
+                config["athlete_id"],
+                config["api_key"],
+                config["verify_ssl"],
+                pool_size=pool_size,
+                api_url=api_url,
+                cache_policies=cache_policies,
+            )
+            _clients[key] = client
+        else:
+            client.ensure_pool_size(pool_size)
+            client.cache_policies = cache_policies
+        return client
+
+
+def close_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def _revalidate(
+    client: IntervalsClient,
+    cache_key: str,
+    path: str,
+    params: Optional[dict[str, Any]],
+    entry: Optional[dict[str, Any]],
+    transform=None,
+) -> Any:
+    """Fetch ``path``, sending a conditional GET when ``entry`` has validators.
+
+    ``transform`` is applied to a fresh body before it is cached.
+    """
+    headers = {}
+    if entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry is not None and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    response = client.request(path, params=params, headers=headers or None)
+    if response.status_code == 304 and entry is not None:
+        logger.debug(f"Revalidated {cache_key} (304 Not Modified)")
+        METRICS.count("cache_not_modified_total")
+        RESPONSE_CACHE.touch(cache_key, entry)
+        return entry["value"]
+    METRICS.count("cache_miss_total")
+    data = response.json()
+    if transform is not None:
+        data = transform(data)
+    RESPONSE_CACHE.store(
+        cache_key,
+        data,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+    )
+    return data
+
+
+def _cached_get(
+    client: IntervalsClient,
+    cache_key: str,
+    path: str,
+    params: Optional[dict[str, Any]] = None,
+    policy: Optional[CachePolicy] = None,
+    transform=None,
+) -> Any:
+    """GET through the response cache according to ``policy``.
+
+    Fresh entries are returned directly. Expired ones are revalidated (with a
+    conditional GET if the policy allows), or, within the policy's max-stale
+    window, returned as is while a background refresh updates the cache.
+    """
+    policy = policy or CachePolicy(ttl=CACHE_TTL)
+    entry = RESPONSE_CACHE.lookup(cache_key)
+    if entry is not None:
+        age = RESPONSE_CACHE.age(entry)
+        if age < policy.ttl:
+            logger.debug(f"Cache hit for {cache_key}")
+            METRICS.count("cache_hit_total")
+            return entry["value"]
+        max_stale = (
+            policy.max_stale
+            if policy.max_stale is not None
+            else RESPONSE_CACHE.stale_while_revalidate
+        )
+        validators = entry if policy.revalidate else None
+        if age < policy.ttl + max_stale:
+            logger.debug(f"Serving stale {cache_key} while revalidating")
+            METRICS.count("cache_stale_total")
+            retry_policy = client.retry_policy or DEFAULT_RETRY_POLICY
+            RESPONSE_CACHE.refresh_in_background(
+                cache_key,
+                functools.partial(
+                    retry_policy.call,
+                    _revalidate,
+                    client,
+                    cache_key,
+                    path,
+                    params,
+                    validators,
+                    transform,
+                ),
+            )
+            return entry["value"]
+        entry = validators
+    return _revalidate(client, cache_key, path, params, entry, transform)
+
+
 @with_retry()
 def fetch_wellness(
-    base_url: str, headers: dict[str, str], verify_ssl: bool
+    client: IntervalsClient, start: datetime, end: datetime
 ) -> list[dict[str, Any]]:
-    cache_key = f"wellness_{base_url}"
-    cached = _read_cache(cache_key)
-    if cached is not None:
-        return cached
-    url = f"{base_url}/wellness"
-    response = requests.get(
-        url, headers=headers, timeout=DEFAULT_TIMEOUT, verify=verify_ssl
+    cache_key = (
+        f"wellness_{client.athlete_id}_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}"
+    )
+    params = {"oldest": start.strftime("%Y-%m-%d"), "newest": end.strftime("%Y-%m-%d")}
+    return _cached_get(
+        client, cache_key, "/wellness", params, cache_policy_for("wellness", end, client.cache_policies)
     )
-    response.raise_for_status()
-    data = response.json()
-    _write_cache(cache_key, data)
-    return data
 
 
 @with_retry()
+def _fetch_activity_range(
+    client: IntervalsClient, start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    cache_key = f"activities_{client.athlete_id}_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}"
+    params = {"oldest": start.strftime("%Y-%m-%d"), "newest": end.strftime("%Y-%m-%d")}
+    return _cached_get(
+        client, cache_key, "/activities", params, cache_policy_for("activities", end, client.cache_policies)
+    )
+
+
+def activity_windows(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Whole calendar months covering [start, end]; the last one stops at ``end``.
+
+    Past months always span the full month, so their cache keys (and the
+    immutable ``activities_closed`` policy, once the month is older than the
+    delta-sync overlap) survive a moving sync window.
+    """
+    windows = []
+    month = datetime(start.year, start.month, 1)
+    while month <= end:
+        following = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        windows.append((month, min(following - timedelta(days=1), end)))
+        month = following
+    return windows
+
+
 def fetch_activities(
-    base_url: str,
-    headers: dict[str, str],
+    client: IntervalsClient, start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    """Activities in [start, end].
+
+    Ranges longer than ACTIVITY_WINDOW_MIN_DAYS are split into calendar-month
+    windows fetched in parallel and cached per window.
+    """
+    if (end - start).days <= ACTIVITY_WINDOW_MIN_DAYS:
+        return _fetch_activity_range(client, start, end)
+
+    windows = activity_windows(start, end)
+    workers = min(ACTIVITY_WINDOW_WORKERS, len(windows))
+    client.ensure_pool_size(MAX_WORKERS + workers)
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="intervals-window"
+    ) as executor:
+        pages = list(
+            executor.map(lambda w: _fetch_activity_range(client, *w), windows)
+        )
+
+    first, last = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    activities = []
+    for page in pages:
+        for activity in page:
+            day = LocalStore.activity_start(activity)[:10]
+            if not day or first <= day <= last:
+                activities.append(activity)
+    return activities
+
+
+def _redact_profile(profile: dict[str, Any]) -> dict[str, Any]:
+    if "id" in profile:
+        profile = {**profile, "id": "REDACTED"}
+    return profile
+
+
+@with_retry()
+def fetch_profile(client: IntervalsClient) -> dict[str, Any]:
+    return _cached_get(
+        client,
+        f"profile_{client.athlete_id}",
+        "/profile",
+        policy=cache_policy_for("profile", policies=client.cache_policies),
+        transform=_redact_profile,
+    )
+
+
+class LocalStore:
+    """Persistent SQLite (WAL) store of synced activities, wellness and profiles.
+
+    Rows are kept as raw API JSON keyed by athlete and id, with a date column
+    indexed for range queries, so reports can be rebuilt without the network.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS activities (
+            athlete_id TEXT NOT NULL,
+            id TEXT NOT NULL,
+            start TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (athlete_id, id)
+        );
+        CREATE INDEX IF NOT EXISTS activities_by_start ON activities (athlete_id, start);
+        CREATE TABLE IF NOT EXISTS wellness (
+            athlete_id TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (athlete_id, id)
+        );
+        CREATE TABLE IF NOT EXISTS profile (
+            athlete_id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sync_state (
+            athlete_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (athlete_id, key)
+        );
+        CREATE TABLE IF NOT EXISTS curves (
+            athlete_id TEXT NOT NULL,
+            activity_id TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (athlete_id, activity_id)
+        );
+        CREATE TABLE IF NOT EXISTS streams (
+            athlete_id TEXT NOT NULL,
+            activity_id TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            path TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (athlete_id, activity_id)
+        );
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def activity_start(activity: dict[str, Any]) -> str:
+        return activity.get("start_date_local") or activity.get("startDate") or ""
+
+    def upsert_activities(
+        self, athlete_id: str, activities: list[dict[str, Any]]
+    ) -> None:
+        rows = [
+            (athlete_id, str(a["id"]), self.activity_start(a), json.dumps(a))
+            for a in activities
+            if a.get("id") is not None
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO activities (athlete_id, id, start, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (athlete_id, id) DO UPDATE SET start = excluded.start, data = excluded.data",
+                rows,
+            )
+
+    def replace_activities(
+        self,
+        athlete_id: str,
+        start: str,
+        end: str,
+        activities: list[dict[str, Any]],
+    ) -> None:
+        """Make the stored activities in [start, end] match a fresh fetch of that range."""
+        keep = {str(a["id"]) for a in activities if a.get("id") is not None}
+        with self._lock, self._conn:
+            stale = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT id FROM activities WHERE athlete_id = ? AND start >= ? AND start < ?",
+                    (athlete_id, start, _next_day(end)),
+                )
+                if row[0] not in keep
+            ]
+            self._conn.executemany(
+                "DELETE FROM activities WHERE athlete_id = ? AND id = ?",
+                [(athlete_id, i) for i in stale],
+            )
+        self.upsert_activities(athlete_id, activities)
+
+    def activities_between(
+        self, athlete_id: str, start: str, end: str
+    ) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM activities WHERE athlete_id = ? AND start >= ? AND start < ? "
+                "ORDER BY start DESC, id DESC",
+                (athlete_id, start, _next_day(end)),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def daily_loads(self, athlete_id: str, start: str, end: str) -> dict[str, float]:
+        """Validated training load summed per day for [start, end]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT substr(start, 1, 10) AS day, "
+                "SUM(CASE WHEN json_type(data, '$.icu_training_load') IN ('integer', 'real') "
+                "THEN MAX(0, MIN(10000, json_extract(data, '$.icu_training_load'))) ELSE 0 END) "
+                "FROM activities WHERE athlete_id = ? AND start >= ? AND start < ? "
+                "GROUP BY day ORDER BY day",
+                (athlete_id, start, _next_day(end)),
+            ).fetchall()
+        return {day: float(load) for day, load in rows}
+
+    def first_activity_day(self, athlete_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT substr(MIN(start), 1, 10) FROM activities "
+                "WHERE athlete_id = ? AND start GLOB '[0-9][0-9][0-9][0-9]-*'",
+                (athlete_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def upsert_wellness(self, athlete_id: str, wellness: list[dict[str, Any]]) -> None:
+        rows = [(athlete_id, w["id"], json.dumps(w)) for w in wellness if w.get("id")]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO wellness (athlete_id, id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (athlete_id, id) DO UPDATE SET data = excluded.data",
+                rows,
+            )
+
+    def wellness_between(
+        self, athlete_id: str, start: str, end: str
+    ) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM wellness WHERE athlete_id = ? AND id >= ? AND id <= ? ORDER BY id",
+                (athlete_id, start, end),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def set_profile(self, athlete_id: str, profile: dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO profile (athlete_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (athlete_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (athlete_id, json.dumps(profile), datetime.now().isoformat()),
+            )
+
+    def get_profile(self, athlete_id: str) -> dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM profile WHERE athlete_id = ?", (athlete_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get_state(self, athlete_id: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE athlete_id = ? AND key = ?",
+                (athlete_id, key),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_state(self, athlete_id: str, key: str, value: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sync_state (athlete_id, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (athlete_id, key) DO UPDATE SET value = excluded.value",
+                (athlete_id, key, json.dumps(value)),
+            )
+
+    def stream_digests(self, athlete_id: str) -> dict[str, str]:
+        """Activity id -> summary digest the stored stream file was fetched for."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity_id, digest FROM streams WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def set_stream(
+        self, athlete_id: str, activity_id: str, digest: str, path: str, samples: int
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO streams (athlete_id, activity_id, digest, path, samples, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (athlete_id, activity_id) DO UPDATE SET "
+                "digest = excluded.digest, path = excluded.path, samples = excluded.samples, "
+                "fetched_at = excluded.fetched_at",
+                (athlete_id, activity_id, digest, path, samples, datetime.now().isoformat()),
+            )
+
+    def curve_digests(self, athlete_id: str) -> dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity_id, digest FROM curves WHERE athlete_id = ?",
+                (athlete_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def set_curve(
+        self, athlete_id: str, activity_id: str, digest: str, curve: dict[str, Any]
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO curves (athlete_id, activity_id, digest, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (athlete_id, activity_id) DO UPDATE SET "
+                "digest = excluded.digest, data = excluded.data",
+                (athlete_id, activity_id, digest, json.dumps(curve)),
+            )
+
+    def curves_between(
+        self, athlete_id: str, start: str, end: str
+    ) -> list[dict[str, Any]]:
+        """Cached curves of activities starting in [start, end]."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.data FROM curves c JOIN activities a "
+                "ON a.athlete_id = c.athlete_id AND a.id = c.activity_id "
+                "WHERE c.athlete_id = ? AND a.start >= ? AND a.start < ?",
+                (athlete_id, start, _next_day(end)),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def stream_index(self, athlete_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT activity_id, path, samples, fetched_at FROM streams "
+                "WHERE athlete_id = ? ORDER BY activity_id",
+                (athlete_id,),
+            ).fetchall()
+        return [
+            {"activity_id": a, "path": p, "samples": n, "fetched_at": t}
+            for a, p, n, t in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _next_day(date_str: str) -> str:
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=1)).strftime(
+        "%Y-%m-%d"
+    )
+
+
+_stores: dict[Path, LocalStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: Optional[Path] = None) -> LocalStore:
+    """Return the process-wide store for ``path`` (default: ``.cache/store.sqlite3``)."""
+    path = Path(path or CACHE_DIR / STORE_FILENAME).resolve()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = LocalStore(path)
+            _stores[path] = store
+        return store
+
+
+def close_stores() -> None:
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+def _delta_start(
+    store: LocalStore, athlete_id: str, name: str, start: datetime, overlap_days: int
+) -> datetime:
+    """First day to request for ``name``: the stored high-water mark minus an overlap.
+
+    Falls back to ``start`` when nothing was synced yet or the requested window
+    reaches further back than what the store already covers.
+    """
+    state = store.get_state(athlete_id, name) or {}
+    high_water = state.get("high_water")
+    if not high_water or state.get("oldest", "") > start.strftime("%Y-%m-%d"):
+        return start
+    resume = datetime.strptime(high_water, "%Y-%m-%d") - timedelta(days=overlap_days)
+    return max(start, resume)
+
+
+def _mark_synced(
+    store: LocalStore,
+    athlete_id: str,
+    name: str,
     start: datetime,
+    fetch_start: datetime,
     end: datetime,
-    verify_ssl: bool,
+) -> None:
+    state = store.get_state(athlete_id, name) or {}
+    oldest = start.strftime("%Y-%m-%d")
+    high_water = state.get("high_water")
+    if high_water and fetch_start.strftime("%Y-%m-%d") <= _next_day(high_water):
+        # The fetched range joins what was already synced: coverage extends back.
+        oldest = min(state.get("oldest", oldest), oldest)
+    store.set_state(
+        athlete_id, name, {"oldest": oldest, "high_water": end.strftime("%Y-%m-%d")}
+    )
+
+
+def sync_wellness(
+    client: IntervalsClient, store: LocalStore, start: datetime, end: datetime
 ) -> list[dict[str, Any]]:
-    cache_key = f"activities_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}"
-    cached = _read_cache(cache_key)
-    if cached is not None:
-        return cached
-    url = f"{base_url}/activities"
-    params = {"oldest": start.strftime("%Y-%m-%d"), "newest": end.strftime("%Y-%m-%d")}
-    response = requests.get(
-        url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT, verify=verify_ssl
+    """Fetch wellness days since the last sync into the store and return [start, end]."""
+    athlete_id = client.athlete_id
+    fetch_start = _delta_start(store, athlete_id, "wellness", start, WELLNESS_OVERLAP_DAYS)
+    store.upsert_wellness(athlete_id, fetch_wellness(client, fetch_start, end))
+    _mark_synced(store, athlete_id, "wellness", start, fetch_start, end)
+    return store.wellness_between(
+        athlete_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
     )
-    response.raise_for_status()
-    data = response.json()
-    _write_cache(cache_key, data)
-    return data
 
 
-@with_retry()
-def fetch_profile(
-    base_url: str, headers: dict[str, str], verify_ssl: bool
-) -> dict[str, Any]:
-    url = f"{base_url}/profile"
-    response = requests.get(
-        url, headers=headers, timeout=DEFAULT_TIMEOUT, verify=verify_ssl
+def sync_activities(
+    client: IntervalsClient, store: LocalStore, start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    """Fetch activities since the last sync into the store and return [start, end].
+
+    The re-fetched range replaces what the store holds for it, so activities
+    deleted upstream within the overlap disappear locally too.
+    """
+    athlete_id = client.athlete_id
+    fetch_start = _delta_start(
+        store, athlete_id, "activities", start, ACTIVITY_OVERLAP_DAYS
     )
-    response.raise_for_status()
-    profile = response.json()
-    if "id" in profile:
-        profile["id"] = "REDACTED"
+    fetched = fetch_activities(client, fetch_start, end)
+    store.replace_activities(
+        athlete_id,
+        fetch_start.strftime("%Y-%m-%d"),
+        end.strftime("%Y-%m-%d"),
+        fetched,
+    )
+    _mark_synced(store, athlete_id, "activities", start, fetch_start, end)
+    truncate_pmc(store, athlete_id, fetch_start.strftime("%Y-%m-%d"))
+    return store.activities_between(
+        athlete_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    )
+
+
+def sync_profile(client: IntervalsClient, store: LocalStore) -> dict[str, Any]:
+    profile = fetch_profile(client)
+    store.set_profile(client.athlete_id, profile)
     return profile
 
 
+@with_retry()
+def fetch_streams(client: IntervalsClient, activity_id: str) -> list[dict[str, Any]]:
+    """Raw ``[{"type": ..., "data": [...]}, ...]`` streams of one activity."""
+    return client.request(
+        f"/activity/{activity_id}/streams",
+        params={"types": ",".join(STREAM_TYPES)},
+        athlete_scoped=False,
+    ).json()
+
+
+def streams_to_array(streams: list[dict[str, Any]]) -> Any:
+    """Pack streams into a float32 ``(len(STREAM_TYPES), samples)`` array; gaps are NaN.
+
+    Each channel is one contiguous row, so reading a single channel from a
+    memory-mapped file touches only that row.
+    """
+    by_type = {s.get("type"): s.get("data") or [] for s in streams or []}
+    samples = max((len(by_type.get(t, [])) for t in STREAM_TYPES), default=0)
+    array = np.full((len(STREAM_TYPES), samples), np.nan, dtype=np.float32)
+    for row, name in enumerate(STREAM_TYPES):
+        values = by_type.get(name, [])
+        if values:
+            array[row, : len(values)] = [np.nan if v is None else v for v in values]
+    return array
+
+
+class StreamStore:
+    """One ``.npy`` file per activity under ``root/<athlete_id>/``, indexed in the LocalStore.
+
+    Files hold the array from streams_to_array and are opened memory-mapped,
+    so analysing many activities never materialises them as Python lists.
+    """
+
+    def __init__(self, root: Path, store: LocalStore):
+        self.root = Path(root)
+        self.store = store
+
+    def path_for(self, athlete_id: str, activity_id: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_\-]", "_", str(activity_id))
+        return self.root / athlete_id / f"{safe}.npy"
+
+    def save(self, athlete_id: str, activity_id: str, digest: str, array: Any) -> Path:
+        path = self.path_for(athlete_id, activity_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        write_atomic(path, lambda f: f.write(buffer.getvalue()))
+        self.store.set_stream(
+            athlete_id, str(activity_id), digest, str(path), array.shape[1]
+        )
+        return path
+
+    def load(self, athlete_id: str, activity_id: str, mmap: bool = True) -> dict[str, Any]:
+        """Channel name -> array (read-only memory-mapped views by default)."""
+        array = np.load(
+            self.path_for(athlete_id, activity_id), mmap_mode="r" if mmap else None
+        )
+        return {name: array[row] for row, name in enumerate(STREAM_TYPES)}
+
+
+def sync_streams(
+    client: IntervalsClient,
+    stream_store: StreamStore,
+    activities: list[dict[str, Any]],
+    max_workers: int = STREAM_WORKERS,
+) -> int:
+    """Fetch streams for activities that are new or changed since their last fetch.
+
+    An activity is re-fetched when its summary digest differs from the one
+    recorded with its stream file. At most ``max_workers`` requests run at
+    once; failures are logged and retried on the next sync. Returns the
+    number of activities fetched.
+    """
+    if np is None:
+        logger.warning("Stream sync requires NumPy; skipping")
+        return 0
+    athlete_id = client.athlete_id
+    known = stream_store.store.stream_digests(athlete_id)
+    pending = [
+        (str(a["id"]), digest)
+        for a in activities
+        if a.get("id") is not None
+        and known.get(str(a["id"])) != (digest := _row_digest(a))
+    ]
+    if not pending:
+        return 0
+
+    def fetch_one(item: tuple[str, str]) -> None:
+        activity_id, digest = item
+        array = streams_to_array(fetch_streams(client, activity_id))
+        stream_store.save(athlete_id, activity_id, digest, array)
+
+    workers = min(max_workers, len(pending))
+    client.ensure_pool_size(MAX_WORKERS + workers)
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="streams") as executor:
+        futures = {executor.submit(fetch_one, item): item[0] for item in pending}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                fetched += 1
+            except Exception as e:
+                logger.error(f"{athlete_id}: streams for activity {futures[future]} failed: {e}")
+    logger.info(f"{athlete_id}: fetched streams for {fetched}/{len(pending)} activities")
+    return fetched
+
+
+def get_stream_store(config: dict[str, Any], store: LocalStore) -> StreamStore:
+    return StreamStore(config.get("streams_path") or store.path.parent / "streams", store)
+
+
+def mean_max_curve(
+    values: Any, durations: tuple[int, ...] = MMP_DURATIONS
+) -> list[Optional[float]]:
+    """Best average of ``values`` (1 Hz samples) over each duration, via prefix sums.
+
+    Gaps (NaN) count as zero; durations longer than the recording are None.
+    """
+    x = np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+    prefix = np.concatenate(([0.0], np.cumsum(x)))
+    curve = []
+    for d in durations:
+        if d > len(x):
+            curve.append(None)
+            continue
+        curve.append(round(float((prefix[d:] - prefix[:-d]).max()) / d, 2))
+    return curve
+
+
+def update_curves(stream_store: StreamStore, athlete_id: str) -> int:
+    """Compute the curve of every stream file not yet cached (or re-fetched since)."""
+    store = stream_store.store
+    streams = store.stream_digests(athlete_id)
+    cached = store.curve_digests(athlete_id)
+    key = ",".join(map(str, MMP_DURATIONS))
+    computed = 0
+    for activity_id, digest in streams.items():
+        curve_digest = f"{digest}:{key}"
+        if cached.get(activity_id) == curve_digest:
+            continue
+        try:
+            channels = stream_store.load(athlete_id, activity_id)
+        except OSError as e:
+            logger.warning(f"{athlete_id}: cannot read streams of {activity_id}: {e}")
+            continue
+        curve = {name: mean_max_curve(channels[name]) for name in MMP_CHANNELS}
+        store.set_curve(athlete_id, activity_id, curve_digest, curve)
+        computed += 1
+    return computed
+
+
+def _best_of(curves: list[dict[str, Any]], channel: str) -> list[Optional[float]]:
+    best: list[Optional[float]] = [None] * len(MMP_DURATIONS)
+    for curve in curves:
+        for i, value in enumerate(curve.get(channel) or []):
+            if value and (best[i] is None or value > best[i]):
+                best[i] = value
+    return best
+
+
+def _pace(speed: Optional[float]) -> Optional[float]:
+    """m/s -> min/km."""
+    return round(1000 / 60 / speed, 2) if speed else None
+
+
+def compute_power_curve(
+    store: LocalStore, athlete_id: str, end: str, windows: tuple[int, ...] = MMP_WINDOWS
+) -> dict[str, Any]:
+    """Rolling best power and pace curves over ``windows`` days ending at ``end``, plus an FTP estimate.
+
+    FTP is FTP_FROM_20MIN of the best 20-minute power in the 90-day window
+    (the longest window when 90 is not configured).
+    """
+    end_day = datetime.strptime(end, "%Y-%m-%d")
+    result: dict[str, Any] = {"durations": list(MMP_DURATIONS), "windows": {}}
+    for days in windows:
+        start = (end_day - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        curves = store.curves_between(athlete_id, start, end)
+        result["windows"][f"{days}d"] = {
+            "watts": _best_of(curves, "watts"),
+            "pace_min_km": [_pace(v) for v in _best_of(curves, "velocity_smooth")],
+            "activities": len(curves),
+        }
+    ftp_window = result["windows"].get("90d") or result["windows"][f"{max(windows)}d"]
+    twenty = ftp_window["watts"][MMP_DURATIONS.index(1200)]
+    result["ftp_estimate"] = round(twenty * FTP_FROM_20MIN) if twenty else None
+    return result
+
+
 def filter_recent_wellness(
     wellness: list[dict[str, Any]], days: int
 ) -> list[dict[str, Any]]:
@@ -213,6 +1705,192 @@ def compute_weekly_summary(wellness: list[dict[str, Any]]) -> dict[str, Any]:
     }
 
 
+def _ewma(loads: Any, tau: float, seed: float) -> list[float]:
+    """Exponentially weighted load: y[t] = y[t-1] + (load[t] - y[t-1]) * (1 - exp(-1/tau)).
+
+    With NumPy the recurrence is evaluated in closed form over blocks of days
+    (a cumulative sum of decay-weighted loads), otherwise day by day.
+    """
+    k = 1 - math.exp(-1 / tau)
+    if np is None:
+        out, y = [], seed
+        for load in loads:
+            y += (load - y) * k
+            out.append(y)
+        return out
+
+    x = np.asarray(loads, dtype=np.float64)
+    out = np.empty_like(x)
+    decay = 1 - k
+    # decay ** -block must stay far below the float64 range
+    block = max(1, min(512, int(500 * tau)))
+    y = seed
+    for s in range(0, len(x), block):
+        chunk = x[s : s + block]
+        powers = decay ** np.arange(len(chunk))
+        out[s : s + len(chunk)] = powers * decay * y + k * powers * np.cumsum(
+            chunk / powers
+        )
+        y = float(out[s + len(chunk) - 1])
+    return out.tolist()
+
+
+def compute_pmc(
+    daily_load: dict[str, float],
+    start: str,
+    end: str,
+    ctl_days: float = PMC_CTL_DAYS,
+    atl_days: float = PMC_ATL_DAYS,
+    seed_ctl: float = 0.0,
+    seed_atl: float = 0.0,
+) -> dict[str, list]:
+    """CTL/ATL/TSB for every day in [start, end] from per-day training load.
+
+    ``seed_ctl``/``seed_atl`` are the values on the day before ``start``; days
+    without activities count as zero load.
+    """
+    first = datetime.strptime(start, "%Y-%m-%d")
+    n_days = (datetime.strptime(end, "%Y-%m-%d") - first).days + 1
+    if n_days <= 0:
+        return {"dates": [], "ctl": [], "atl": [], "tsb": []}
+    dates = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n_days)]
+    loads = [daily_load.get(d, 0.0) for d in dates]
+    ctl = _ewma(loads, ctl_days, seed_ctl)
+    atl = _ewma(loads, atl_days, seed_atl)
+    return {
+        "dates": dates,
+        "ctl": ctl,
+        "atl": atl,
+        "tsb": [c - a for c, a in zip(ctl, atl)],
+    }
+
+
+def truncate_pmc(store: "LocalStore", athlete_id: str, changed_from: str) -> None:
+    """Drop stored PMC days from ``changed_from`` on, after their loads changed."""
+    state = store.get_state(athlete_id, "pmc")
+    if not state or state["checkpoint"] < changed_from:
+        return
+    keep = (
+        datetime.strptime(changed_from, "%Y-%m-%d")
+        - datetime.strptime(state["start"], "%Y-%m-%d")
+    ).days
+    if keep <= 0:
+        store.set_state(athlete_id, "pmc", None)
+        return
+    store.set_state(
+        athlete_id,
+        "pmc",
+        {
+            **state,
+            "checkpoint": (
+                datetime.strptime(changed_from, "%Y-%m-%d") - timedelta(days=1)
+            ).strftime("%Y-%m-%d"),
+            "ctl": state["ctl"][:keep],
+            "atl": state["atl"][:keep],
+        },
+    )
+
+
+def update_pmc(
+    store: "LocalStore",
+    athlete_id: str,
+    end: str,
+    ctl_days: float = PMC_CTL_DAYS,
+    atl_days: float = PMC_ATL_DAYS,
+) -> dict[str, list]:
+    """Full-history PMC up to ``end``, computed incrementally.
+
+    The series up to a checkpoint that later syncs will not revisit
+    (ACTIVITY_OVERLAP_DAYS before ``end``) is kept in the store; each run only
+    recomputes the days after it. A fresh history is seeded with the wellness
+    CTL/ATL of the day before the first activity, when there is one.
+    """
+    state = store.get_state(athlete_id, "pmc")
+    if state and (state["ctl_days"], state["atl_days"]) != (ctl_days, atl_days):
+        state = None
+
+    if state and state["ctl"]:
+        history_start = state["start"]
+        resume = _next_day(state["checkpoint"])
+        seed_ctl, seed_atl = state["ctl"][-1], state["atl"][-1]
+        ctl, atl = list(state["ctl"]), list(state["atl"])
+    else:
+        history_start = store.first_activity_day(athlete_id)
+        if not history_start or history_start > end:
+            return {"dates": [], "ctl": [], "atl": [], "tsb": []}
+        resume = history_start
+        seed_day = (
+            datetime.strptime(history_start, "%Y-%m-%d") - timedelta(days=1)
+        ).strftime("%Y-%m-%d")
+        seed = store.wellness_between(athlete_id, seed_day, seed_day)
+        seed_ctl = _validate_numeric(seed[0].get("ctl"), 0, 500, 0) if seed else 0.0
+        seed_atl = _validate_numeric(seed[0].get("atl"), 0, 500, 0) if seed else 0.0
+        ctl, atl = [], []
+
+    recent = compute_pmc(
+        store.daily_loads(athlete_id, resume, end),
+        resume,
+        end,
+        ctl_days,
+        atl_days,
+        seed_ctl,
+        seed_atl,
+    )
+    ctl += recent["ctl"]
+    atl += recent["atl"]
+
+    first = datetime.strptime(history_start, "%Y-%m-%d")
+    dates = [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(len(ctl))]
+    checkpoint = (
+        datetime.strptime(end, "%Y-%m-%d") - timedelta(days=ACTIVITY_OVERLAP_DAYS + 1)
+    ).strftime("%Y-%m-%d")
+    settled = sum(1 for d in dates if d <= checkpoint)
+    if settled:
+        store.set_state(
+            athlete_id,
+            "pmc",
+            {
+                "start": history_start,
+                "checkpoint": dates[settled - 1],
+                "ctl_days": ctl_days,
+                "atl_days": atl_days,
+                "ctl": ctl[:settled],
+                "atl": atl[:settled],
+            },
+        )
+    return {
+        "dates": dates,
+        "ctl": ctl,
+        "atl": atl,
+        "tsb": [c - a for c, a in zip(ctl, atl)],
+    }
+
+
+def pmc_window(pmc: dict[str, list], start: str, end: str) -> dict[str, list]:
+    """Slice a PMC series to [start, end], rounded for output."""
+    idx = [i for i, d in enumerate(pmc["dates"]) if start <= d <= end]
+    return {
+        "dates": [pmc["dates"][i] for i in idx],
+        "ctl": [round(pmc["ctl"][i], 1) for i in idx],
+        "atl": [round(pmc["atl"][i], 1) for i in idx],
+        "tsb": [round(pmc["tsb"][i], 1) for i in idx],
+    }
+
+
+def pmc_summary(pmc: dict[str, list]) -> dict[str, Any]:
+    """weekly_summary-shaped values for the last PMC day; ramp rate is the 7-day CTL change."""
+    if not pmc["dates"]:
+        return {"ctl": 0, "atl": 0, "tsb": 0, "ramp_rate": 0}
+    ctl, atl = pmc["ctl"][-1], pmc["atl"][-1]
+    week_ago = pmc["ctl"][-8] if len(pmc["ctl"]) >= 8 else pmc["ctl"][0]
+    return {
+        "ctl": round(ctl, 1),
+        "atl": round(atl, 1),
+        "tsb": round(ctl - atl, 1),
+        "ramp_rate": round(ctl - week_ago, 2),
+    }
+
+
 SPORT_ALIASES = {
     "VirtualRide": "Ride",
     "MountainBikeRide": "Ride",
@@ -227,27 +1905,20 @@ def normalize_sport(sport: str) -> str:
     return SPORT_ALIASES.get(sport, sport)
 
 
-def compute_sport_totals(activities: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
-    totals: dict[str, dict[str, Any]] = {}
-    for a in activities:
-        sport = normalize_sport(a.get("type", "Other"))
-        if sport not in totals:
-            totals[sport] = {
-                "count": 0,
-                "total_time": 0,
-                "total_distance": 0,
-                "total_kj": 0,
-                "total_calories": 0,
-                "total_load": 0,
-            }
-        t = totals[sport]
-        t["count"] += 1
-        t["total_time"] += _validate_numeric(a.get("moving_time"), 0, 86400, 0)
-        t["total_distance"] += _validate_numeric(a.get("distance"), 0, 1000000, 0)
-        t["total_kj"] += _validate_numeric(a.get("icu_joules"), 0, 100000000, 0) / 1000
-        t["total_calories"] += _validate_numeric(a.get("calories"), 0, 10000, 0)
-        t["total_load"] += _validate_numeric(a.get("icu_training_load"), 0, 10000, 0)
+def _new_sport_totals() -> dict[str, Any]:
+    return {
+        "count": 0,
+        "total_time": 0,
+        "total_distance": 0,
+        "total_kj": 0,
+        "total_calories": 0,
+        "total_load": 0,
+    }
+
 
+def _finalize_sport_totals(
+    totals: dict[str, dict[str, Any]],
+) -> dict[str, dict[str, Any]]:
     result = {}
     for sport, t in totals.items():
         time_h = round(t["total_time"] / 3600, 2)
@@ -275,6 +1946,34 @@ def compute_sport_totals(activities: list[dict[str, Any]]) -> dict[str, dict[str
     return result
 
 
+def compute_sport_totals(activities: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    totals: dict[str, dict[str, Any]] = {}
+    for a in activities:
+        sport = normalize_sport(a.get("type", "Other"))
+        if sport not in totals:
+            totals[sport] = _new_sport_totals()
+        t = totals[sport]
+        t["count"] += 1
+        t["total_time"] += _validate_numeric(a.get("moving_time"), 0, 86400, 0)
+        t["total_distance"] += _validate_numeric(a.get("distance"), 0, 1000000, 0)
+        t["total_kj"] += _validate_numeric(a.get("icu_joules"), 0, 100000000, 0) / 1000
+        t["total_calories"] += _validate_numeric(a.get("calories"), 0, 10000, 0)
+        t["total_load"] += _validate_numeric(a.get("icu_training_load"), 0, 10000, 0)
+    return _finalize_sport_totals(totals)
+
+
+ZONE_ORDER = ["Z1", "Z2", "Z3", "Z4", "Z5", "Z6", "Z7", "SS"]
+
+
+def _order_zones(zones: dict[str, Any]) -> dict[str, Any]:
+    sorted_zones = {}
+    for z in ZONE_ORDER:
+        if z in zones:
+            sorted_zones[z] = zones[z]
+    sorted_zones.update({k: v for k, v in zones.items() if k not in ZONE_ORDER})
+    return sorted_zones
+
+
 def compute_zone_distribution(activities: list[dict[str, Any]]) -> dict[str, int]:
     zones = {}
     for activity in activities:
@@ -282,14 +1981,7 @@ def compute_zone_distribution(activities: list[dict[str, Any]]) -> dict[str, int
         for zone in zone_times:
             zone_name = zone.get("id", "Unknown")
             zones[zone_name] = zones.get(zone_name, 0) + (zone.get("secs", 0) or 0)
-
-    zone_order = ["Z1", "Z2", "Z3", "Z4", "Z5", "Z6", "Z7", "SS"]
-    sorted_zones = {}
-    for z in zone_order:
-        if z in zones:
-            sorted_zones[z] = zones[z]
-    sorted_zones.update({k: v for k, v in zones.items() if k not in zone_order})
-    return sorted_zones
+    return _order_zones(zones)
 
 
 def get_recovery_recommendation(tsb: float) -> dict[str, str]:
@@ -372,56 +2064,39 @@ def calculate_stats(
     }
 
 
-def compute_week_comparison(activities: list[dict[str, Any]]) -> dict[str, Any]:
-    """Compare current week vs previous week training metrics."""
-    if not activities:
+def _activity_datetime(activity: dict[str, Any]) -> Optional[datetime]:
+    date_str = (
+        activity.get("startDate")
+        or activity.get("start_date_local")
+        or activity.get("start_date")
+        or activity.get("id", "")
+    )
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).replace(
+            tzinfo=None
+        )
+    except (ValueError, AttributeError):
+        try:
+            return datetime.strptime(date_str[:10], "%Y-%m-%d")
+        except (ValueError, TypeError):
+            return None
+
+
+def _week_comparison_result(
+    this_loads: list[float],
+    this_durations: list[float],
+    prev_loads: list[float],
+    prev_durations: list[float],
+) -> dict[str, Any]:
+    def week_stats(loads, durations):
         return {
-            "this_week": {"count": 0, "tss": 0, "duration_hours": 0},
-            "previous_week": {"count": 0, "tss": 0, "duration_hours": 0},
-            "tss_change": "N/A",
-            "duration_change": "N/A",
-            "count_change": "N/A",
+            "count": len(loads),
+            "tss": round(sum(loads), 1),
+            "duration_hours": round(sum(durations) / 3600, 2),
         }
 
-    now = datetime.now()
-    this_week_start = now - timedelta(days=now.weekday())
-    last_week_start = this_week_start - timedelta(days=7)
-
-    this_week = []
-    last_week = []
-    for a in activities:
-        date_str = (
-            a.get("startDate")
-            or a.get("start_date_local")
-            or a.get("start_date")
-            or a.get("id", "")
-        )
-        try:
-            act_date = datetime.fromisoformat(date_str.replace("Z", "+00:00")).replace(
-                tzinfo=None
-            )
-        except (ValueError, AttributeError):
-            try:
-                act_date = datetime.strptime(date_str[:10], "%Y-%m-%d")
-            except (ValueError, TypeError):
-                continue
-
-        if this_week_start <= act_date <= now:
-            this_week.append(a)
-        elif last_week_start <= act_date < this_week_start:
-            last_week.append(a)
-
-    def week_stats(acts):
-        tss = sum(a.get("icu_training_load", 0) or 0 for a in acts)
-        duration = sum(a.get("moving_time", 0) or 0 for a in acts)
-        return {
-            "count": len(acts),
-            "tss": round(tss, 1),
-            "duration_hours": round(duration / 3600, 2),
-        }
-
-    this = week_stats(this_week)
-    prev = week_stats(last_week)
+    this = week_stats(this_loads, this_durations)
+    prev = week_stats(prev_loads, prev_durations)
 
     def pct_change(curr, prev_val):
         if prev_val == 0:
@@ -438,6 +2113,390 @@ def compute_week_comparison(activities: list[dict[str, Any]]) -> dict[str, Any]:
     }
 
 
+def compute_week_comparison(activities: list[dict[str, Any]]) -> dict[str, Any]:
+    """Compare current week vs previous week training metrics."""
+    if not activities:
+        return {
+            "this_week": {"count": 0, "tss": 0, "duration_hours": 0},
+            "previous_week": {"count": 0, "tss": 0, "duration_hours": 0},
+            "tss_change": "N/A",
+            "duration_change": "N/A",
+            "count_change": "N/A",
+        }
+
+    now = datetime.now()
+    this_week_start = now - timedelta(days=now.weekday())
+    last_week_start = this_week_start - timedelta(days=7)
+
+    this_week = []
+    last_week = []
+    for a in activities:
+        act_date = _activity_datetime(a)
+        if act_date is None:
+            continue
+
+        if this_week_start <= act_date <= now:
+            this_week.append(a)
+        elif last_week_start <= act_date < this_week_start:
+            last_week.append(a)
+
+    return _week_comparison_result(
+        [a.get("icu_training_load", 0) or 0 for a in this_week],
+        [a.get("moving_time", 0) or 0 for a in this_week],
+        [a.get("icu_training_load", 0) or 0 for a in last_week],
+        [a.get("moving_time", 0) or 0 for a in last_week],
+    )
+
+
+def compute_daily_load(activities: list[dict[str, Any]]) -> dict[str, float]:
+    """Total training load per calendar day, sorted by date."""
+    daily_load = {}
+    for a in activities:
+        date_str = (a.get("start_date_local", "") or a.get("startDate", ""))[:10]
+        if date_str:
+            tss = a.get("icu_training_load", 0) or 0
+            daily_load[date_str] = daily_load.get(date_str, 0) + tss
+    return dict(sorted(daily_load.items()))
+
+
+def aggregate_activities(
+    activities: list[dict[str, Any]],
+    period_days: int,
+    now: Optional[datetime] = None,
+) -> dict[str, Any]:
+    """Compute every activity aggregate in one pass over ``activities``.
+
+    Each activity is normalised once (dates parsed, numerics validated) and
+    feeds all accumulators. The results are identical to calculate_stats,
+    compute_sport_totals, compute_zone_distribution, compute_week_comparison,
+    compute_weekly_tss_distribution and compute_daily_load.
+    """
+    if not activities:
+        return {
+            "quick_stats": calculate_stats([], period_days),
+            "sport_totals": {},
+            "zone_distribution": {},
+            "week_comparison": compute_week_comparison([]),
+            "weekly_tss": {},
+            "daily_load": {},
+        }
+
+    now = now or datetime.now()
+    this_week_start = now - timedelta(days=now.weekday())
+    last_week_start = this_week_start - timedelta(days=7)
+
+    loads: list[float] = []
+    durations: list[float] = []
+    energies: list[float] = []
+    sports: dict[str, dict[str, Any]] = {}
+    zones: dict[str, Any] = {}
+    this_loads: list[float] = []
+    this_durations: list[float] = []
+    prev_loads: list[float] = []
+    prev_durations: list[float] = []
+    weekly_tss: dict[str, float] = {}
+    daily_load: dict[str, float] = {}
+    week_keys: dict[str, Optional[str]] = {}
+
+    for a in activities:
+        load = _validate_numeric(a.get("icu_training_load"), 0, 10000, 0)
+        moving_time = _validate_numeric(a.get("moving_time"), 0, 86400, 0)
+        kj = _validate_numeric(a.get("icu_joules"), 0, 100000000, 0) / 1000
+        raw_load = a.get("icu_training_load", 0) or 0
+        loads.append(load)
+        durations.append(moving_time)
+        energies.append(kj)
+
+        sport = normalize_sport(a.get("type", "Other"))
+        t = sports.get(sport)
+        if t is None:
+            t = sports[sport] = _new_sport_totals()
+        t["count"] += 1
+        t["total_time"] += moving_time
+        t["total_distance"] += _validate_numeric(a.get("distance"), 0, 1000000, 0)
+        t["total_kj"] += kj
+        t["total_calories"] += _validate_numeric(a.get("calories"), 0, 10000, 0)
+        t["total_load"] += load
+
+        for zone in a.get("icu_zone_times") or []:
+            zone_name = zone.get("id", "Unknown")
+            zones[zone_name] = zones.get(zone_name, 0) + (zone.get("secs", 0) or 0)
+
+        act_date = _activity_datetime(a)
+        if act_date is not None:
+            if this_week_start <= act_date <= now:
+                this_loads.append(raw_load)
+                this_durations.append(a.get("moving_time", 0) or 0)
+            elif last_week_start <= act_date < this_week_start:
+                prev_loads.append(raw_load)
+                prev_durations.append(a.get("moving_time", 0) or 0)
+
+        local_date = a.get("start_date_local", "")
+        if local_date:
+            day = local_date[:10]
+            if day not in week_keys:
+                try:
+                    week_keys[day] = datetime.strptime(day, "%Y-%m-%d").strftime(
+                        "%Y-W%W"
+                    )
+                except ValueError:
+                    week_keys[day] = None
+            week_key = week_keys[day]
+            if week_key is not None:
+                weekly_tss[week_key] = weekly_tss.get(week_key, 0.0) + raw_load
+
+        day = (local_date or a.get("startDate", ""))[:10]
+        if day:
+            daily_load[day] = daily_load.get(day, 0) + raw_load
+
+    return {
+        "quick_stats": {
+            "total_activities": len(activities),
+            "total_tss": round(sum(loads), 1),
+            "total_duration_hours": round(sum(durations) / 3600, 2),
+            "total_energy_kj": round(sum(energies), 1),
+            "period_days": period_days,
+        },
+        "sport_totals": _finalize_sport_totals(sports),
+        "zone_distribution": _order_zones(zones),
+        "week_comparison": _week_comparison_result(
+            this_loads, this_durations, prev_loads, prev_durations
+        ),
+        "weekly_tss": dict(sorted(weekly_tss.items())),
+        "daily_load": dict(sorted(daily_load.items())),
+    }
+
+
+def _iso_week_key_arrays(days: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+    """Year and ``%W`` week number (Monday-based, week 0 before the first Monday)."""
+    years = days.astype("datetime64[Y]")
+    yday = (days - years.astype("datetime64[D]")).astype(np.int64)
+    monday0 = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    return years.astype(np.int64) + 1970, (yday + 7 - monday0) // 7
+
+
+class ActivityColumns:
+    """Struct-of-arrays view of activities for vectorised analytics (needs NumPy).
+
+    Numeric columns hold the same validated values the dict-based functions use;
+    ``raw_load`` keeps the unvalidated load that the weekly/daily rollups sum.
+    """
+
+    def __init__(self, activities: list[dict[str, Any]]):
+        if np is None:
+            raise RuntimeError("The columnar backend requires NumPy")
+        self.sports: list[str] = []
+        sport_index: dict[str, int] = {}
+        self.zone_names: list[str] = []
+        zone_index: dict[str, int] = {}
+        parsed_days: dict[str, Optional[str]] = {}
+
+        sport_codes, moving_time, distance, joules, load, calories = ([] for _ in range(6))
+        raw_load, raw_moving_time, timestamps, local_days, day_keys = ([] for _ in range(5))
+        zone_rows, zone_cols, zone_vals = [], [], []
+
+        for i, a in enumerate(activities):
+            sport = normalize_sport(a.get("type", "Other"))
+            code = sport_index.get(sport)
+            if code is None:
+                code = sport_index[sport] = len(self.sports)
+                self.sports.append(sport)
+            sport_codes.append(code)
+            moving_time.append(_validate_numeric(a.get("moving_time"), 0, 86400, 0))
+            distance.append(_validate_numeric(a.get("distance"), 0, 1000000, 0))
+            joules.append(_validate_numeric(a.get("icu_joules"), 0, 100000000, 0))
+            load.append(_validate_numeric(a.get("icu_training_load"), 0, 10000, 0))
+            calories.append(_validate_numeric(a.get("calories"), 0, 10000, 0))
+            raw_load.append(a.get("icu_training_load", 0) or 0)
+            raw_moving_time.append(a.get("moving_time", 0) or 0)
+            timestamps.append(_activity_datetime(a))
+
+            local_date = a.get("start_date_local", "")
+            day = local_date[:10] if local_date else None
+            if day is not None and day not in parsed_days:
+                try:
+                    datetime.strptime(day, "%Y-%m-%d")
+                    parsed_days[day] = day
+                except ValueError:
+                    parsed_days[day] = None
+            local_days.append(parsed_days[day] if day is not None else None)
+            day_keys.append((local_date or a.get("startDate", ""))[:10])
+
+            for zone in a.get("icu_zone_times") or []:
+                name = zone.get("id", "Unknown")
+                col = zone_index.get(name)
+                if col is None:
+                    col = zone_index[name] = len(self.zone_names)
+                    self.zone_names.append(name)
+                zone_rows.append(i)
+                zone_cols.append(col)
+                zone_vals.append(zone.get("secs", 0) or 0)
+
+        self.sport_codes = np.array(sport_codes, dtype=np.int32)
+        self.moving_time = np.array(moving_time, dtype=np.float64)
+        self.distance = np.array(distance, dtype=np.float64)
+        self.joules = np.array(joules, dtype=np.float64)
+        self.load = np.array(load, dtype=np.float64)
+        self.calories = np.array(calories, dtype=np.float64)
+        self.raw_load = np.array(raw_load, dtype=np.float64)
+        self.raw_moving_time = np.array(raw_moving_time, dtype=np.float64)
+        self.timestamps = np.array(timestamps, dtype="datetime64[us]")
+        self.local_days = np.array(local_days, dtype="datetime64[D]")
+        self.day_keys = np.array(day_keys, dtype="U10")
+        integral = all(isinstance(v, int) for v in zone_vals)
+        self.zone_secs = np.zeros(
+            (len(activities), len(self.zone_names)),
+            dtype=np.int64 if integral else np.float64,
+        )
+        np.add.at(self.zone_secs, (zone_rows, zone_cols), zone_vals)
+
+    def __len__(self) -> int:
+        return len(self.sport_codes)
+
+    def sport_totals(self) -> dict[str, dict[str, Any]]:
+        n_sports = len(self.sports)
+        counts = np.bincount(self.sport_codes, minlength=n_sports)
+        sums = {
+            name: np.bincount(self.sport_codes, weights=column, minlength=n_sports)
+            for name, column in (
+                ("total_time", self.moving_time),
+                ("total_distance", self.distance),
+                ("total_kj", self.joules / 1000),
+                ("total_calories", self.calories),
+                ("total_load", self.load),
+            )
+        }
+        totals = {
+            sport: {
+                "count": int(counts[code]),
+                **{name: float(values[code]) for name, values in sums.items()},
+            }
+            for code, sport in enumerate(self.sports)
+        }
+        return _finalize_sport_totals(totals)
+
+    def zone_totals(self) -> dict[str, Any]:
+        sums = self.zone_secs.sum(axis=0).tolist()
+        return _order_zones(dict(zip(self.zone_names, sums)))
+
+    def daily_load(self) -> dict[str, float]:
+        present = self.day_keys != ""
+        days, inverse = np.unique(self.day_keys[present], return_inverse=True)
+        totals = np.bincount(inverse, weights=self.raw_load[present])
+        return dict(zip(days.tolist(), totals.tolist()))
+
+    def weekly_load(self) -> dict[str, float]:
+        valid = ~np.isnat(self.local_days)
+        if not valid.any():
+            return {}
+        years, weeks = _iso_week_key_arrays(self.local_days[valid])
+        keys, inverse = np.unique(years * 100 + weeks, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.raw_load[valid])
+        return {
+            f"{key // 100:04d}-W{key % 100:02d}": total
+            for key, total in zip(keys.tolist(), totals.tolist())
+        }
+
+    def week_comparison(self, now: datetime) -> dict[str, Any]:
+        this_week_start = now - timedelta(days=now.weekday())
+        last_week_start = this_week_start - timedelta(days=7)
+        now64 = np.datetime64(now, "us")
+        this_start64 = np.datetime64(this_week_start, "us")
+        last_start64 = np.datetime64(last_week_start, "us")
+        this_mask = (self.timestamps >= this_start64) & (self.timestamps <= now64)
+        prev_mask = (self.timestamps >= last_start64) & (self.timestamps < this_start64)
+        return _week_comparison_result(
+            self.raw_load[this_mask].tolist(),
+            self.raw_moving_time[this_mask].tolist(),
+            self.raw_load[prev_mask].tolist(),
+            self.raw_moving_time[prev_mask].tolist(),
+        )
+
+    def quick_stats(self, period_days: int) -> dict[str, Any]:
+        return {
+            "total_activities": len(self),
+            "total_tss": round(float(self.load.sum()), 1),
+            "total_duration_hours": round(float(self.moving_time.sum()) / 3600, 2),
+            "total_energy_kj": round(float((self.joules / 1000).sum()), 1),
+            "period_days": period_days,
+        }
+
+
+class WellnessColumns:
+    """Struct-of-arrays view of wellness rows (needs NumPy); missing values are NaN."""
+
+    FIELDS = {
+        "ctl": "ctl",
+        "atl": "atl",
+        "ramp_rate": "rampRate",
+        "weight": "weight",
+        "resting_hr": "restingHR",
+        "hrv": "hrv",
+        "sleep_secs": "sleepSecs",
+        "steps": "steps",
+    }
+
+    def __init__(self, wellness: list[dict[str, Any]]):
+        if np is None:
+            raise RuntimeError("The columnar backend requires NumPy")
+        rows = sorted((w for w in wellness if w.get("id")), key=lambda w: w["id"])
+        self.days = np.array([w["id"] for w in rows], dtype="datetime64[D]")
+        for attr, key in self.FIELDS.items():
+            column = np.array(
+                [_validate_numeric(w.get(key), -1e12, 1e12, np.nan) for w in rows],
+                dtype=np.float64,
+            )
+            setattr(self, attr, column)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def aggregate_activities_columnar(
+    activities: list[dict[str, Any]],
+    period_days: int,
+    now: Optional[datetime] = None,
+) -> dict[str, Any]:
+    """NumPy counterpart of aggregate_activities with the same output."""
+    if not activities:
+        return aggregate_activities(activities, period_days, now)
+    columns = ActivityColumns(activities)
+    return {
+        "quick_stats": columns.quick_stats(period_days),
+        "sport_totals": columns.sport_totals(),
+        "zone_distribution": columns.zone_totals(),
+        "week_comparison": columns.week_comparison(now or datetime.now()),
+        "weekly_tss": columns.weekly_load(),
+        "daily_load": columns.daily_load(),
+    }
+
+
+def parse_analytics_backend(raw: str) -> str:
+    """Validate an ``ANALYTICS_BACKEND`` value: ``auto``, ``python`` or ``numpy``."""
+    backend = (raw or "auto").strip().lower()
+    if backend not in ANALYTICS_BACKENDS:
+        raise ValueError(
+            f"Unknown analytics backend: {raw} (choose from {', '.join(ANALYTICS_BACKENDS)})"
+        )
+    if backend == "numpy" and np is None:
+        raise ValueError("ANALYTICS_BACKEND=numpy but NumPy is not installed")
+    return backend
+
+
+def aggregate(
+    activities: list[dict[str, Any]], period_days: int, backend: str = "auto"
+) -> dict[str, Any]:
+    """Aggregate with the ``python`` or ``numpy`` backend; ``auto`` picks NumPy
+    when it is installed and there are at least COLUMNAR_MIN_ROWS activities."""
+    backend = parse_analytics_backend(backend)
+    use_numpy = backend == "numpy" or (
+        backend == "auto" and np is not None and len(activities) >= COLUMNAR_MIN_ROWS
+    )
+    if use_numpy:
+        return aggregate_activities_columnar(activities, period_days)
+    return aggregate_activities(activities, period_days)
+
+
 def generate_csv(data: dict[str, Any]) -> str:
     output = []
 
@@ -485,7 +2544,148 @@ def generate_csv(data: dict[str, Any]) -> str:
     return "\n".join(output)
 
 
-def generate_html_report(data: dict[str, Any]) -> str:
+def _chart_x(labels: list[str]) -> list[float]:
+    """Day ordinals for date labels (so gaps count), else positions."""
+    try:
+        return [
+            float(datetime.strptime(str(label)[:10], "%Y-%m-%d").toordinal())
+            for label in labels
+        ]
+    except ValueError:
+        return [float(i) for i in range(len(labels))]
+
+
+def lttb_indices(xs: list[float], ys: list[float], threshold: int) -> list[int]:
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points keeping the shape."""
+    n = len(ys)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        span = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / span
+        avg_y = sum(ys[avg_start:avg_end]) / span
+        best, best_area = avg_start - 1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs(
+                (xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a])
+            )
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def minmax_indices(ys: list[float], threshold: int) -> list[int]:
+    """Min/max bucketing for bar series: each bucket keeps its lowest and highest point."""
+    n = len(ys)
+    if threshold >= n or threshold < 2:
+        return list(range(n))
+    buckets = threshold // 2
+    picked = []
+    for b in range(buckets):
+        lo, hi = b * n // buckets, (b + 1) * n // buckets
+        if lo >= hi:
+            continue
+        bucket = range(lo, hi)
+        picked.extend(sorted({min(bucket, key=ys.__getitem__), max(bucket, key=ys.__getitem__)}))
+    return picked
+
+
+def downsample_series(
+    labels: list[str],
+    series: dict[str, list[float]],
+    max_points: int,
+    method: str = "lttb",
+) -> tuple[list[str], dict[str, list[float]]]:
+    """Reduce a chart to at most ``max_points`` shared x positions.
+
+    ``lttb`` picks points per series (sharing the budget) and keeps their
+    union; ``minmax`` keeps each bucket's extremes of the first series.
+    """
+    if not max_points or len(labels) <= max_points:
+        return labels, series
+    if method == "minmax":
+        keep = minmax_indices(next(iter(series.values())), max_points)
+    else:
+        xs = _chart_x(labels)
+        budget = max(3, max_points // len(series))
+        keep = sorted(
+            {i for ys in series.values() for i in lttb_indices(xs, ys, budget)}
+        )
+    return [labels[i] for i in keep], {
+        name: [ys[i] for i in keep] for name, ys in series.items()
+    }
+
+
+HTML_REPORT_STYLE = """\
+        :root {
+            --bg-primary: #ffffff;
+            --bg-secondary: #f5f5f7;
+            --text-primary: #1d1d1f;
+            --text-secondary: #86868b;
+            --accent: #0071e3;
+            --card-bg: #ffffff;
+            --shadow: 0 2px 8px rgba(0,0,0,0.08);
+        }
+        @media (prefers-color-scheme: dark) {
+            :root {
+                --bg-primary: #1d1d1f;
+                --bg-secondary: #2c2c2e;
+                --text-primary: #f5f5f7;
+                --text-secondary: #98989d;
+                --accent: #0a84ff;
+                --card-bg: #2c2c2e;
+                --shadow: 0 2px 8px rgba(0,0,0,0.3);
+            }
+        }
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: var(--bg-secondary); color: var(--text-primary); padding: 20px; line-height: 1.6; }
+        .container { max-width: 1200px; margin: 0 auto; }
+        h1 { font-size: 2rem; margin-bottom: 0.5rem; }
+        h2 { font-size: 1.25rem; margin: 1.5rem 0 1rem; color: var(--text-secondary); }
+        h3 { font-size: 1rem; margin-bottom: 0.5rem; }
+        .subtitle { color: var(--text-secondary); margin-bottom: 2rem; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); gap: 16px; margin-bottom: 1rem; }
+        .card { background: var(--card-bg); border-radius: 12px; padding: 20px; box-shadow: var(--shadow); }
+        .metric { display: flex; justify-content: space-between; align-items: center; padding: 8px 0; border-bottom: 1px solid var(--bg-secondary); }
+        .metric:last-child { border-bottom: none; }
+        .metric-label { color: var(--text-secondary); font-size: 0.9rem; }
+        .metric-value { font-weight: 600; font-size: 1.1rem; }
+        .status-ok { color: #34c759; }
+        .status-warning { color: #ff9500; }
+        .status-danger { color: #ff3b30; }
+        table { width: 100%; border-collapse: collapse; }
+        th, td { padding: 10px; text-align: left; border-bottom: 1px solid var(--bg-secondary); }
+        th { color: var(--text-secondary); font-weight: 500; font-size: 0.85rem; }
+        .chart-container { position: relative; height: 250px; }
+        .footer { text-align: center; color: var(--text-secondary); margin-top: 2rem; font-size: 0.85rem; }
+        @media (max-width: 768px) {
+            .grid { grid-template-columns: 1fr; }
+            body { padding: 10px; }
+            h1 { font-size: 1.5rem; }
+            .card { padding: 12px; }
+            table { font-size: 0.8rem; display: block; overflow-x: auto; white-space: nowrap; }
+            .chart-container { height: 200px; }
+        }"""
+
+
+def html_report_payload(
+    data: dict[str, Any], max_points: int = CHART_MAX_POINTS
+) -> dict[str, Any]:
+    """Everything the HTML report displays, as JSON-ready values.
+
+    Table cells are plain (unescaped) display strings; the inline report
+    escapes them, the static shell assigns them as text. Line charts are
+    downsampled with LTTB and the daily-load bars with min/max bucketing to
+    ``max_points`` points each (0 keeps every point).
+    """
     stats = data["quick_stats"]
     summary = data["weekly_summary"]
     sport_totals = data.get("sport_totals", {})
@@ -500,10 +2700,6 @@ def generate_html_report(data: dict[str, Any]) -> str:
         else {}
     )
 
-    recovery = get_recovery_recommendation(summary["tsb"])
-    recovery_icon = html.escape(recovery["icon"])
-    recovery_text = html.escape(recovery["text"])
-
     zone_data = []
     zone_labels = []
     for zone, secs in zones.items():
@@ -512,10 +2708,15 @@ def generate_html_report(data: dict[str, Any]) -> str:
             zone_data.append(round(secs / 60))
 
     wellness_sorted = sorted(wellness, key=lambda x: x.get("id", ""))
-    wellness_dates = [w.get("id", "") for w in wellness_sorted]
-    ctl_data = [w.get("ctl", 0) or 0 for w in wellness_sorted]
-    atl_data = [w.get("atl", 0) or 0 for w in wellness_sorted]
-    tsb_data = [round(c - a, 1) for c, a in zip(ctl_data, atl_data)]
+    pmc = data.get("pmc")
+    if pmc and pmc["dates"]:
+        fitness_dates = pmc["dates"]
+        ctl_data, atl_data, tsb_data = pmc["ctl"], pmc["atl"], pmc["tsb"]
+    else:
+        fitness_dates = [w.get("id", "") for w in wellness_sorted]
+        ctl_data = [w.get("ctl", 0) or 0 for w in wellness_sorted]
+        atl_data = [w.get("atl", 0) or 0 for w in wellness_sorted]
+        tsb_data = [round(c - a, 1) for c, a in zip(ctl_data, atl_data)]
 
     weight_data = []
     weight_dates = []
@@ -525,42 +2726,41 @@ def generate_html_report(data: dict[str, Any]) -> str:
             weight_dates.append(w.get("id", ""))
             weight_data.append(weight)
 
-    weekly_tss = compute_weekly_tss_distribution(activities)
-    weekly_labels = list(weekly_tss.keys())
-    weekly_tss_data = list(weekly_tss.values())
+    weekly_tss = data.get("weekly_tss")
+    if weekly_tss is None:
+        weekly_tss = compute_weekly_tss_distribution(activities)
 
-    daily_load = {}
-    for a in activities:
-        date_str = (a.get("start_date_local", "") or a.get("startDate", ""))[:10]
-        if date_str:
-            tss = a.get("icu_training_load", 0) or 0
-            daily_load[date_str] = daily_load.get(date_str, 0) + tss
-    sorted_daily = sorted(daily_load.items())
-    daily_labels = [d[0] for d in sorted_daily]
-    daily_data = [round(d[1], 1) for d in sorted_daily]
+    daily_load = data.get("daily_load")
+    if daily_load is None:
+        daily_load = compute_daily_load(activities)
 
     sorted_activities = sorted(
         activities,
         key=lambda a: a.get("start_date_local", "") or a.get("startDate", "") or "",
         reverse=True,
     )[:10]
-    activity_rows = ""
+    activity_rows = []
     for a in sorted_activities:
         date = (a.get("start_date_local", "") or a.get("startDate", ""))[:10]
-        name = html.escape(a.get("name", ""))
-        sport = html.escape(normalize_sport(a.get("type", "")))
         duration = round((a.get("moving_time", 0) or 0) / 60)
         tss = round(a.get("icu_training_load", 0) or 0, 1)
         dist = round((a.get("distance", 0) or 0) / 1000, 1)
-        activity_rows += f"<tr><td>{{date}}</td><td>{{name}}</td><td>{{sport}}</td><td>{{duration}}m</td><td>{{tss}}</td><td>{{dist}} km</td></tr>\\n".format(
-            date=date, name=name, sport=sport, duration=duration, tss=tss, dist=dist
+        activity_rows.append(
+            [
+                date,
+                a.get("name", ""),
+                normalize_sport(a.get("type", "")),
+                f"{duration}m",
+                str(tss),
+                f"{dist} km",
+            ]
         )
 
     sum_time = 0
     sum_dist = 0
     sum_energy_kj = 0
     sum_load = 0
-    sport_row_list = []
+    sport_rows = []
     for sport, t in sport_totals.items():
         time_h = t.get("total_time_hours", 0)
         dist_km = t.get("total_distance_km", 0)
@@ -568,47 +2768,156 @@ def generate_html_report(data: dict[str, Any]) -> str:
         cal = t.get("total_calories", 0)
         load = t.get("total_load", 0)
         use_kcal = sport in ("Run", "Swim") or kj == 0
-        energy_str = (
-            f"{{cal}} kcal".format(cal=cal) if use_kcal else f"{{kj}} kJ".format(kj=kj)
-        )
+        energy_str = f"{cal} kcal" if use_kcal else f"{kj} kJ"
         energy_kj = round(cal * 4.184 / 1000, 1) if use_kcal else kj
         avg_speed = t.get("avg_speed_kmh", 0)
         avg_pace = t.get("avg_pace_minkm", 0)
         if sport == "Run" and avg_pace > 0:
-            pace_speed_str = f"{{avg_pace}} min/km".format(avg_pace=avg_pace)
+            pace_speed_str = f"{avg_pace} min/km"
         else:
-            pace_speed_str = f"{{avg_speed}} km/h".format(avg_speed=avg_speed)
-        sport_row_list.append(
-            f"<tr><td>{{sport}}</td><td>{{time_h}}h</td><td>{{dist_km}} km</td><td>{{energy_str}}</td><td>{{load}}</td><td>{{pace_speed_str}}</td></tr>".format(
-                sport=html.escape(sport),
-                time_h=time_h,
-                dist_km=dist_km,
-                energy_str=energy_str,
-                load=load,
-                pace_speed_str=pace_speed_str,
-            )
+            pace_speed_str = f"{avg_speed} km/h"
+        sport_rows.append(
+            [sport, f"{time_h}h", f"{dist_km} km", energy_str, str(load), pace_speed_str]
         )
         sum_time += time_h
         sum_dist += dist_km
         sum_energy_kj += energy_kj
         sum_load += load
-    sport_row_list.append(
-        f'<tr style="font-weight:700;border-top:2px solid var(--text-secondary)"><td>Total</td><td>{{sum_time}}h</td><td>{{sum_dist}} km</td><td>{{sum_energy_kj}} kJ</td><td>{{sum_load}}</td><td>-</td></tr>'.format(
-            sum_time=round(sum_time, 2),
-            sum_dist=round(sum_dist, 1),
-            sum_energy_kj=round(sum_energy_kj, 1),
-            sum_load=round(sum_load),
-        )
+    sport_total = [
+        "Total",
+        f"{round(sum_time, 2)}h",
+        f"{round(sum_dist, 1)} km",
+        f"{round(sum_energy_kj, 1)} kJ",
+        str(round(sum_load)),
+        "-",
+    ]
+
+    fitness_labels, fitness = downsample_series(
+        fitness_dates, {"ctl": ctl_data, "atl": atl_data, "tsb": tsb_data}, max_points
+    )
+    weight_labels, weight = downsample_series(
+        weight_dates, {"data": weight_data}, max_points
     )
-    sport_rows = "".join(sport_row_list)
+    daily_labels, daily = downsample_series(
+        list(daily_load.keys()),
+        {"data": [round(v, 1) for v in daily_load.values()]},
+        max_points,
+        method="minmax",
+    )
+
+    power_curve = None
+    if data.get("power_curve"):
+        curve = data["power_curve"]
+        power_curve = {
+            "labels": [_duration_label(d) for d in curve["durations"]],
+            "series": {name: w["watts"] for name, w in curve["windows"].items()},
+            "ftp": f"{curve['ftp_estimate']} W" if curve.get("ftp_estimate") else "-",
+        }
 
     wc_this = week_comp.get("this_week", {})
-    wc_tss_change = week_comp.get("tss_change", "N/A")
-    wc_duration_change = week_comp.get("duration_change", "N/A")
-    wc_count_change = week_comp.get("count_change", "N/A")
-    wc_this_tss = wc_this.get("tss", 0)
-    wc_this_duration = wc_this.get("duration_hours", 0)
-    wc_this_count = wc_this.get("count", 0)
+    return {
+        "date_range": data["date_range"],
+        "last_updated": data.get("last_updated", data["date_range"]["end"]),
+        "summary": summary,
+        "recovery": get_recovery_recommendation(summary["tsb"]),
+        "stats": {
+            "activities": str(stats["total_activities"]),
+            "duration": f"{stats['total_duration_hours']}h",
+            "tss": str(stats["total_tss"]),
+            "energy": f"{stats['total_energy_kj']} kJ",
+        },
+        "week": {
+            "tss": f"{wc_this.get('tss', 0)} ({week_comp.get('tss_change', 'N/A')})",
+            "duration": f"{wc_this.get('duration_hours', 0)}h ({week_comp.get('duration_change', 'N/A')})",
+            "count": f"{wc_this.get('count', 0)} ({week_comp.get('count_change', 'N/A')})",
+        },
+        "charts": {
+            "fitness": {"labels": fitness_labels, **fitness},
+            "zones": {"labels": zone_labels, "data": zone_data},
+            "weekly_tss": {
+                "labels": list(weekly_tss.keys()),
+                "data": list(weekly_tss.values()),
+            },
+            "weight": {"labels": weight_labels, **weight},
+            "daily_load": {"labels": daily_labels, **daily},
+        },
+        "sports": sport_rows,
+        "sport_total": sport_total,
+        "wellness": {
+            "sleep": f"{latest_wellness.get('sleepSecs', 0) / 3600:.1f}h",
+            "resting_hr": f"{latest_wellness.get('restingHR', '-')} bpm",
+            "hrv": f"{latest_wellness.get('hrv', '-')}",
+            "weight": f"{latest_wellness.get('weight', '-')} kg",
+            "readiness": f"{latest_wellness.get('readiness', '-')}%",
+            "steps": f"{latest_wellness.get('steps', '-')}",
+        },
+        "activities": activity_rows,
+        "power_curve": power_curve,
+    }
+
+
+def _duration_label(seconds: int) -> str:
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds / 3600:g}h"
+
+
+def _html_row(cells: list[str], style: str = "") -> str:
+    cols = "".join(f"<td>{html.escape(str(c))}</td>" for c in cells)
+    return f'<tr style="{style}">{cols}</tr>' if style else f"<tr>{cols}</tr>"
+
+
+def generate_html_report(
+    data: dict[str, Any], max_points: int = CHART_MAX_POINTS
+) -> str:
+    view = html_report_payload(data, max_points)
+    summary = view["summary"]
+    stats = view["stats"]
+    week = view["week"]
+    latest = view["wellness"]
+    charts = view["charts"]
+    e = html.escape
+    recovery_icon = e(view["recovery"]["icon"])
+    recovery_text = e(view["recovery"]["text"])
+    tsb_class = "status-ok" if summary["tsb"] > 0 else "status-warning"
+    sport_rows = "".join(_html_row(r) for r in view["sports"]) + _html_row(
+        view["sport_total"],
+        "font-weight:700;border-top:2px solid var(--text-secondary)",
+    )
+    activity_rows = "\n".join(_html_row(r) for r in view["activities"])
+    power_card = power_script = ""
+    if view["power_curve"]:
+        curve = view["power_curve"]
+        power_card = f"""
+        <div class="grid">
+            <div class="card">
+                <h2>Power Curve (FTP estimate: {e(curve["ftp"])})</h2>
+                <div class="chart-container">
+                    <canvas id="powerCurveChart"></canvas>
+                </div>
+            </div>
+        </div>
+"""
+        datasets = [
+            {"label": f"Best {name}", "data": values, "fill": False, "spanGaps": True}
+            for name, values in curve["series"].items()
+        ]
+        power_script = f"""
+        new Chart(document.getElementById('powerCurveChart'), {{
+            type: 'line',
+            data: {{ labels: {json.dumps(curve["labels"])}, datasets: {json.dumps(datasets)} }},
+            options: {{
+                responsive: true,
+                maintainAspectRatio: false,
+                scales: {{
+                    x: {{ grid: {{ color: gridColor }}, ticks: {{ color: textColor }} }},
+                    y: {{ grid: {{ color: gridColor }}, ticks: {{ color: textColor }} }}
+                }}
+            }}
+        }});
+"""
 
     return f"""<!DOCTYPE html>
 <html lang="en">
@@ -618,61 +2927,13 @@ def generate_html_report(data: dict[str, Any]) -> str:
     <title>Training Report</title>
     <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
     <style>
-        :root {{
-            --bg-primary: #ffffff;
-            --bg-secondary: #f5f5f7;
-            --text-primary: #1d1d1f;
-            --text-secondary: #86868b;
-            --accent: #0071e3;
-            --card-bg: #ffffff;
-            --shadow: 0 2px 8px rgba(0,0,0,0.08);
-        }}
-        @media (prefers-color-scheme: dark) {{
-            :root {{
-                --bg-primary: #1d1d1f;
-                --bg-secondary: #2c2c2e;
-                --text-primary: #f5f5f7;
-                --text-secondary: #98989d;
-                --accent: #0a84ff;
-                --card-bg: #2c2c2e;
-                --shadow: 0 2px 8px rgba(0,0,0,0.3);
-            }}
-        }}
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; background: var(--bg-secondary); color: var(--text-primary); padding: 20px; line-height: 1.6; }}
-        .container {{ max-width: 1200px; margin: 0 auto; }}
-        h1 {{ font-size: 2rem; margin-bottom: 0.5rem; }}
-        h2 {{ font-size: 1.25rem; margin: 1.5rem 0 1rem; color: var(--text-secondary); }}
-        h3 {{ font-size: 1rem; margin-bottom: 0.5rem; }}
-        .subtitle {{ color: var(--text-secondary); margin-bottom: 2rem; }}
-        .grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); gap: 16px; margin-bottom: 1rem; }}
-        .card {{ background: var(--card-bg); border-radius: 12px; padding: 20px; box-shadow: var(--shadow); }}
-        .metric {{ display: flex; justify-content: space-between; align-items: center; padding: 8px 0; border-bottom: 1px solid var(--bg-secondary); }}
-        .metric:last-child {{ border-bottom: none; }}
-        .metric-label {{ color: var(--text-secondary); font-size: 0.9rem; }}
-        .metric-value {{ font-weight: 600; font-size: 1.1rem; }}
-        .status-ok {{ color: #34c759; }}
-        .status-warning {{ color: #ff9500; }}
-        .status-danger {{ color: #ff3b30; }}
-        table {{ width: 100%; border-collapse: collapse; }}
-        th, td {{ padding: 10px; text-align: left; border-bottom: 1px solid var(--bg-secondary); }}
-        th {{ color: var(--text-secondary); font-weight: 500; font-size: 0.85rem; }}
-        .chart-container {{ position: relative; height: 250px; }}
-        .footer {{ text-align: center; color: var(--text-secondary); margin-top: 2rem; font-size: 0.85rem; }}
-        @media (max-width: 768px) {{
-            .grid {{ grid-template-columns: 1fr; }}
-            body {{ padding: 10px; }}
-            h1 {{ font-size: 1.5rem; }}
-            .card {{ padding: 12px; }}
-            table {{ font-size: 0.8rem; display: block; overflow-x: auto; white-space: nowrap; }}
-            .chart-container {{ height: 200px; }}
-        }}
+{HTML_REPORT_STYLE}
     </style>
 </head>
 <body>
     <div class="container">
         <h1>Training Report</h1>
-        <p class="subtitle">{data["date_range"]["start"]} to {data["date_range"]["end"]}</p>
+        <p class="subtitle">{view["date_range"]["start"]} to {view["date_range"]["end"]}</p>
 
         <div class="grid">
             <div class="card">
@@ -687,7 +2948,7 @@ def generate_html_report(data: dict[str, Any]) -> str:
                 </div>
                 <div class="metric">
                     <span class="metric-label">Form (TSB)</span>
-                    <span class="metric-value {{'status-ok' if summary['tsb'] > 0 else 'status-warning'}}">{summary["tsb"]}</span>
+                    <span class="metric-value {tsb_class}">{summary["tsb"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">Ramp Rate</span>
@@ -703,19 +2964,19 @@ def generate_html_report(data: dict[str, Any]) -> str:
                 <h2>Activity Summary</h2>
                 <div class="metric">
                     <span class="metric-label">Activities</span>
-                    <span class="metric-value">{stats["total_activities"]}</span>
+                    <span class="metric-value">{stats["activities"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">Duration</span>
-                    <span class="metric-value">{stats["total_duration_hours"]}h</span>
+                    <span class="metric-value">{stats["duration"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">TSS</span>
-                    <span class="metric-value">{stats["total_tss"]}</span>
+                    <span class="metric-value">{stats["tss"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">Energy</span>
-                    <span class="metric-value">{stats["total_energy_kj"]} kJ</span>
+                    <span class="metric-value">{stats["energy"]}</span>
                 </div>
             </div>
 
@@ -723,15 +2984,15 @@ def generate_html_report(data: dict[str, Any]) -> str:
                 <h2>Week Comparison</h2>
                 <div class="metric">
                     <span class="metric-label">TSS</span>
-                    <span class="metric-value">{wc_this_tss} ({wc_tss_change})</span>
+                    <span class="metric-value">{week["tss"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">Duration</span>
-                    <span class="metric-value">{wc_this_duration}h ({wc_duration_change})</span>
+                    <span class="metric-value">{week["duration"]}</span>
                 </div>
                 <div class="metric">
                     <span class="metric-label">Activities</span>
-                    <span class="metric-value">{wc_this_count} ({wc_count_change})</span>
+                    <span class="metric-value">{week["count"]}</span>
                 </div>
             </div>
         </div>
@@ -774,7 +3035,7 @@ def generate_html_report(data: dict[str, Any]) -> str:
                 </div>
             </div>
         </div>
-
+{power_card}
         <div class="card">
             <h2>Sport Breakdown</h2>
             <table>
@@ -791,14 +3052,14 @@ def generate_html_report(data: dict[str, Any]) -> str:
             <h2>Latest Wellness</h2>
             <div class="grid">
                 <div>
-                    <div class="metric"><span class="metric-label">Sleep</span><span class="metric-value">{latest_wellness.get("sleepSecs", 0) / 3600:.1f}h</span></div>
-                    <div class="metric"><span class="metric-label">Resting HR</span><span class="metric-value">{latest_wellness.get("restingHR", "-")} bpm</span></div>
-                    <div class="metric"><span class="metric-label">HRV</span><span class="metric-value">{latest_wellness.get("hrv", "-")}</span></div>
+                    <div class="metric"><span class="metric-label">Sleep</span><span class="metric-value">{e(latest["sleep"])}</span></div>
+                    <div class="metric"><span class="metric-label">Resting HR</span><span class="metric-value">{e(latest["resting_hr"])}</span></div>
+                    <div class="metric"><span class="metric-label">HRV</span><span class="metric-value">{e(latest["hrv"])}</span></div>
                 </div>
                 <div>
-                    <div class="metric"><span class="metric-label">Weight</span><span class="metric-value">{latest_wellness.get("weight", "-")} kg</span></div>
-                    <div class="metric"><span class="metric-label">Readiness</span><span class="metric-value">{latest_wellness.get("readiness", "-")}%</span></div>
-                    <div class="metric"><span class="metric-label">Steps</span><span class="metric-value">{latest_wellness.get("steps", "-")}</span></div>
+                    <div class="metric"><span class="metric-label">Weight</span><span class="metric-value">{e(latest["weight"])}</span></div>
+                    <div class="metric"><span class="metric-label">Readiness</span><span class="metric-value">{e(latest["readiness"])}</span></div>
+                    <div class="metric"><span class="metric-label">Steps</span><span class="metric-value">{e(latest["steps"])}</span></div>
                 </div>
             </div>
         </div>
@@ -815,7 +3076,7 @@ def generate_html_report(data: dict[str, Any]) -> str:
             </table>
         </div>
 
-        <p class="footer">Last updated: {data["last_updated"]}</p>
+        <p class="footer">Last updated: {e(str(view["last_updated"]))}</p>
     </div>
 
     <script>
@@ -826,22 +3087,22 @@ def generate_html_report(data: dict[str, Any]) -> str:
         new Chart(document.getElementById('fitnessChart'), {{
             type: 'line',
             data: {{
-                labels: {json.dumps(wellness_dates)},
+                labels: {json.dumps(charts["fitness"]["labels"])},
                 datasets: [{{
                     label: 'CTL (Fitness)',
-                    data: {json.dumps(ctl_data)},
+                    data: {json.dumps(charts["fitness"]["ctl"])},
                     borderColor: '#34c759',
                     backgroundColor: 'rgba(52, 199, 89, 0.1)',
                     fill: true
                 }}, {{
                     label: 'ATL (Fatigue)',
-                    data: {json.dumps(atl_data)},
+                    data: {json.dumps(charts["fitness"]["atl"])},
                     borderColor: '#ff9500',
                     backgroundColor: 'rgba(255, 149, 0, 0.1)',
                     fill: true
                 }}, {{
                     label: 'TSB (Form)',
-                    data: {json.dumps(tsb_data)},
+                    data: {json.dumps(charts["fitness"]["tsb"])},
                     borderColor: '#5856d6',
                     backgroundColor: 'rgba(88, 86, 214, 0.05)',
                     fill: false,
@@ -861,8 +3122,8 @@ def generate_html_report(data: dict[str, Any]) -> str:
         new Chart(document.getElementById('zoneChart'), {{
             type: 'pie',
             data: {{
-                labels: {json.dumps(zone_labels)},
-                datasets: [{{ data: {json.dumps(zone_data)} }}]
+                labels: {json.dumps(charts["zones"]["labels"])},
+                datasets: [{{ data: {json.dumps(charts["zones"]["data"])} }}]
             }},
             options: {{ responsive: true, maintainAspectRatio: false }}
         }});
@@ -870,10 +3131,10 @@ def generate_html_report(data: dict[str, Any]) -> str:
         new Chart(document.getElementById('weeklyTssChart'), {{
             type: 'bar',
             data: {{
-                labels: {json.dumps(weekly_labels)},
+                labels: {json.dumps(charts["weekly_tss"]["labels"])},
                 datasets: [{{
                     label: 'Weekly TSS',
-                    data: {json.dumps(weekly_tss_data)},
+                    data: {json.dumps(charts["weekly_tss"]["data"])},
                     backgroundColor: '#0071e3',
                     borderRadius: 4
                 }}]
@@ -891,10 +3152,10 @@ def generate_html_report(data: dict[str, Any]) -> str:
         new Chart(document.getElementById('weightChart'), {{
             type: 'line',
             data: {{
-                labels: {json.dumps(weight_dates)},
+                labels: {json.dumps(charts["weight"]["labels"])},
                 datasets: [{{
                     label: 'Weight (kg)',
-                    data: {json.dumps(weight_data)},
+                    data: {json.dumps(charts["weight"]["data"])},
                     borderColor: '#5856d6',
                     backgroundColor: 'rgba(88, 86, 214, 0.1)',
                     fill: true,
@@ -914,10 +3175,10 @@ def generate_html_report(data: dict[str, Any]) -> str:
         new Chart(document.getElementById('dailyLoadChart'), {{
             type: 'bar',
             data: {{
-                labels: {json.dumps(daily_labels)},
+                labels: {json.dumps(charts["daily_load"]["labels"])},
                 datasets: [{{
                     label: 'Daily TSS',
-                    data: {json.dumps(daily_data)},
+                    data: {json.dumps(charts["daily_load"]["data"])},
                     backgroundColor: '#ff9500',
                     borderRadius: 4
                 }}]
@@ -931,51 +3192,291 @@ def generate_html_report(data: dict[str, Any]) -> str:
                 }}
             }}
         }});
-    </script>
+{power_script}    </script>
 </body>
 </html>"""
 
 
-def generate_markdown_report(data: dict[str, Any]) -> str:
-    stats = data["quick_stats"]
-    summary = data["weekly_summary"]
-    sport_totals = data.get("sport_totals", {})
-    zones = data.get("zone_distribution", {})
-    wellness = data.get("wellness", [])
+HTML_DATA_FILENAME = "report-data.json"
+CHARTJS_CDN_URL = "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"
+CHARTJS_FILENAME = "chart.umd.min.js"
 
-    latest_wellness = (
-        sorted(wellness, key=lambda x: x.get("id", ""), reverse=True)[0]
-        if wellness
-        else {}
-    )
-    recovery = get_recovery_recommendation(summary["tsb"])
+HTML_SHELL_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta name="report-shell-version" content="__VERSION__">
+    <title>Training Report</title>
+    <script src="__CHART_SRC__"></script>
+    <style>
+__STYLE__
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Training Report</h1>
+        <p class="subtitle" id="subtitle">Loading&hellip;</p>
 
-    lines = [
-        f"# Training Report",
-        f"**Period:** {data['date_range']['start']} to {data['date_range']['end']}",
-        f"**Last Updated:** {data['last_updated']}",
-        "",
-        "## Training Status",
-        f"- **Fitness (CTL):** {summary['ctl']} - Chronic Training Load",
-        f"- **Fatigue (ATL):** {summary['atl']} - Acute Training Load",
-        f"- **Form (TSB):** {summary['tsb']} = CTL - ATL (negative = overtraining)",
-        f"- **Ramp Rate:** {summary['ramp_rate']}",
-        f"- **{recovery['icon']} Recovery:** {recovery['text']}",
-        "",
-        "## Activity Summary",
-        f"- **Total Activities:** {stats['total_activities']}",
-        f"- **Total Duration:** {stats['total_duration_hours']}h",
-        f"- **Total TSS:** {stats['total_tss']}",
-        f"- **Total Energy:** {stats['total_energy_kj']} kJ",
-        "",
-    ]
+        <div class="grid">
+            <div class="card">
+                <h2>Training Status</h2>
+                <div class="metric"><span class="metric-label">Fitness (CTL)</span><span class="metric-value" data-field="summary.ctl"></span></div>
+                <div class="metric"><span class="metric-label">Fatigue (ATL)</span><span class="metric-value" data-field="summary.atl"></span></div>
+                <div class="metric"><span class="metric-label">Form (TSB)</span><span class="metric-value" id="tsb" data-field="summary.tsb"></span></div>
+                <div class="metric"><span class="metric-label">Ramp Rate</span><span class="metric-value" data-field="summary.ramp_rate"></span></div>
+                <div class="metric" style="background: var(--bg-secondary); margin: 10px -20px -20px; padding: 12px 20px; border-radius: 0 0 12px 12px;">
+                    <span class="metric-label"><span data-field="recovery.icon"></span> Recovery</span>
+                    <span class="metric-value" style="font-size: 0.95rem;" data-field="recovery.text"></span>
+                </div>
+            </div>
 
-    if sport_totals:
-        lines.append("## Sport Breakdown")
-        md_sum_time = 0
-        md_sum_dist = 0
-        md_sum_energy_kj = 0
-        md_sum_load = 0
+            <div class="card">
+                <h2>Activity Summary</h2>
+                <div class="metric"><span class="metric-label">Activities</span><span class="metric-value" data-field="stats.activities"></span></div>
+                <div class="metric"><span class="metric-label">Duration</span><span class="metric-value" data-field="stats.duration"></span></div>
+                <div class="metric"><span class="metric-label">TSS</span><span class="metric-value" data-field="stats.tss"></span></div>
+                <div class="metric"><span class="metric-label">Energy</span><span class="metric-value" data-field="stats.energy"></span></div>
+            </div>
+
+            <div class="card">
+                <h2>Week Comparison</h2>
+                <div class="metric"><span class="metric-label">TSS</span><span class="metric-value" data-field="week.tss"></span></div>
+                <div class="metric"><span class="metric-label">Duration</span><span class="metric-value" data-field="week.duration"></span></div>
+                <div class="metric"><span class="metric-label">Activities</span><span class="metric-value" data-field="week.count"></span></div>
+            </div>
+        </div>
+
+        <div class="grid">
+            <div class="card"><h2>Performance Chart (CTL vs ATL vs TSB)</h2><div class="chart-container"><canvas id="fitnessChart"></canvas></div></div>
+            <div class="card"><h2>Zone Distribution</h2><div class="chart-container"><canvas id="zoneChart"></canvas></div></div>
+        </div>
+
+        <div class="grid">
+            <div class="card"><h2>Weekly TSS Distribution</h2><div class="chart-container"><canvas id="weeklyTssChart"></canvas></div></div>
+            <div class="card"><h2>Weight Trend</h2><div class="chart-container"><canvas id="weightChart"></canvas></div></div>
+        </div>
+
+        <div class="grid">
+            <div class="card"><h2>Daily Training Load</h2><div class="chart-container"><canvas id="dailyLoadChart"></canvas></div></div>
+        </div>
+
+        <div class="grid" id="powerCurveCard" hidden>
+            <div class="card"><h2>Power Curve (FTP estimate: <span data-field="power_curve.ftp"></span>)</h2><div class="chart-container"><canvas id="powerCurveChart"></canvas></div></div>
+        </div>
+
+        <div class="card">
+            <h2>Sport Breakdown</h2>
+            <table>
+                <thead><tr><th>Sport</th><th>Time</th><th>Distance</th><th>Energy</th><th>Load</th><th>Avg Speed/Pace</th></tr></thead>
+                <tbody id="sports"></tbody>
+            </table>
+        </div>
+
+        <div class="card">
+            <h2>Latest Wellness</h2>
+            <div class="grid">
+                <div>
+                    <div class="metric"><span class="metric-label">Sleep</span><span class="metric-value" data-field="wellness.sleep"></span></div>
+                    <div class="metric"><span class="metric-label">Resting HR</span><span class="metric-value" data-field="wellness.resting_hr"></span></div>
+                    <div class="metric"><span class="metric-label">HRV</span><span class="metric-value" data-field="wellness.hrv"></span></div>
+                </div>
+                <div>
+                    <div class="metric"><span class="metric-label">Weight</span><span class="metric-value" data-field="wellness.weight"></span></div>
+                    <div class="metric"><span class="metric-label">Readiness</span><span class="metric-value" data-field="wellness.readiness"></span></div>
+                    <div class="metric"><span class="metric-label">Steps</span><span class="metric-value" data-field="wellness.steps"></span></div>
+                </div>
+            </div>
+        </div>
+
+        <div class="card">
+            <h2>Recent Activities</h2>
+            <table>
+                <thead><tr><th>Date</th><th>Name</th><th>Sport</th><th>Duration</th><th>TSS</th><th>Distance</th></tr></thead>
+                <tbody id="activities"></tbody>
+            </table>
+        </div>
+
+        <p class="footer">Last updated: <span data-field="last_updated"></span></p>
+    </div>
+
+    <script>
+        const isDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+        const gridColor = isDark ? 'rgba(255,255,255,0.1)' : 'rgba(0,0,0,0.1)';
+        const textColor = isDark ? '#98989d' : '#86868b';
+        const axes = {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                x: { grid: { color: gridColor }, ticks: { color: textColor } },
+                y: { grid: { color: gridColor }, ticks: { color: textColor } }
+            }
+        };
+
+        function fillRows(id, rows, style) {
+            const body = document.getElementById(id);
+            for (const cells of rows) {
+                const tr = body.insertRow();
+                if (style) tr.style.cssText = style;
+                for (const cell of cells) tr.insertCell().textContent = cell;
+            }
+        }
+
+        function render(report) {
+            document.getElementById('subtitle').textContent =
+                report.date_range.start + ' to ' + report.date_range.end;
+            for (const el of document.querySelectorAll('[data-field]')) {
+                el.textContent = el.dataset.field.split('.').reduce((v, k) => (v == null ? v : v[k]), report) ?? '';
+            }
+            document.getElementById('tsb').classList.add(
+                report.summary.tsb > 0 ? 'status-ok' : 'status-warning');
+            fillRows('sports', report.sports);
+            fillRows('sports', [report.sport_total],
+                'font-weight:700;border-top:2px solid var(--text-secondary)');
+            fillRows('activities', report.activities);
+
+            const c = report.charts;
+            new Chart(document.getElementById('fitnessChart'), {
+                type: 'line',
+                data: {
+                    labels: c.fitness.labels,
+                    datasets: [
+                        { label: 'CTL (Fitness)', data: c.fitness.ctl, borderColor: '#34c759', backgroundColor: 'rgba(52, 199, 89, 0.1)', fill: true },
+                        { label: 'ATL (Fatigue)', data: c.fitness.atl, borderColor: '#ff9500', backgroundColor: 'rgba(255, 149, 0, 0.1)', fill: true },
+                        { label: 'TSB (Form)', data: c.fitness.tsb, borderColor: '#5856d6', backgroundColor: 'rgba(88, 86, 214, 0.05)', fill: false, borderDash: [5, 5] }
+                    ]
+                },
+                options: axes
+            });
+            new Chart(document.getElementById('zoneChart'), {
+                type: 'pie',
+                data: { labels: c.zones.labels, datasets: [{ data: c.zones.data }] },
+                options: { responsive: true, maintainAspectRatio: false }
+            });
+            new Chart(document.getElementById('weeklyTssChart'), {
+                type: 'bar',
+                data: { labels: c.weekly_tss.labels, datasets: [{ label: 'Weekly TSS', data: c.weekly_tss.data, backgroundColor: '#0071e3', borderRadius: 4 }] },
+                options: axes
+            });
+            new Chart(document.getElementById('weightChart'), {
+                type: 'line',
+                data: { labels: c.weight.labels, datasets: [{ label: 'Weight (kg)', data: c.weight.data, borderColor: '#5856d6', backgroundColor: 'rgba(88, 86, 214, 0.1)', fill: true, tension: 0.3 }] },
+                options: axes
+            });
+            new Chart(document.getElementById('dailyLoadChart'), {
+                type: 'bar',
+                data: { labels: c.daily_load.labels, datasets: [{ label: 'Daily TSS', data: c.daily_load.data, backgroundColor: '#ff9500', borderRadius: 4 }] },
+                options: axes
+            });
+            if (report.power_curve) {
+                document.getElementById('powerCurveCard').hidden = false;
+                new Chart(document.getElementById('powerCurveChart'), {
+                    type: 'line',
+                    data: {
+                        labels: report.power_curve.labels,
+                        datasets: Object.entries(report.power_curve.series).map(([name, data]) =>
+                            ({ label: 'Best ' + name, data: data, fill: false, spanGaps: true }))
+                    },
+                    options: axes
+                });
+            }
+        }
+
+        fetch('__DATA_FILE__', { cache: 'no-cache' })
+            .then(response => {
+                if (!response.ok) throw new Error(response.status + ' ' + response.statusText);
+                return response.json();
+            })
+            .then(render)
+            .catch(err => {
+                document.getElementById('subtitle').textContent =
+                    'Could not load __DATA_FILE__ (' + err.message + '); open this page over HTTP.';
+            });
+    </script>
+</body>
+</html>"""
+
+
+def generate_html_shell(chart_src: str = CHARTJS_CDN_URL) -> str:
+    """Static HTML/JS page that renders ``report-data.json`` in the browser.
+
+    The page only depends on the template and ``chart_src``, so it stays
+    byte-identical across syncs; its version is a hash of the template.
+    """
+    version = hashlib.sha256(HTML_SHELL_TEMPLATE.encode()).hexdigest()[:12]
+    return (
+        HTML_SHELL_TEMPLATE.replace("__STYLE__", HTML_REPORT_STYLE)
+        .replace("__VERSION__", version)
+        .replace("__CHART_SRC__", html.escape(chart_src))
+        .replace("__DATA_FILE__", HTML_DATA_FILENAME)
+    )
+
+
+def vendor_chart_js(output_dir: Path, source: str = "cdn") -> str:
+    """Return the Chart.js URL the shell should load.
+
+    ``source`` is ``cdn`` (the pinned CDN build), ``vendor`` (download it once
+    next to the report) or a path to a local copy to install there. The
+    vendored file is only written when missing, so it is never re-fetched.
+    """
+    if source == "cdn":
+        return CHARTJS_CDN_URL
+    target = output_dir / CHARTJS_FILENAME
+    if not target.exists():
+        try:
+            if source == "vendor":
+                response = requests.get(CHARTJS_CDN_URL, timeout=DEFAULT_TIMEOUT)
+                response.raise_for_status()
+                body = response.content
+            else:
+                body = Path(source).read_bytes()
+        except (requests.RequestException, OSError) as e:
+            logger.warning(f"Could not vendor Chart.js ({e}); using the CDN")
+            return CHARTJS_CDN_URL
+        write_atomic(target, lambda f: f.write(body))
+    return CHARTJS_FILENAME
+
+
+def generate_markdown_report(data: dict[str, Any]) -> str:
+    stats = data["quick_stats"]
+    summary = data["weekly_summary"]
+    sport_totals = data.get("sport_totals", {})
+    zones = data.get("zone_distribution", {})
+    wellness = data.get("wellness", [])
+
+    latest_wellness = (
+        sorted(wellness, key=lambda x: x.get("id", ""), reverse=True)[0]
+        if wellness
+        else {}
+    )
+    recovery = get_recovery_recommendation(summary["tsb"])
+
+    lines = [
+        f"# Training Report",
+        f"**Period:** {data['date_range']['start']} to {data['date_range']['end']}",
+        f"**Last Updated:** {data.get('last_updated', data['date_range']['end'])}",
+        "",
+        "## Training Status",
+        f"- **Fitness (CTL):** {summary['ctl']} - Chronic Training Load",
+        f"- **Fatigue (ATL):** {summary['atl']} - Acute Training Load",
+        f"- **Form (TSB):** {summary['tsb']} = CTL - ATL (negative = overtraining)",
+        f"- **Ramp Rate:** {summary['ramp_rate']}",
+        f"- **{recovery['icon']} Recovery:** {recovery['text']}",
+        "",
+        "## Activity Summary",
+        f"- **Total Activities:** {stats['total_activities']}",
+        f"- **Total Duration:** {stats['total_duration_hours']}h",
+        f"- **Total TSS:** {stats['total_tss']}",
+        f"- **Total Energy:** {stats['total_energy_kj']} kJ",
+        "",
+    ]
+
+    if sport_totals:
+        lines.append("## Sport Breakdown")
+        md_sum_time = 0
+        md_sum_dist = 0
+        md_sum_energy_kj = 0
+        md_sum_load = 0
         for sport, totals in sport_totals.items():
             kj = totals.get("total_kj", 0)
             cal = totals.get("total_calories", 0)
@@ -1043,89 +3544,1523 @@ def generate_markdown_report(data: dict[str, Any]) -> str:
     return "\n".join(lines)
 
 
-def fetch_intervals_data() -> dict[str, Any]:
-    config = get_config()
-    athlete_id = config["athlete_id"]
-    api_key = config["api_key"]
-    verify_ssl = config["verify_ssl"]
-    days = config["days"]
-
-    base_url = f"https://intervals.icu/api/v1/athlete/{athlete_id}"
-    headers = get_headers(api_key)
+def build_report_data(
+    store: LocalStore,
+    athlete_id: str,
+    start: datetime,
+    end: datetime,
+    config: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Build the report data for [start, end] from the local store, without the network.
 
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
+    ``delta`` compares against the snapshot saved next to ``config["output_path"]``
+    by the last write_reports (none without an output path: an initial delta).
+    """
+    config = config or {}
+    days = (end - start).days
+    start_str = start.strftime("%Y-%m-%d")
+    end_str = end.strftime("%Y-%m-%d")
+    activities = store.activities_between(athlete_id, start_str, end_str)
 
     data: dict[str, Any] = {
         "athlete_id": athlete_id,
         "last_updated": datetime.now().isoformat(),
-        "date_range": {
-            "start": start_date.strftime("%Y-%m-%d"),
-            "end": end_date.strftime("%Y-%m-%d"),
+        "date_range": {"start": start_str, "end": end_str},
+    }
+    data["wellness"] = store.wellness_between(athlete_id, start_str, end_str)
+    pmc = update_pmc(
+        store,
+        athlete_id,
+        end_str,
+        config.get("pmc_ctl_days", PMC_CTL_DAYS),
+        config.get("pmc_atl_days", PMC_ATL_DAYS),
+    )
+    data["pmc"] = pmc_window(pmc, start_str, end_str)
+    data["weekly_summary"] = _report_summary(data["wellness"], pmc, end_str)
+    data["activities"] = activities
+    data["profile"] = store.get_profile(athlete_id)
+    data.update(aggregate(activities, days, config.get("analytics_backend", "auto")))
+    if np is not None and store.stream_digests(athlete_id):
+        update_curves(get_stream_store(config, store), athlete_id)
+        data["power_curve"] = compute_power_curve(store, athlete_id, end_str)
+
+    data["delta"] = compute_delta(
+        load_report_snapshot(config["output_path"]) if config.get("output_path") else None,
+        report_snapshot(data),
+        data,
+    )
+    return data
+
+
+DELTA_SUMMARY_SECTIONS = ("weekly_summary", "quick_stats")
+
+
+def _row_digest(row: dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True).encode()).hexdigest()
+
+
+def report_snapshot(data: dict[str, Any]) -> dict[str, Any]:
+    """Compact fingerprint of a report: per-row digests plus summary metrics."""
+    return {
+        "taken_at": data["last_updated"],
+        "date_range": data["date_range"],
+        "activities": {
+            str(a["id"]): [LocalStore.activity_start(a)[:10], _row_digest(a)]
+            for a in data["activities"]
+            if a.get("id") is not None
+        },
+        "wellness": {
+            str(w["id"]): [str(w["id"]), _row_digest(w)]
+            for w in data["wellness"]
+            if w.get("id")
         },
+        "summary": {
+            f"{section}.{key}": value
+            for section in DELTA_SUMMARY_SECTIONS
+            for key, value in (data.get(section) or {}).items()
+            if not isinstance(value, (dict, list))
+        },
+    }
+
+
+def _snapshot_path(json_path: Path) -> Path:
+    return json_path.with_name(json_path.stem + SNAPSHOT_SUFFIX)
+
+
+def load_report_snapshot(json_path: Path) -> Optional[dict[str, Any]]:
+    """The snapshot saved next to ``json_path``, or None if there is none (yet)."""
+    try:
+        return json.loads(_snapshot_path(json_path).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_report_snapshot(json_path: Path, data: dict[str, Any]) -> None:
+    """Make ``data`` the baseline of the next report's delta.
+
+    The snapshot lives next to the reports rather than in the local store, so
+    it travels with them (e.g. committed by the scheduled workflow).
+    """
+    snapshot = report_snapshot(data)
+    write_atomic(
+        _snapshot_path(json_path),
+        lambda f: f.write(json.dumps(snapshot, sort_keys=True).encode()),
+    )
+
+
+def compute_delta(
+    previous: Optional[dict[str, Any]], snapshot: dict[str, Any], data: dict[str, Any]
+) -> dict[str, Any]:
+    """What changed between the previous report snapshot and this report.
+
+    Rows are added, updated (different content) or removed (gone from the
+    store although their date is still inside the report window); rows that
+    merely slid out of the window are not reported. Without a previous
+    snapshot every row counts as added.
+    """
+    previous = previous or {}
+    window = data["date_range"]
+    delta: dict[str, Any] = {
+        "athlete_id": data["athlete_id"],
+        "since": previous.get("taken_at"),
+        "until": snapshot["taken_at"],
+        "initial": not previous,
+    }
+    for section in ("activities", "wellness"):
+        before = previous.get(section, {})
+        after = snapshot[section]
+        rows = {
+            key: row
+            for row in data[section]
+            if (key := str(row.get("id"))) in after
+        }
+        delta[section] = {
+            "added": [rows[k] for k in after if k not in before],
+            "updated": [rows[k] for k in after if k in before and before[k][1] != after[k][1]],
+            "removed": sorted(
+                k
+                for k, (day, _) in before.items()
+                if k not in after and window["start"] <= day <= window["end"]
+            ),
+        }
+    before_summary = previous.get("summary", {})
+    delta["summary"] = {
+        key: {"previous": before_summary.get(key), "current": value}
+        for key, value in snapshot["summary"].items()
+        if before_summary.get(key) != value
     }
+    delta["changed"] = bool(
+        delta["summary"]
+        or any(any(delta[s].values()) for s in ("activities", "wellness"))
+    )
+    return delta
+
 
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_wellness = executor.submit(fetch_wellness, base_url, headers, verify_ssl)
-        future_activities = executor.submit(
-            fetch_activities, base_url, headers, start_date, end_date, verify_ssl
+def _report_summary(
+    wellness: list[dict[str, Any]], pmc: dict[str, list], end: str
+) -> dict[str, Any]:
+    """Prefer the wellness CTL/ATL; fall back to the PMC when it is missing or stale."""
+    fresh = [
+        w
+        for w in wellness
+        if w.get("ctl") is not None
+        and w.get("id", "")
+        >= (
+            datetime.strptime(end, "%Y-%m-%d") - timedelta(days=WELLNESS_STALE_DAYS)
+        ).strftime("%Y-%m-%d")
+    ]
+    if fresh or not pmc["dates"]:
+        return {**compute_weekly_summary(wellness), "source": "wellness"}
+    return {**pmc_summary(pmc), "source": "pmc"}
+
+
+def _sync_window(config: dict[str, Any]) -> tuple[datetime, datetime]:
+    end_date = datetime.now()
+    return end_date - timedelta(days=config["days"]), end_date
+
+
+def fetch_intervals_data(config: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    config = config or get_config()
+    athlete_id = config["athlete_id"]
+    store = get_store(config.get("store_path"))
+    start_date, end_date = _sync_window(config)
+
+    if config.get("offline"):
+        logger.info("Offline mode: building reports from the local store")
+        with METRICS.phase("aggregate"):
+            return build_report_data(store, athlete_id, start_date, end_date, config)
+
+    if config.get("engine") == "async":
+        return asyncio.run(fetch_intervals_data_async(config))
+
+    client = get_client(config)
+    with METRICS.phase("fetch"), ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {
+            "Wellness": executor.submit(
+                sync_wellness, client, store, start_date, end_date
+            ),
+            "Activities": executor.submit(
+                sync_activities, client, store, start_date, end_date
+            ),
+            "Profile": executor.submit(sync_profile, client, store),
+        }
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"{name} fetch failed: {e}")
+
+    if config.get("streams"):
+        with METRICS.phase("streams"):
+            sync_window_streams(client, store, config, start_date, end_date)
+    with METRICS.phase("aggregate"):
+        return build_report_data(store, athlete_id, start_date, end_date, config)
+
+
+def sync_window_streams(
+    client: IntervalsClient,
+    store: LocalStore,
+    config: dict[str, Any],
+    start: datetime,
+    end: datetime,
+) -> int:
+    """Bring the streams of every stored activity in [start, end] up to date."""
+    activities = store.activities_between(
+        client.athlete_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    )
+    return sync_streams(client, get_stream_store(config, store), activities)
+
+
+class AsyncFetchEngine:
+    """Drive the fetch/sync functions concurrently from asyncio.
+
+    Every call runs the regular code path (cache, retry, redaction) on a worker
+    thread. The engine's clients share one RetryPolicy whose token bucket and
+    in-flight cap apply to each HTTP request, so retries, monthly activity
+    windows and background revalidations are limited across all athletes too.
+    """
+
+    def __init__(
+        self, max_in_flight: int = ASYNC_MAX_IN_FLIGHT, rate: float = ASYNC_RATE_LIMIT
+    ):
+        self.max_in_flight = max_in_flight
+        self.retry_policy = RetryPolicy(
+            bucket=TokenBucket(rate), max_in_flight=max_in_flight
+        )
+        self._clients: dict[str, IntervalsClient] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="intervals-fetch"
         )
-        future_profile = executor.submit(fetch_profile, base_url, headers, verify_ssl)
 
-        try:
-            wellness = future_wellness.result()
-        except Exception as e:
-            logger.error(f"Wellness fetch failed: {e}")
-            wellness = []
+    def client_for(self, config: dict[str, Any]) -> IntervalsClient:
+        """The engine's own client for this athlete, gated by the engine's policy."""
+        athlete_id = config["athlete_id"]
+        client = self._clients.get(athlete_id)
+        if client is None:
+            client = IntervalsClient(
+                athlete_id,
+                config["api_key"],
+                config["verify_ssl"],
+                pool_size=self.max_in_flight,
+                api_url=config.get("api_url") or API_BASE_URL,
+                retry_policy=self.retry_policy,
+                cache_policies=build_cache_policies(config),
+            )
+            self._clients[athlete_id] = client
+        return client
+
+    async def call(self, func, *args) -> Any:
+        """Run one blocking fetch on the engine's worker threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def fetch_athlete(self, config: dict[str, Any]) -> dict[str, Any]:
+        athlete_id = config["athlete_id"]
+        store = get_store(config.get("store_path"))
+        start_date, end_date = _sync_window(config)
+        loop = asyncio.get_running_loop()
+        if config.get("offline"):
+            with METRICS.phase("aggregate"):
+                return await loop.run_in_executor(
+                    self._executor,
+                    build_report_data,
+                    store,
+                    athlete_id,
+                    start_date,
+                    end_date,
+                    config,
+                )
+
+        client = self.client_for(config)
+        calls = {
+            "Wellness": self.call(sync_wellness, client, store, start_date, end_date),
+            "Activities": self.call(
+                sync_activities, client, store, start_date, end_date
+            ),
+            "Profile": self.call(sync_profile, client, store),
+        }
+        with METRICS.phase("fetch"):
+            results = await asyncio.gather(*calls.values(), return_exceptions=True)
+        for name, result in zip(calls, results):
+            if isinstance(result, Exception):
+                logger.error(f"{athlete_id}: {name} fetch failed: {result}")
+
+        if config.get("streams"):
+            with METRICS.phase("streams"):
+                await loop.run_in_executor(
+                    self._executor,
+                    sync_window_streams,
+                    client,
+                    store,
+                    config,
+                    start_date,
+                    end_date,
+                )
+
+        with METRICS.phase("aggregate"):
+            return await loop.run_in_executor(
+                self._executor,
+                build_report_data,
+                store,
+                athlete_id,
+                start_date,
+                end_date,
+                config,
+            )
 
-        try:
-            activities = future_activities.result()
-        except Exception as e:
-            logger.error(f"Activities fetch failed: {e}")
-            activities = []
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
 
-        try:
-            profile = future_profile.result()
-        except Exception as e:
-            logger.error(f"Profile fetch failed: {e}")
-            profile = {}
+    async def __aenter__(self) -> "AsyncFetchEngine":
+        return self
 
-    data["wellness"] = filter_recent_wellness(wellness, days)
-    data["weekly_summary"] = compute_weekly_summary(data["wellness"])
-    data["activities"] = activities
-    data["profile"] = profile
-    data["quick_stats"] = calculate_stats(activities, days)
-    data["sport_totals"] = compute_sport_totals(activities)
-    data["zone_distribution"] = compute_zone_distribution(activities)
-    data["week_comparison"] = compute_week_comparison(activities)
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
 
-    return data
 
+async def fetch_intervals_data_async(config: dict[str, Any]) -> dict[str, Any]:
+    async with AsyncFetchEngine() as engine:
+        return await engine.fetch_athlete(config)
 
-def main() -> None:
-    logging.basicConfig(level=logging.INFO, format="%(message)s")
-    logger.info(f"Starting sync at {datetime.now().isoformat()}")
 
+def fetch_all(
+    configs: list[dict[str, Any]],
+    max_in_flight: int = ASYNC_MAX_IN_FLIGHT,
+    rate: float = ASYNC_RATE_LIMIT,
+) -> dict[str, Any]:
+    """Fetch several athletes through one async engine, for synchronous callers.
+
+    Maps each athlete id to its report data, or to the exception that stopped it.
+    """
+    if len(configs) > 1:
+        METRICS.concurrent_athletes = True
+
+    async def run() -> list[Any]:
+        async with AsyncFetchEngine(max_in_flight, rate) as engine:
+            return await asyncio.gather(
+                *(engine.fetch_athlete(c) for c in configs), return_exceptions=True
+            )
+
+    return {c["athlete_id"]: r for c, r in zip(configs, asyncio.run(run()))}
+
+
+def json_encoder(compact: bool = False, backend: str = "auto"):
+    """Return ``dumps(value) -> bytes`` for the chosen backend.
+
+    ``backend`` is ``json``, ``orjson`` or ``auto`` (orjson when installed).
+    Pretty output uses a two-space indent with either backend.
+    """
+    if backend not in ("auto", "json", "orjson"):
+        raise ValueError(f"Unknown JSON backend: {backend}")
+    if backend == "orjson" and orjson is None:
+        raise ValueError("JSON_BACKEND=orjson but orjson is not installed")
+    if backend != "json" and orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (0 if compact else orjson.OPT_INDENT_2)
+        return lambda value: orjson.dumps(value, option=option)
+    if compact:
+        return lambda value: json.dumps(value, separators=(",", ":")).encode()
+    return lambda value: json.dumps(value, indent=2).encode()
+
+
+class _HashingFile:
+    """Binary file wrapper that feeds everything written into a hash."""
+
+    def __init__(self, f, digest):
+        self._f = f
+        self._digest = digest
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+        self._f.write(chunk)
+        self.size += len(chunk)
+
+
+def write_atomic(path: Path, write, previous_hash: Optional[str] = None) -> tuple[str, bool]:
+    """Write ``path`` through a temp file and atomic rename, unless unchanged.
+
+    ``write`` receives a binary file object. Returns the SHA-256 of the new
+    content and whether the file was replaced; when the hash equals
+    ``previous_hash`` and the file exists, it is left untouched.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    digest = hashlib.sha256()
     try:
-        data = fetch_intervals_data()
-        config = get_config()
-        output_dir = config["output_path"].parent
+        with open(tmp, "wb") as f:
+            write(_HashingFile(f, digest))
+        content_hash = digest.hexdigest()
+        if content_hash == previous_hash and path.exists():
+            tmp.unlink()
+            return content_hash, False
+        os.replace(tmp, path)
+        return content_hash, True
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def dump_json_stream(
+    sections: Any,
+    f,
+    compact: bool = False,
+    backend: str = "auto",
+) -> None:
+    """Write a JSON object to binary file ``f`` one top-level section at a time.
+
+    ``sections`` is a dict or an iterable of ``(key, value)`` pairs; list and
+    iterator values are written element by element, so a generator can feed
+    rows without the whole array being built or serialised in one piece.
+    write_reports passes the finished report dict: only the serialisation is
+    incremental there, the rows are already in memory.
+    """
+    dumps = json_encoder(compact, backend)
+    newline, indent = (b"", b"") if compact else (b"\n", b"  ")
+    colon = b":" if compact else b": "
+    items = sections.items() if isinstance(sections, dict) else sections
+
+    def nested(encoded: bytes, depth: int) -> bytes:
+        return encoded.replace(b"\n", b"\n" + indent * depth) if indent else encoded
+
+    f.write(b"{")
+    written = False
+    for key, value in items:
+        f.write((b"," if written else b"") + newline + indent + dumps(str(key)) + colon)
+        written = True
+        if not isinstance(value, (list, tuple, Iterator)):
+            f.write(nested(dumps(value), 1))
+            continue
+        empty = True
+        for j, element in enumerate(value):
+            f.write((b"," if j else b"[") + newline + indent * 2)
+            f.write(nested(dumps(element), 2))
+            empty = False
+        f.write(b"[]" if empty else newline + indent + b"]")
+    f.write(newline + b"}" if written else b"}")
+
+
+def write_json_stream(
+    sections: Any,
+    path: Path,
+    compact: bool = False,
+    backend: str = "auto",
+) -> None:
+    """Atomically write ``sections`` to ``path`` with dump_json_stream."""
+    write_atomic(path, lambda f: dump_json_stream(sections, f, compact, backend))
+
+
+def _read_stamp(path: Path) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def render_json(data: dict[str, Any], f, config: dict[str, Any]) -> None:
+    dump_json_stream(
+        data,
+        f,
+        compact=config.get("json_compact", False),
+        backend=config.get("json_backend", "auto"),
+    )
+
+
+def render_markdown(data: dict[str, Any], f, config: dict[str, Any]) -> None:
+    f.write(generate_markdown_report(data).encode())
+
+
+def render_csv(data: dict[str, Any], f, config: dict[str, Any]) -> None:
+    f.write(generate_csv(data).encode())
+
+
+def render_html(data: dict[str, Any], f, config: dict[str, Any]) -> None:
+    f.write(
+        generate_html_report(data, config.get("chart_points", CHART_MAX_POINTS)).encode()
+    )
+
+
+def render_html_data(data: dict[str, Any], f, config: dict[str, Any]) -> None:
+    """Compact ``report-data.json`` for the static HTML shell."""
+    dumps = json_encoder(compact=True, backend=config.get("json_backend", "auto"))
+    f.write(
+        dumps(html_report_payload(data, config.get("chart_points", CHART_MAX_POINTS)))
+    )
+
+
+ACTIVITY_EXPORT_COLUMNS = {
+    "id": "str",
+    "start_date_local": "datetime",
+    "type": "str",
+    "name": "str",
+    "moving_time": "float",
+    "elapsed_time": "float",
+    "distance": "float",
+    "total_elevation_gain": "float",
+    "icu_training_load": "float",
+    "icu_intensity": "float",
+    "icu_joules": "float",
+    "calories": "float",
+    "average_heartrate": "float",
+    "max_heartrate": "float",
+    "icu_average_watts": "float",
+    "icu_weighted_avg_watts": "float",
+}
+EXPORT_SUFFIXES = {"parquet": ".parquet", "arrow": ".arrow", "npz": ".npz"}
+
+
+def _export_value(value: Any, kind: str) -> Any:
+    """Coerce one cell for a typed column; anything unparseable becomes None."""
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "float":
+            return float(value)
+        if kind == "date":
+            return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+        if kind == "datetime":
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(
+                tzinfo=None, microsecond=0
+            )
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def export_tables(data: dict[str, Any]) -> dict[str, dict[str, tuple[str, list]]]:
+    """Report data as typed columns: ``{table: {column: (kind, values)}}``.
+
+    Kinds are ``str``, ``float``, ``date`` and ``datetime``; missing or
+    invalid cells are None.
+    """
+
+    def table(rows: list[dict[str, Any]], columns: dict[str, tuple[str, str]]):
+        return {
+            name: (kind, [_export_value(row.get(key), kind) for row in rows])
+            for name, (key, kind) in columns.items()
+        }
+
+    wellness_columns = {"date": ("id", "date")}
+    wellness_columns.update(
+        {name: (key, "float") for name, key in WellnessColumns.FIELDS.items()}
+    )
+
+    daily_load = data.get("daily_load") or {}
+    pmc = data.get("pmc") or {"dates": [], "ctl": [], "atl": [], "tsb": []}
+    by_day: dict[str, dict[str, Any]] = {}
+    for day, load in daily_load.items():
+        by_day.setdefault(day, {"date": day})["load"] = load
+    for i, day in enumerate(pmc["dates"]):
+        row = by_day.setdefault(day, {"date": day})
+        row.update(ctl=pmc["ctl"][i], atl=pmc["atl"][i], tsb=pmc["tsb"][i])
+    daily_rows = sorted(
+        (r for r in by_day.values() if _export_value(r["date"], "date")),
+        key=lambda r: r["date"],
+    )
+
+    return {
+        "activities": table(
+            data.get("activities", []),
+            {name: (name, kind) for name, kind in ACTIVITY_EXPORT_COLUMNS.items()},
+        ),
+        "wellness": table(data.get("wellness", []), wellness_columns),
+        "daily": table(
+            daily_rows,
+            {
+                "date": ("date", "date"),
+                "load": ("load", "float"),
+                "ctl": ("ctl", "float"),
+                "atl": ("atl", "float"),
+                "tsb": ("tsb", "float"),
+            },
+        ),
+        "weekly": table(
+            [{"week": k, "tss": v} for k, v in (data.get("weekly_tss") or {}).items()],
+            {"week": ("week", "str"), "tss": ("tss", "float")},
+        ),
+    }
+
+
+def _arrow_table(columns: dict[str, tuple[str, list]]):
+    types = {
+        "str": pa.string(),
+        "float": pa.float64(),
+        "date": pa.date32(),
+        "datetime": pa.timestamp("s"),
+    }
+    return pa.table(
+        {name: pa.array(values, type=types[kind]) for name, (kind, values) in columns.items()}
+    )
+
+
+def _npz_bytes(columns: dict[str, tuple[str, list]]) -> bytes:
+    """An uncompressed ``.npz`` (one ``.npy`` per column) with fixed timestamps.
+
+    np.savez stamps each member with the current time, which would defeat the
+    content-hash skip; writing the archive directly keeps it reproducible.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, (kind, values) in columns.items():
+            if kind == "float":
+                array = np.array(
+                    [np.nan if v is None else v for v in values], dtype=np.float64
+                )
+            elif kind in ("date", "datetime"):
+                unit = "D" if kind == "date" else "s"
+                array = np.array(
+                    ["NaT" if v is None else v.isoformat() for v in values],
+                    dtype=f"datetime64[{unit}]",
+                )
+            else:
+                array = np.array(["" if v is None else v for v in values], dtype=str)
+            member = io.BytesIO()
+            np.lib.format.write_array(member, array, allow_pickle=False)
+            info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            archive.writestr(info, member.getvalue())
+    return buffer.getvalue()
+
+
+def export_backend(requested: str = "auto") -> str:
+    """Resolve ``parquet``/``arrow``/``npz``/``auto`` against what is installed."""
+    if requested not in ("auto", *EXPORT_SUFFIXES):
+        raise ValueError(f"Unknown export format: {requested}")
+    if requested == "auto":
+        requested = "parquet" if pa is not None else "npz"
+    if requested in ("parquet", "arrow") and pa is None:
+        raise ValueError(f"EXPORT_FORMAT={requested} requires pyarrow")
+    if requested == "npz" and np is None:
+        raise ValueError("The columnar export needs pyarrow or NumPy")
+    return requested
+
+
+def render_columnar(
+    columns: dict[str, tuple[str, list]], f, config: dict[str, Any]
+) -> None:
+    """Write one export table as Parquet, Arrow IPC (Feather v2) or ``.npz``."""
+    backend = export_backend(config.get("export_format", "auto"))
+    if backend == "npz":
+        f.write(_npz_bytes(columns))
+        return
+    sink = pa.BufferOutputStream()
+    if backend == "parquet":
+        pq.write_table(_arrow_table(columns), sink)
+    else:
+        feather.write_feather(_arrow_table(columns), sink, compression="uncompressed")
+    f.write(sink.getvalue().to_pybytes())
+
+
+@dataclass(frozen=True)
+class Renderer:
+    """One report format: its label, file name and ``render(data, f, config)``.
+
+    ``filename`` None means the configured output path (``latest.json``).
+    """
+
+    label: str
+    filename: Optional[str]
+    render: Callable[[dict[str, Any], Any, dict[str, Any]], None]
+
+
+RENDERERS: dict[str, Renderer] = {
+    "json": Renderer("JSON", None, render_json),
+    "markdown": Renderer("Markdown", "latest.md", render_markdown),
+    "csv": Renderer("CSV", "latest.csv", render_csv),
+    "html": Renderer("HTML", "latest.html", render_html),
+}
+FORMAT_ALIASES = {"md": "markdown"}
+# Opt-in formats that write several files; not part of the default "all".
+EXTRA_FORMATS = ("columnar",)
+
+
+def parse_formats(raw: Any) -> tuple[str, ...]:
+    """Parse a comma-separated format list (or sequence).
+
+    Empty means the four standard reports; ``all`` can be combined with opt-in
+    formats such as ``columnar``.
+    """
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    names = [FORMAT_ALIASES.get(n.strip().lower(), n.strip().lower()) for n in raw or ()]
+    names = [n for n in names if n]
+    if not names:
+        return REPORT_FORMATS
+    known = (*REPORT_FORMATS, *EXTRA_FORMATS)
+    if "all" in names:
+        names = [*REPORT_FORMATS, *names]
+    unknown = sorted(set(names) - set(known) - {"all"})
+    if unknown:
+        raise ValueError(
+            f"Unknown report format(s): {', '.join(unknown)} (choose from {', '.join(known)})"
+        )
+    return tuple(n for n in known if n in names)
+
+
+def report_content(data: dict[str, Any]) -> dict[str, Any]:
+    """The report data without the per-run ``last_updated`` and ``delta``."""
+    return {k: v for k, v in data.items() if k not in ("last_updated", "delta")}
+
+
+def _stamp_path(json_path: Path) -> Path:
+    return json_path.with_name(json_path.stem + STAMP_SUFFIX)
+
+
+def touch_stamp(json_path: Path, last_updated: str) -> None:
+    """Record a sync that left every report unchanged."""
+    stamp_path = _stamp_path(json_path)
+    stamp = {**_read_stamp(stamp_path), "last_updated": last_updated}
+    write_atomic(stamp_path, lambda f: f.write(json.dumps(stamp, indent=2).encode()))
+
+
+def write_reports(
+    data: dict[str, Any],
+    json_path: Path,
+    config: Optional[dict[str, Any]] = None,
+    formats: Optional[Any] = None,
+) -> dict[str, Path]:
+    """Render the requested formats (default: config ``formats``, else all) next to ``json_path``.
+
+    Formats are rendered concurrently. With ``html_mode="shell"`` the HTML
+    format is a static page plus a small ``report-data.json``. Reports are rendered without
+    ``last_updated`` so their content only changes with the data; each is
+    replaced atomically and skipped when its hash matches the previous run.
+    The sync time and the hashes live in a small stamp file
+    (``latest.stamp.json``); the report's ``delta`` goes to ``latest.delta.json``,
+    followed by the snapshot the next delta is computed against
+    (``latest.snapshot.json``).
+    """
+    config = config or {}
+    formats = parse_formats(formats if formats is not None else config.get("formats"))
+    output_dir = json_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp_path = _stamp_path(json_path)
+    stamp = _read_stamp(stamp_path)
+    previous = stamp.get("files", {})
+    content = report_content(data)
+
+    outputs = {}
+    for name in formats:
+        if name == "columnar":
+            suffix = EXPORT_SUFFIXES[export_backend(config.get("export_format", "auto"))]
+            for table, columns in export_tables(content).items():
+                outputs[f"Columnar {table}"] = (
+                    output_dir / f"{table}{suffix}",
+                    functools.partial(render_columnar, columns, config=config),
+                )
+            continue
+        renderer = RENDERERS[name]
+        path = output_dir / renderer.filename if renderer.filename else json_path
+        if name == "html" and config.get("html_mode") == "shell":
+            shell = generate_html_shell(
+                vendor_chart_js(output_dir, config.get("chart_js", "cdn"))
+            ).encode()
+            outputs[renderer.label] = (path, lambda f, shell=shell: f.write(shell))
+            outputs["HTML data"] = (
+                output_dir / HTML_DATA_FILENAME,
+                functools.partial(render_html_data, content, config=config),
+            )
+            continue
+        outputs[renderer.label] = (
+            path,
+            functools.partial(renderer.render, content, config=config),
+        )
+
+    def timed(label: str, path: Path, write) -> tuple[str, bool]:
+        with METRICS.renderer(label) as record:
+
+            def counted(f) -> None:
+                write(f)
+                record["bytes"] = f.size
+
+            content_hash, replaced = write_atomic(path, counted, previous.get(path.name))
+            record["written"] = replaced
+        return content_hash, replaced
+
+    with METRICS.phase("write"), ThreadPoolExecutor(
+        max_workers=len(outputs), thread_name_prefix="render"
+    ) as executor:
+        futures = {
+            path.name: executor.submit(timed, label, path, write)
+            for label, (path, write) in outputs.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    if "delta" in data:
+        delta_path = json_path.with_name(json_path.stem + DELTA_SUFFIX)
+        write_atomic(
+            delta_path,
+            lambda f: dump_json_stream(
+                data["delta"],
+                f,
+                compact=config.get("json_compact", False),
+                backend=config.get("json_backend", "auto"),
+            ),
+        )
+        outputs["Delta"] = (delta_path, None)
+        save_report_snapshot(json_path, data)
+        outputs["Snapshot"] = (_snapshot_path(json_path), None)
+
+    changed = [name for name, (_, replaced) in results.items() if replaced]
+    if changed:
+        logger.debug(f"Rewrote {', '.join(changed)}")
+
+    last_updated = data.get("last_updated") or datetime.now().isoformat()
+    stamp_body = {
+        "last_updated": last_updated,
+        "last_changed": last_updated if changed else stamp.get("last_changed", last_updated),
+        "files": {**previous, **{name: h for name, (h, _) in results.items()}},
+    }
+    write_atomic(
+        stamp_path, lambda f: f.write(json.dumps(stamp_body, indent=2).encode())
+    )
+    return {label: path for label, (path, _) in outputs.items()}
+
+
+def sync_athlete(config: dict[str, Any]) -> dict[str, Any]:
+    """Fetch one athlete's data and write its reports; returns the report data."""
+    data = fetch_intervals_data(config)
+    write_reports(data, config["output_path"], config)
+    return data
 
-        json_path = config["output_path"]
-        with open(json_path, "w") as f:
-            json.dump(data, f, indent=2)
 
-        md_path = output_dir / "latest.md"
-        with open(md_path, "w") as f:
-            f.write(generate_markdown_report(data))
+def run_batch(
+    configs: list[dict[str, Any]],
+    output_root: Path,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    engine: str = "threads",
+) -> dict[str, dict[str, Any]]:
+    """Sync several athletes with at most ``concurrency`` running at once.
+
+    With ``engine="async"`` all athletes are fetched up front through one
+    AsyncFetchEngine and only report writing uses the thread pool.
+    A failing athlete (or a roster entry load_roster marked with an ``error``)
+    is recorded and does not abort the others. The per-athlete outcome is
+    returned and written to ``output_root/batch_status.json``.
+    """
+    results: dict[str, dict[str, Any]] = {}
+    for config in configs:
+        if "error" in config:
+            logger.error(f"✗ {config['athlete_id']}: {config['error']}")
+            results[config["athlete_id"]] = {"status": "error", "error": config["error"]}
+    configs = [c for c in configs if "error" not in c]
+    METRICS.concurrent_athletes = len(configs) > 1 and (concurrency > 1 or engine == "async")
+
+    job = sync_athlete
+    if engine == "async":
+        fetched = fetch_all(configs)
+
+        def job(config: dict[str, Any]) -> dict[str, Any]:
+            data = fetched[config["athlete_id"]]
+            if isinstance(data, Exception):
+                raise data
+            write_reports(data, config["output_path"], config)
+            return data
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(job, config): config for config in configs}
+        for future in as_completed(futures):
+            config = futures[future]
+            athlete_id = config["athlete_id"]
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.error(f"✗ {athlete_id}: sync failed: {e}")
+                results[athlete_id] = {"status": "error", "error": str(e)}
+                continue
+            stats = data["quick_stats"]
+            logger.info(
+                f"✓ {athlete_id}: {stats['total_activities']} activities, TSS {stats['total_tss']}"
+            )
+            results[athlete_id] = {
+                "status": "ok",
+                "output_dir": str(config["output_path"].parent),
+                "activities": stats["total_activities"],
+            }
+
+    output_root = Path(output_root)
+    output_root.mkdir(parents=True, exist_ok=True)
+    status = {
+        "finished_at": datetime.now().isoformat(),
+        "athletes": dict(sorted(results.items())),
+    }
+    (output_root / BATCH_STATUS_FILENAME).write_text(json.dumps(status, indent=2))
+    return results
+
+
+class _DaemonControlHandler(socketserver.StreamRequestHandler):
+    """One line per connection: ``sync`` (waits for the cycle), ``status`` or ``stop``."""
+
+    def handle(self) -> None:
+        daemon = self.server.sync_daemon
+        command = self.rfile.readline().decode(errors="replace").strip().lower()
+        if command == "sync":
+            finished = daemon.trigger().wait(DAEMON_SYNC_TIMEOUT)
+            reply = {**daemon.status, "finished": finished}
+        elif command == "status":
+            reply = daemon.status
+        elif command == "stop":
+            daemon.stop()
+            reply = {**daemon.status, "state": "stopping"}
+        else:
+            reply = {"error": f"Unknown command: {command!r} (use sync, status or stop)"}
+        self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class SyncDaemon:
+    """Keep one athlete's reports up to date from a resident process.
+
+    The API session, SQLite store and in-memory response cache live across
+    cycles, so a poll is an incremental fetch over a warm connection. Reports
+    are re-rendered only when the report content differs from the previous
+    cycle; otherwise just the stamp's sync time advances. Polls are spaced by
+    ``interval`` seconds with +/- ``jitter`` spread. SIGUSR1/SIGHUP or a
+    ``sync`` line on the control socket start a cycle immediately;
+    SIGTERM/SIGINT or ``stop`` finish the running cycle and exit.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        interval: float = DAEMON_INTERVAL,
+        jitter: float = DAEMON_JITTER,
+        socket_path: Optional[Path] = None,
+        metrics_textfile: Optional[Path] = None,
+        http_address: Optional[tuple[str, int]] = None,
+    ):
+        self.config = config
+        self.interval = interval
+        self.jitter = jitter
+        self.socket_path = Path(socket_path) if socket_path else None
+        self.metrics_textfile = metrics_textfile
+        self.http_address = http_address
+        self.reports = ReportCache(config) if http_address else None
+        self.data: Optional[dict[str, Any]] = None
+        self.status: dict[str, Any] = {
+            "state": "starting",
+            "cycles": 0,
+            "last_sync": None,
+            "last_changed": None,
+            "last_error": None,
+            "next_sync": None,
+        }
+        self._digest: Optional[str] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._waiters: list[threading.Event] = []
+        self._lock = threading.Lock()
+        # Set by signal handlers, which must not take locks the main thread may hold
+        self._signal_stop = False
+        self._signal_sync = False
+
+    def trigger(self) -> threading.Event:
+        """Start a cycle now; the returned event is set once it has finished."""
+        finished = threading.Event()
+        with self._lock:
+            self._waiters.append(finished)
+        self._wake.set()
+        return finished
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+
+    def next_delay(self) -> float:
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def sync_once(self) -> bool:
+        """Run one cycle; returns whether the reports were re-rendered."""
+        METRICS.reset()
+        data = fetch_intervals_data(self.config)
+        digest = hashlib.sha256(
+            json.dumps(report_content(data), sort_keys=True, default=str).encode()
+        ).hexdigest()
+        changed = digest != self._digest
+        if changed:
+            write_reports(data, self.config["output_path"], self.config)
+            self._digest = digest
+        else:
+            touch_stamp(self.config["output_path"], data["last_updated"])
+        self.data = data
+        if self.reports is not None:
+            self.reports.publish(data)
+        write_metrics(
+            self.config["output_path"].parent / METRICS_FILENAME, self.metrics_textfile
+        )
+        return changed
+
+    def _serve_socket(self) -> socketserver.BaseServer:
+        try:
+            send_daemon_command(self.socket_path, "status")
+        except OSError:
+            self.socket_path.unlink(missing_ok=True)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = socketserver.ThreadingUnixStreamServer(
+            str(self.socket_path), _DaemonControlHandler
+        )
+        server.daemon_threads = True
+        server.sync_daemon = self
+        threading.Thread(
+            target=server.serve_forever, name="daemon-control", daemon=True
+        ).start()
+        return server
+
+    def _install_signal_handlers(self) -> dict[int, Any]:
+        """Route stop/trigger signals to the daemon; returns the handlers replaced.
+
+        Handlers run on the main thread between bytecodes, possibly while it
+        holds ``_lock`` or an Event's lock, so they only set a flag that
+        _wait() acts on.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        flags = {
+            "SIGTERM": "_signal_stop",
+            "SIGINT": "_signal_stop",
+            "SIGUSR1": "_signal_sync",
+            "SIGHUP": "_signal_sync",
+        }
+        previous = {}
+        for name, flag in flags.items():
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                previous[signum] = signal.signal(
+                    signum, lambda *_, flag=flag: setattr(self, flag, True)
+                )
+        return previous
+
+    def _wait(self, delay: float) -> None:
+        """Sleep up to ``delay`` seconds, waking early on a trigger, stop or signal."""
+        deadline = time.monotonic() + delay
+        while not self._wake.is_set():
+            if self._signal_stop:
+                self._signal_stop = False
+                self.stop()
+            if self._signal_sync:
+                self._signal_sync = False
+                self._wake.set()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._wake.wait(min(remaining, DAEMON_SIGNAL_POLL))
+
+    def run(self) -> None:
+        server = self._serve_socket() if self.socket_path else None
+        http_server = None
+        if self.http_address:
+            http_server = ReportServer(self.http_address, self.reports)
+            http_server.start()
+            host, port = http_server.server_address[:2]
+            logger.info(f"Serving reports on http://{host}:{port}/")
+        previous_handlers = self._install_signal_handlers()
+        logger.info(
+            f"Daemon started: syncing {self.config['athlete_id']} every ~{self.interval:.0f}s"
+            + (f", control socket {self.socket_path}" if server else "")
+        )
+        try:
+            while not self._stopping.is_set():
+                with self._lock:
+                    waiters, self._waiters = self._waiters, []
+                self._wake.clear()
+                self.status["state"] = "syncing"
+                try:
+                    changed = self.sync_once()
+                except Exception as e:
+                    logger.error(f"✗ Sync failed: {e}")
+                    self.status["last_error"] = str(e)
+                else:
+                    now = datetime.now().isoformat()
+                    self.status["last_sync"] = now
+                    self.status["last_error"] = None
+                    if changed:
+                        self.status["last_changed"] = now
+                    logger.info(
+                        "✓ Sync complete: reports updated"
+                        if changed
+                        else "✓ Sync complete: no changes, reports left as they are"
+                    )
+                self.status["cycles"] += 1
+                for finished in waiters:
+                    finished.set()
+                delay = self.next_delay()
+                self.status["state"] = "idle"
+                self.status["next_sync"] = (
+                    datetime.now() + timedelta(seconds=delay)
+                ).isoformat()
+                self._wait(delay)
+        finally:
+            self.status["state"] = "stopped"
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            if http_server is not None:
+                http_server.shutdown()
+                http_server.server_close()
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                self.socket_path.unlink(missing_ok=True)
+            with self._lock:
+                for finished in self._waiters:
+                    finished.set()
+            close_clients()
+            close_stores()
+            logger.info("Daemon stopped")
+
+
+def send_daemon_command(
+    socket_path: Path, command: str, timeout: Optional[float] = None
+) -> dict[str, Any]:
+    """Send one control command to a running daemon and return its JSON reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(str(socket_path))
+        conn.sendall(f"{command}\n".encode())
+        with conn.makefile("rb") as reply:
+            return json.loads(reply.readline())
+
+
+@dataclass(frozen=True)
+class _Resource:
+    """A response body with its content type and, when worth it, a gzipped copy."""
+
+    body: bytes
+    content_type: str
+    gzipped: Optional[bytes] = None
+
+
+def _resource(body: bytes, content_type: str) -> _Resource:
+    gzipped = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    return _Resource(body, content_type, gzipped)
+
+
+class ReportCache:
+    """The latest report held in memory for the HTTP server.
+
+    publish() swaps in new data; ``/report.html`` and ``/data.json`` are
+    rendered and gzipped once per content version, API slices per request.
+    ETags derive from the content version (plus the query for API slices), so
+    a poll with a matching If-None-Match is answered 304 without any work.
+    """
+
+    def __init__(self, config: Optional[dict[str, Any]] = None):
+        self.config = config or {}
+        self._current: Optional[tuple[str, dict[str, Any], dict[str, _Resource]]] = None
+        self._lock = threading.Lock()
+
+    def publish(self, data: dict[str, Any]) -> bool:
+        """Serve ``data`` from now on; returns False if its content is unchanged."""
+        content = report_content(data)
+        version = hashlib.sha256(
+            json.dumps(content, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        current = self.snapshot()
+        if current is not None and current[0] == version:
+            return False
+        rendered = {}
+        for path, render, content_type in (
+            ("/report.html", render_html, "text/html; charset=utf-8"),
+            ("/data.json", render_json, "application/json"),
+        ):
+            buffer = io.BytesIO()
+            render(content, buffer, self.config)
+            rendered[path] = _resource(buffer.getvalue(), content_type)
+        with self._lock:
+            self._current = (version, content, rendered)
+        return True
+
+    def snapshot(self) -> Optional[tuple[str, dict[str, Any], dict[str, _Resource]]]:
+        """(version, content, pre-rendered resources), or None before the first publish."""
+        with self._lock:
+            return self._current
+
+
+def _query_range(content: dict[str, Any], query: dict[str, str]) -> tuple[str, str]:
+    """``start``/``end`` query dates, defaulting to the report's date range."""
+    start = query.get("start", content["date_range"]["start"])
+    end = query.get("end", content["date_range"]["end"])
+    for value in (start, end):
+        datetime.strptime(value, "%Y-%m-%d")
+    return start, end
+
+
+def _activities_in(
+    content: dict[str, Any], start: str, end: str, sport: Optional[str] = None
+) -> list[dict[str, Any]]:
+    sport = normalize_sport(sport).lower() if sport else None
+    return [
+        a
+        for a in content["activities"]
+        if start <= LocalStore.activity_start(a)[:10] <= end
+        and (sport is None or normalize_sport(a.get("type", "Other")).lower() == sport)
+    ]
+
+
+def api_summary(content: dict[str, Any], query: dict[str, str]) -> dict[str, Any]:
+    return {
+        key: content.get(key)
+        for key in (
+            "athlete_id",
+            "date_range",
+            "weekly_summary",
+            "quick_stats",
+            "week_comparison",
+        )
+    }
+
+
+def api_activities(content: dict[str, Any], query: dict[str, str]) -> dict[str, Any]:
+    """Activities in [start, end], optionally one ``sport`` and only some ``fields``."""
+    start, end = _query_range(content, query)
+    activities = sorted(
+        _activities_in(content, start, end, query.get("sport")),
+        key=LocalStore.activity_start,
+    )
+    if query.get("fields"):
+        fields = [f.strip() for f in query["fields"].split(",") if f.strip()]
+        activities = [{f: a.get(f) for f in fields} for a in activities]
+    return {"start": start, "end": end, "count": len(activities), "activities": activities}
+
+
+def api_sport_totals(content: dict[str, Any], query: dict[str, str]) -> dict[str, Any]:
+    start, end = _query_range(content, query)
+    if (start, end) == (content["date_range"]["start"], content["date_range"]["end"]):
+        totals = content["sport_totals"]
+    else:
+        totals = compute_sport_totals(_activities_in(content, start, end))
+    return {"start": start, "end": end, "sport_totals": totals}
+
+
+API_ROUTES: dict[str, Callable[[dict[str, Any], dict[str, str]], Any]] = {
+    "/api/summary": api_summary,
+    "/api/activities": api_activities,
+    "/api/sport-totals": api_sport_totals,
+}
+
+
+class _ReportRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self._respond(send_body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(send_body=False)
+
+    def _respond(self, send_body: bool) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/":
+            self.send_response(302)
+            self.send_header("Location", "/report.html")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        route = API_ROUTES.get(url.path)
+        current = self.server.reports.snapshot()
+        if current is None:
+            self._send_error(503, "No report has been synced yet", send_body)
+            return
+        version, content, rendered = current
+        resource = rendered.get(url.path)
+        if resource is None and route is None:
+            self._send_error(404, f"Not found: {url.path}", send_body)
+            return
+
+        etag = f'"{version}"'
+        if route is not None:
+            etag = f'"{version}-{hashlib.sha1(url.query.encode()).hexdigest()[:8]}"'
+        if etag in self._if_none_match():
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        if resource is None:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body = json.dumps(route(content, query), default=str).encode()
+            except ValueError as e:
+                self._send_error(400, str(e), send_body)
+                return
+            resource = _resource(body, "application/json")
+
+        body = resource.body
+        gzipped = resource.gzipped is not None and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", resource.content_type)
+        if gzipped:
+            body = resource.gzipped
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _if_none_match(self) -> set[str]:
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+    def _send_error(self, status: int, message: str, send_body: bool) -> None:
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class ReportServer(ThreadingHTTPServer):
+    """HTTP server for a ReportCache: the HTML report, the raw data and a small JSON API."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], reports: ReportCache):
+        super().__init__(address, _ReportRequestHandler)
+        self.reports = reports
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.serve_forever, name="report-server", daemon=True
+        )
+        thread.start()
+        return thread
+
 
-        csv_path = output_dir / "latest.csv"
-        with open(csv_path, "w") as f:
-            f.write(generate_csv(data))
+def _shared_options(defaults: bool) -> argparse.ArgumentParser:
+    """Options accepted both before and after the subcommand.
 
-        html_path = output_dir / "latest.html"
-        with open(html_path, "w") as f:
-            f.write(generate_html_report(data))
+    Subcommands get them with suppressed defaults, so a value given before
+    the subcommand is not overwritten by the subparser's default.
+    """
+
+    def default(value: Any) -> Any:
+        return value if defaults else argparse.SUPPRESS
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--formats",
+        type=parse_formats,
+        default=default(None),
+        help="Comma-separated report formats: json, markdown, csv, html "
+        "(default: $REPORT_FORMATS or all)",
+    )
+    options.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=Path("sync.prof"),
+        default=default(None),
+        help="Write cProfile stats for the run (default file: sync.prof; read with pstats)",
+    )
+    options.add_argument(
+        "--metrics-textfile",
+        type=Path,
+        default=default(os.environ.get("PROMETHEUS_TEXTFILE") or None),
+        help="Also write run metrics in Prometheus textfile-collector format "
+        "(default: $PROMETHEUS_TEXTFILE)",
+    )
+    return options
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, parents=[_shared_options(True)])
+    shared = _shared_options(False)
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser(
+        "batch", parents=[shared], help="Sync every athlete in a roster file"
+    )
+    batch.add_argument("roster", type=Path, help="JSON roster of athletes")
+    batch.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("athletes"),
+        help="Root directory for per-athlete reports (default: ./athletes)",
+    )
+    batch.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"Athletes synced at once (default: {DEFAULT_BATCH_CONCURRENCY})",
+    )
+    batch.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default=os.environ.get("FETCH_ENGINE", "threads").lower(),
+        help="Fetch engine (default: $FETCH_ENGINE or threads)",
+    )
+
+    daemon = argparse.ArgumentParser(add_help=False)
+    daemon.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.environ.get("SYNC_INTERVAL", str(DAEMON_INTERVAL))),
+        help=f"Seconds between polls (default: $SYNC_INTERVAL or {DAEMON_INTERVAL:.0f})",
+    )
+    daemon.add_argument(
+        "--jitter",
+        type=float,
+        default=DAEMON_JITTER,
+        help=f"Random spread of each wait as a fraction of the interval (default: {DAEMON_JITTER})",
+    )
+    daemon.add_argument(
+        "--socket",
+        type=Path,
+        default=os.environ.get("DAEMON_SOCKET") or CACHE_DIR / DAEMON_SOCKET_FILENAME,
+        help="Unix control socket (default: $DAEMON_SOCKET or .cache/daemon.sock)",
+    )
+    daemon.add_argument(
+        "--send",
+        choices=("sync", "status", "stop"),
+        help="Send a command to the running daemon instead of starting one",
+    )
+    daemon.add_argument(
+        "--http-host",
+        default="127.0.0.1",
+        help="Address the report server binds to (default: 127.0.0.1)",
+    )
+    subparsers.add_parser(
+        "daemon", parents=[shared, daemon], help="Stay resident and keep the reports up to date"
+    ).add_argument(
+        "--http-port",
+        type=int,
+        default=int(os.environ.get("REPORT_SERVER_PORT", "0")),
+        help="Also serve the reports over HTTP on this port "
+        "(default: $REPORT_SERVER_PORT or 0 = off)",
+    )
+    subparsers.add_parser(
+        "serve", parents=[shared, daemon], help="Run the daemon with the HTTP report server"
+    ).add_argument(
+        "--http-port",
+        type=int,
+        default=int(os.environ.get("REPORT_SERVER_PORT", str(REPORT_SERVER_PORT))),
+        help=f"Report server port (default: $REPORT_SERVER_PORT or {REPORT_SERVER_PORT})",
+    )
+    return parser.parse_args(argv)
+
+
+def main_daemon(args: argparse.Namespace) -> None:
+    if args.send:
+        try:
+            reply = send_daemon_command(args.socket, args.send, DAEMON_SYNC_TIMEOUT + 5)
+        except OSError as e:
+            logger.error(f"✗ No daemon reachable on {args.socket}: {e}")
+            sys.exit(1)
+        print(json.dumps(reply, indent=2))
+        if args.send == "sync" and (not reply.get("finished") or reply.get("last_error")):
+            logger.error(f"✗ Daemon sync failed: {reply.get('last_error') or 'timed out'}")
+            sys.exit(1)
+        return
+    config = get_config()
+    if args.formats:
+        config["formats"] = args.formats
+    SyncDaemon(
+        config,
+        args.interval,
+        args.jitter,
+        args.socket,
+        args.metrics_textfile,
+        (args.http_host, args.http_port) if args.http_port else None,
+    ).run()
+
+
+def main_batch(args: argparse.Namespace) -> None:
+    configs = load_roster(args.roster, args.output_dir)
+    if args.formats:
+        for config in configs:
+            config["formats"] = args.formats
+    logger.info(
+        f"Starting batch sync of {len(configs)} athletes at {datetime.now().isoformat()}"
+    )
+    results = run_batch(configs, args.output_dir, args.concurrency, args.engine)
+    write_metrics(args.output_dir / METRICS_FILENAME, args.metrics_textfile)
+    failed = sorted(a for a, r in results.items() if r["status"] != "ok")
+    logger.info(
+        f"Batch complete: {len(results) - len(failed)} succeeded, {len(failed)} failed"
+    )
+    if failed:
+        logger.error(f"  Failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def main_sync(args: argparse.Namespace) -> None:
+    logger.info(f"Starting sync at {datetime.now().isoformat()}")
+
+    try:
+        config = get_config()
+        if args.formats:
+            config["formats"] = args.formats
+        data = fetch_intervals_data(config)
+        paths = write_reports(data, config["output_path"], config)
+        metrics_path = config["output_path"].parent / METRICS_FILENAME
+        write_metrics(metrics_path, args.metrics_textfile)
 
         stats = data["quick_stats"]
         summary = data["weekly_summary"]
@@ -1137,15 +5072,83 @@ def main() -> None:
             f"  Fitness (CTL): {summary['ctl']}, Fatigue (ATL): {summary['atl']}, Form (TSB): {summary['tsb']}"
         )
         logger.info(f"  Reports saved:")
-        logger.info(f"    - JSON: {json_path}")
-        logger.info(f"    - Markdown: {md_path}")
-        logger.info(f"    - CSV: {csv_path}")
-        logger.info(f"    - HTML: {html_path}")
+        for label, path in paths.items():
+            logger.info(f"    - {label}: {path}")
+        phases = METRICS.to_dict()["phases"]
+        logger.info(
+            "  Timings: "
+            + ", ".join(f"{name} {t['wall_s']:.2f}s" for name, t in phases.items())
+            + f" (metrics: {metrics_path})"
+        )
 
     except Exception as e:
         logger.error(f"✗ Sync failed: {e}")
         raise
 
 
+class RunProfiler:
+    """cProfile for a whole run: the main thread and every thread started meanwhile.
+
+    From Python 3.12 cProfile runs on sys.monitoring, which sees every thread
+    but allows only one profiler per process, so a single profiler is used.
+    Before that cProfile only sees the thread that enabled it, and the fetch,
+    window, stream and render work all runs on worker threads: each new thread
+    gets its own profiler through threading.setprofile and stop() merges them
+    into one pstats file.
+    """
+
+    per_thread = sys.version_info < (3, 12)
+
+    def __init__(self):
+        self._profilers: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _profile_thread(self, *args) -> None:
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        profiler.enable()
+
+    def start(self) -> None:
+        if self.per_thread:
+            threading.setprofile(self._profile_thread)
+        self._profile_thread()
+
+    def stop(self, path: Path) -> None:
+        if self.per_thread:
+            threading.setprofile(None)
+        with self._lock:
+            main_profiler, *thread_profilers = self._profilers
+        for profiler in self._profilers:
+            profiler.disable()
+        stats = pstats.Stats(main_profiler)
+        for profiler in thread_profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:  # the thread made no profiled calls
+                continue
+        stats.dump_stats(path)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    METRICS.reset()
+    profiler = RunProfiler() if args.profile else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        if args.command == "batch":
+            main_batch(args)
+        elif args.command in ("daemon", "serve"):
+            main_daemon(args)
+        else:
+            main_sync(args)
+    finally:
+        if profiler is not None:
+            profiler.stop(args.profile)
+            logger.info(f"Profile written to {args.profile}")
+
+
 if __name__ == "__main__":
     main()
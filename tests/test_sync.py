@@ -1,14 +1,22 @@
 import os
 import json
 import pytest
+import requests
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
 
 sys.path.insert(0, "/Users/wielkikrzychmbp/Documents/Intervals-Section-11")
 
 from sync import (
+    AsyncFetchEngine,
     validate_athlete_id,
     get_config,
     get_headers,
@@ -17,6 +25,64 @@ from sync import (
     _validate_numeric,
     _read_cache,
     _write_cache,
+    IntervalsClient,
+    get_client,
+    close_clients,
+    fetch_profile,
+    sync_wellness,
+    LocalStore,
+    build_report_data,
+    fetch_activities,
+    load_roster,
+    run_batch,
+    fetch_all,
+    RetryPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    ResponseCache,
+    _cached_get,
+    CachePolicy,
+    cache_policy_for,
+    build_cache_policies,
+    save_report_snapshot,
+    Renderer,
+    load_report_snapshot,
+    sync_athlete,
+    get_store,
+    close_stores,
+    parse_cache_policies,
+    aggregate,
+    aggregate_activities,
+    compute_sport_totals,
+    compute_zone_distribution,
+    compute_weekly_tss_distribution,
+    compute_daily_load,
+    aggregate_activities_columnar,
+    WellnessColumns,
+    compute_pmc,
+    update_pmc,
+    sync_activities,
+    write_json_stream,
+    write_reports,
+    parse_formats,
+    parse_args,
+    generate_html_report,
+    html_report_payload,
+    lttb_indices,
+    minmax_indices,
+    export_tables,
+    StreamStore,
+    sync_streams,
+    mean_max_curve,
+    update_curves,
+    SyncMetrics,
+    RunProfiler,
+    main,
+    SyncDaemon,
+    send_daemon_command,
+    ReportCache,
+    ReportServer,
 )
 
 
@@ -92,6 +158,25 @@ class TestGetConfig:
         config = get_config()
         assert config["verify_ssl"] is False
 
+    @pytest.mark.parametrize("value", ["Python", "AUTO"])
+    def test_analytics_backend(self, value):
+        env = {"ATHLETE_ID": "test123", "INTERVALS_KEY": "key123", "ANALYTICS_BACKEND": value}
+        with patch.dict(os.environ, env, clear=True):
+            assert get_config()["analytics_backend"] == value.lower()
+
+    def test_analytics_backend_is_validated(self, monkeypatch):
+        env = {"ATHLETE_ID": "test123", "INTERVALS_KEY": "key123", "ANALYTICS_BACKEND": "numpi"}
+        with patch.dict(os.environ, env, clear=True):
+            with pytest.raises(ValueError, match="Unknown analytics backend"):
+                get_config()
+        monkeypatch.setattr("sync.np", None)
+        env["ANALYTICS_BACKEND"] = "numpy"
+        with patch.dict(os.environ, env, clear=True):
+            with pytest.raises(ValueError, match="NumPy is not installed"):
+                get_config()
+        with pytest.raises(ValueError, match="NumPy is not installed"):
+            aggregate([], 14, "numpy")
+
     @patch.dict(
         os.environ,
         {"ATHLETE_ID": "test123", "INTERVALS_KEY": "key123", "SYNC_DAYS": "30"},
@@ -219,3 +304,1351 @@ class TestCache:
         monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
         _write_cache("key/with/slashes", "value")
         assert _read_cache("key/with/slashes") == "value"
+
+
+class TestIntervalsClient:
+    def test_session_is_pooled_and_negotiates_gzip(self):
+        client = IntervalsClient("i123", "key", pool_size=5)
+        adapter = client.session.get_adapter("https://intervals.icu")
+        assert adapter._pool_maxsize == 5
+        assert "gzip" in client.session.headers["Accept-Encoding"]
+        assert client.session.headers["Authorization"].startswith("Basic ")
+        assert client.base_url == "https://intervals.icu/api/v1/athlete/i123"
+
+    def test_get_client_reuses_session(self):
+        config = {"athlete_id": "i123", "api_key": "key", "verify_ssl": True}
+        try:
+            first = get_client(config)
+            assert get_client(config) is first
+            assert get_client({**config, "athlete_id": "i456"}) is not first
+        finally:
+            close_clients()
+
+    def test_fetch_profile_uses_session_and_redacts_id(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        client = IntervalsClient("i123", "key")
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {"id": "i123", "name": "Test"}
+        get = MagicMock(return_value=response)
+        monkeypatch.setattr(client.session, "get", get)
+        profile = fetch_profile(client)
+        assert profile == {"id": "REDACTED", "name": "Test"}
+        assert get.call_args.args[0].endswith("/athlete/i123/profile")
+
+
+class TestSyncWellness:
+    def _fake_fetch(self, calls, rows):
+        def fake(client, start, end):
+            calls.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+            return rows
+        return fake
+
+    def test_first_run_fetches_full_window(self, tmp_path, monkeypatch):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        calls = []
+        monkeypatch.setattr(
+            "sync.fetch_wellness", self._fake_fetch(calls, [{"id": "2026-01-05"}])
+        )
+        client = IntervalsClient("i1", "key")
+        result = sync_wellness(client, store, datetime(2026, 1, 1), datetime(2026, 1, 10))
+        assert calls == [("2026-01-01", "2026-01-10")]
+        assert result == [{"id": "2026-01-05"}]
+
+    def test_later_run_fetches_since_high_water_and_merges(self, tmp_path, monkeypatch):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        client = IntervalsClient("i1", "key")
+        calls = []
+        monkeypatch.setattr(
+            "sync.fetch_wellness",
+            self._fake_fetch(calls, [{"id": "2026-01-01"}, {"id": "2026-01-09", "hrv": 50}]),
+        )
+        sync_wellness(client, store, datetime(2026, 1, 1), datetime(2026, 1, 10))
+
+        monkeypatch.setattr(
+            "sync.fetch_wellness",
+            self._fake_fetch(calls, [{"id": "2026-01-09", "hrv": 60}, {"id": "2026-01-11"}]),
+        )
+        result = sync_wellness(client, store, datetime(2026, 1, 2), datetime(2026, 1, 11))
+        assert calls[-1] == ("2026-01-07", "2026-01-11")
+        assert [w["id"] for w in result] == ["2026-01-09", "2026-01-11"]
+        assert result[0]["hrv"] == 60
+
+    def test_wider_window_refetches_everything(self, tmp_path, monkeypatch):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        client = IntervalsClient("i1", "key")
+        calls = []
+        monkeypatch.setattr("sync.fetch_wellness", self._fake_fetch(calls, []))
+        sync_wellness(client, store, datetime(2026, 1, 5), datetime(2026, 1, 10))
+        sync_wellness(client, store, datetime(2026, 1, 1), datetime(2026, 1, 10))
+        assert calls[-1] == ("2026-01-01", "2026-01-10")
+
+
+class TestLocalStore:
+    def test_uses_wal_and_queries_by_date(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        store.upsert_activities(
+            "i1",
+            [
+                {"id": 1, "start_date_local": "2026-01-01T08:00:00"},
+                {"id": 2, "start_date_local": "2026-01-05T08:00:00"},
+                {"id": 3, "start_date_local": "2026-01-10T08:00:00"},
+            ],
+        )
+        store.upsert_activities("i2", [{"id": 4, "start_date_local": "2026-01-05T09:00:00"}])
+        result = store.activities_between("i1", "2026-01-02", "2026-01-10")
+        assert [a["id"] for a in result] == [3, 2]
+
+    def test_upsert_updates_existing_rows(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        store.upsert_wellness("i1", [{"id": "2026-01-01", "hrv": 40}])
+        store.upsert_wellness("i1", [{"id": "2026-01-01", "hrv": 55}])
+        assert store.wellness_between("i1", "2026-01-01", "2026-01-01") == [
+            {"id": "2026-01-01", "hrv": 55}
+        ]
+
+    def test_replace_activities_drops_deleted_rows(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        store.upsert_activities(
+            "i1",
+            [
+                {"id": 1, "start_date_local": "2026-01-01T08:00:00"},
+                {"id": 2, "start_date_local": "2026-01-05T08:00:00"},
+            ],
+        )
+        store.replace_activities(
+            "i1", "2026-01-04", "2026-01-06", [{"id": 5, "start_date_local": "2026-01-06T08:00:00"}]
+        )
+        ids = [a["id"] for a in store.activities_between("i1", "2026-01-01", "2026-01-31")]
+        assert ids == [5, 1]
+
+    def test_build_report_data_without_network(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        store.upsert_activities(
+            "i1",
+            [{"id": 1, "start_date_local": "2026-01-05T08:00:00", "icu_training_load": 80}],
+        )
+        store.upsert_wellness("i1", [{"id": "2026-01-05", "ctl": 50, "atl": 40}])
+        store.set_profile("i1", {"name": "Test"})
+        data = build_report_data(store, "i1", datetime(2026, 1, 1), datetime(2026, 1, 8))
+        assert data["quick_stats"]["total_tss"] == 80
+        assert data["weekly_summary"]["tsb"] == 10
+        assert data["profile"] == {"name": "Test"}
+        assert data["date_range"] == {"start": "2026-01-01", "end": "2026-01-08"}
+
+
+class TestBatch:
+    @patch.dict(os.environ, {"TEAM_KEY": "secret"}, clear=True)
+    def test_load_roster(self, tmp_path):
+        roster = tmp_path / "roster.json"
+        roster.write_text(
+            json.dumps(
+                [
+                    {"athlete_id": "i1", "api_key": "k1", "days": 14},
+                    {"athlete_id": "i2", "api_key_env": "TEAM_KEY"},
+                ]
+            )
+        )
+        configs = load_roster(roster, tmp_path / "out")
+        assert [c["athlete_id"] for c in configs] == ["i1", "i2"]
+        assert configs[0]["days"] == 14
+        assert configs[1]["days"] == 28
+        assert configs[1]["api_key"] == "secret"
+        assert configs[1]["output_path"] == (tmp_path / "out" / "i2" / "latest.json").resolve()
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_load_roster_bad_entry_is_recorded_not_raised(self, tmp_path, monkeypatch):
+        roster = tmp_path / "roster.json"
+        roster.write_text(
+            json.dumps({"athletes": [{"athlete_id": "i1"}, {"athlete_id": "i2", "api_key": "k"}]})
+        )
+        configs = load_roster(roster, tmp_path)
+        assert configs[0] == {"athlete_id": "i1", "error": "Missing API key for athlete i1"}
+        assert configs[1]["api_key"] == "k"
+
+        monkeypatch.setattr("sync.sync_athlete", lambda config: {"quick_stats": {"total_activities": 0, "total_tss": 0}})
+        results = run_batch(configs, tmp_path)
+        assert results["i1"] == {"status": "error", "error": "Missing API key for athlete i1"}
+        assert results["i2"]["status"] == "ok"
+        status = json.loads((tmp_path / "batch_status.json").read_text())
+        assert status["athletes"]["i1"]["status"] == "error"
+
+    def test_failure_does_not_abort_batch(self, tmp_path, monkeypatch):
+        def fake_sync(config):
+            if config["athlete_id"] == "bad":
+                raise RuntimeError("boom")
+            return {"quick_stats": {"total_activities": 3, "total_tss": 120}}
+
+        monkeypatch.setattr("sync.sync_athlete", fake_sync)
+        configs = [
+            {"athlete_id": a, "output_path": tmp_path / a / "latest.json"}
+            for a in ("good", "bad")
+        ]
+        results = run_batch(configs, tmp_path, concurrency=2)
+        assert results["good"]["status"] == "ok"
+        assert results["bad"] == {"status": "error", "error": "boom"}
+        status = json.loads((tmp_path / "batch_status.json").read_text())
+        assert set(status["athletes"]) == {"good", "bad"}
+
+    def test_activity_cache_is_per_athlete(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        start, end = datetime(2026, 1, 1), datetime(2026, 1, 7)
+        clients = [IntervalsClient("i1", "k"), IntervalsClient("i2", "k")]
+        for i, client in enumerate(clients):
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = [{"id": i}]
+            monkeypatch.setattr(client, "request", MagicMock(return_value=response))
+        assert fetch_activities(clients[0], start, end) == [{"id": 0}]
+        assert fetch_activities(clients[1], start, end) == [{"id": 1}]
+
+    def test_long_range_is_fetched_per_month(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        client = IntervalsClient("i1", "k")
+
+        def respond(path, params=None, headers=None):
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = [
+                {"id": params["oldest"], "start_date_local": f"{params['oldest']}T08:00:00"},
+                {"id": params["newest"], "start_date_local": f"{params['newest']}T08:00:00"},
+            ]
+            return response
+
+        request = MagicMock(side_effect=respond)
+        monkeypatch.setattr(client, "request", request)
+        result = fetch_activities(client, datetime(2025, 1, 15), datetime(2025, 4, 10))
+        windows = sorted(
+            (c.kwargs["params"]["oldest"], c.kwargs["params"]["newest"]) for c in request.call_args_list
+        )
+        assert windows == [
+            ("2025-01-01", "2025-01-31"),
+            ("2025-02-01", "2025-02-28"),
+            ("2025-03-01", "2025-03-31"),
+            ("2025-04-01", "2025-04-10"),
+        ]
+        assert [a["id"] for a in result] == [
+            "2025-01-31", "2025-02-01", "2025-02-28", "2025-03-01", "2025-03-31", "2025-04-01", "2025-04-10",
+        ]
+
+        request.reset_mock()
+        fetch_activities(client, datetime(2025, 1, 20), datetime(2025, 4, 12))
+        assert [c.kwargs["params"]["oldest"] for c in request.call_args_list] == ["2025-04-01"]
+
+
+class _StubIntervalsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = urlparse(self.path).path
+        athlete_id = path.split("/")[4]
+        endpoint = path.rsplit("/", 1)[-1]
+        today = datetime.now().strftime("%Y-%m-%d")
+        bodies = {
+            "wellness": [{"id": today, "ctl": 40, "atl": 30}],
+            "activities": [
+                {"id": f"{athlete_id}-1", "start_date_local": f"{today}T07:00:00", "icu_training_load": 60}
+            ],
+            "profile": {"id": athlete_id, "name": athlete_id},
+        }
+        if endpoint not in bodies:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.server.hits.append(path)
+        body = json.dumps(bodies[endpoint]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubIntervalsHandler)
+    server.hits = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestAsyncEngine:
+    def test_fetch_all_against_stub_server(self, stub_api, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        api_url = f"http://127.0.0.1:{stub_api.server_address[1]}/api/v1"
+        configs = [
+            {
+                "athlete_id": athlete_id,
+                "api_key": "k",
+                "verify_ssl": True,
+                "days": 7,
+                "api_url": api_url,
+                "store_path": tmp_path / "store.sqlite3",
+            }
+            for athlete_id in ("i1", "i2")
+        ]
+        try:
+            results = fetch_all(configs, rate=0)
+        finally:
+            close_clients()
+        assert results["i1"]["quick_stats"]["total_tss"] == 60
+        assert results["i2"]["activities"][0]["id"] == "i2-1"
+        assert results["i2"]["profile"] == {"id": "REDACTED", "name": "i2"}
+        assert len(stub_api.hits) == 6
+
+    def test_in_flight_cap_applies_to_each_request(self, stub_api):
+        policy = RetryPolicy(bucket=TokenBucket(0), max_in_flight=3)
+        client = IntervalsClient(
+            "i1",
+            "k",
+            api_url=f"http://127.0.0.1:{stub_api.server_address[1]}/api/v1",
+            retry_policy=policy,
+        )
+        active = peak = 0
+        lock = threading.Lock()
+        original = client.session.get
+
+        def tracked_get(*args, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with lock:
+                    active -= 1
+
+        client.session.get = tracked_get
+        with client, ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda _: client.request("/profile"), range(20)))
+        assert peak == 3
+
+    def test_engine_clients_use_the_engine_policy(self):
+        async def run():
+            async with AsyncFetchEngine(max_in_flight=5, rate=0) as engine:
+                config = {"athlete_id": "i1", "api_key": "k", "verify_ssl": True}
+                client = engine.client_for(config)
+                assert engine.client_for(config) is client
+                return client.retry_policy is engine.retry_policy
+
+        assert asyncio.run(run())
+
+
+def _http_error(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+class TestRetryPolicy:
+    def _policy(self, **kwargs):
+        return RetryPolicy(bucket=TokenBucket(0), breaker=CircuitBreaker(100), **kwargs)
+
+    def test_retries_transient_errors(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("sync.time.sleep", sleeps.append)
+        calls = MagicMock(side_effect=[requests.ConnectionError("reset"), _http_error(503), "ok"])
+        calls.__name__ = "fetch"
+        assert self._policy().call(calls) == "ok"
+        assert calls.call_count == 3
+        assert len(sleeps) == 2
+
+    def test_does_not_retry_client_errors(self, monkeypatch):
+        monkeypatch.setattr("sync.time.sleep", lambda s: pytest.fail("slept"))
+        for status in (401, 404):
+            calls = MagicMock(side_effect=_http_error(status))
+            calls.__name__ = "fetch"
+            with pytest.raises(Exception, match=str(status)):
+                self._policy().call(calls)
+            assert calls.call_count == 1
+
+    def test_honours_retry_after(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr("sync.time.sleep", sleeps.append)
+        calls = MagicMock(side_effect=[_http_error(429, {"Retry-After": "7"}), "ok"])
+        calls.__name__ = "fetch"
+        assert self._policy().call(calls) == "ok"
+        assert sleeps == [7.0]
+
+    def test_jitter_stays_within_bounds(self):
+        policy = self._policy(base_delay=1.0, max_delay=10.0)
+        delays = [policy.next_delay(2.0) for _ in range(200)]
+        assert all(1.0 <= d <= 6.0 for d in delays)
+        assert len(set(delays)) > 1
+        assert policy.next_delay(100.0) <= 10.0
+
+    def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr("sync.time.sleep", lambda s: None)
+        calls = MagicMock(side_effect=_http_error(500))
+        calls.__name__ = "fetch"
+        with pytest.raises(Exception, match="500"):
+            self._policy(max_retries=2).call(calls)
+        assert calls.call_count == 3
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_recovers(self, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr("sync.time.monotonic", lambda: clock[0])
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        clock[0] += 31
+        breaker.before_call()  # half-open trial call
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert not breaker.is_open
+        breaker.before_call()
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        cache = ResponseCache(memory_entries=2, disk_entries=3)
+        monkeypatch.setattr("sync.RESPONSE_CACHE", cache)
+        return cache
+
+    def _client(self, monkeypatch, status=200, body=None, headers=None):
+        client = IntervalsClient("i1", "k")
+        response = MagicMock(status_code=status, headers=headers or {})
+        response.json.return_value = body
+        request = MagicMock(return_value=response)
+        monkeypatch.setattr(client, "request", request)
+        return client, request
+
+    def _expire(self, cache, key, seconds=600):
+        entry = cache.lookup(key)
+        entry["cached_at"] -= seconds
+        return entry
+
+    def test_memory_tier_serves_without_disk(self, cache, tmp_path):
+        cache.store("k1", [1, 2])
+        (tmp_path / "k1.json").unlink()
+        assert cache.lookup("k1")["value"] == [1, 2]
+
+    def test_memory_tier_is_lru_bounded(self, cache):
+        for key in ("a", "b", "c"):
+            cache.store(key, key)
+        assert len(cache._memory) == 2
+
+    def test_disk_tier_evicts_oldest_files(self, cache, tmp_path):
+        for i in range(5):
+            cache.store(f"k{i}", i)
+            os.utime(tmp_path / f"k{i}.json", (1000 + i, 1000 + i))
+        cache.store("k5", 5)
+        assert sorted(p.name for p in tmp_path.glob("*.json")) == [
+            "k3.json",
+            "k4.json",
+            "k5.json",
+        ]
+
+    def test_disk_tier_scans_only_when_over_the_cap(self, cache, monkeypatch):
+        scans = []
+        real_scandir = os.scandir
+        monkeypatch.setattr(
+            "sync.os.scandir", lambda path: scans.append(path) or real_scandir(path)
+        )
+        for i in range(3):
+            cache.store(f"k{i}", i)
+            cache.store(f"k{i}", i)
+        assert len(scans) == 1
+        cache.store("k3", 3)
+        assert len(scans) == 2
+
+    def test_expired_entry_is_revalidated_with_etag(self, cache, monkeypatch):
+        cache.store("k", ["old"], etag='"v1"')
+        self._expire(cache, "k")
+        client, request = self._client(monkeypatch, status=304)
+        assert _cached_get(client, "k", "/activities") == ["old"]
+        assert request.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+        assert cache.age(cache.lookup("k")) < 5
+
+    def test_changed_response_replaces_entry(self, cache, monkeypatch):
+        cache.store("k", ["old"], etag='"v1"')
+        self._expire(cache, "k")
+        client, _ = self._client(monkeypatch, body=["new"], headers={"ETag": '"v2"'})
+        assert _cached_get(client, "k", "/activities") == ["new"]
+        assert cache.lookup("k")["etag"] == '"v2"'
+
+    def test_stale_while_revalidate_serves_stale_and_refreshes(self, cache, monkeypatch):
+        cache.stale_while_revalidate = 3600
+        cache.store("k", ["stale"])
+        self._expire(cache, "k")
+        client, request = self._client(monkeypatch, body=["fresh"])
+        assert _cached_get(client, "k", "/activities") == ["stale"]
+        for thread in threading.enumerate():
+            if thread.name == "refresh-k":
+                thread.join(5)
+        assert request.call_count == 1
+        assert cache.lookup("k")["value"] == ["fresh"]
+
+
+class TestCachePolicies:
+    def test_closed_ranges_use_closed_policy(self):
+        last_month = datetime.now() - timedelta(days=30)
+        assert cache_policy_for("activities", last_month).ttl == float("inf")
+        assert cache_policy_for("activities", datetime.now()).ttl == 300
+        assert cache_policy_for("wellness", last_month).ttl == 86400
+        assert cache_policy_for("profile").ttl == 7 * 86400
+
+    def test_ranges_within_the_sync_overlap_stay_open(self):
+        now = datetime.now()
+        assert cache_policy_for("activities", now - timedelta(days=7)).ttl == 300
+        assert cache_policy_for("activities", now - timedelta(days=8)).ttl == float("inf")
+        assert cache_policy_for("wellness", now - timedelta(days=3)).ttl == 300
+        assert cache_policy_for("wellness", now - timedelta(days=4)).ttl == 86400
+
+    def test_config_overrides(self):
+        overrides = parse_cache_policies('{"profile": {"ttl": 60, "max_stale": 600}}')
+        policies = build_cache_policies({"cache_policies": overrides, "stale_while_revalidate": 5})
+        assert cache_policy_for("profile", policies=policies) == CachePolicy(ttl=60, max_stale=600)
+        assert cache_policy_for("wellness", policies=policies).max_stale == 5
+        assert cache_policy_for("profile").ttl == 7 * 86400
+
+    def test_policies_are_per_client(self):
+        base = {"api_key": "k", "verify_ssl": True}
+        overrides = parse_cache_policies('{"profile": {"ttl": 60}}')
+        try:
+            tuned = get_client({**base, "athlete_id": "i1", "cache_policies": overrides})
+            default = get_client({**base, "athlete_id": "i2"})
+            assert tuned.cache_policies["profile"].ttl == 60
+            assert default.cache_policies["profile"].ttl == 7 * 86400
+        finally:
+            close_clients()
+
+    def test_invalid_overrides_raise(self):
+        with pytest.raises(ValueError, match="Unknown cache policy endpoint"):
+            parse_cache_policies('{"streams": {"ttl": 1}}')
+        with pytest.raises(ValueError, match="field"):
+            parse_cache_policies('{"profile": {"tll": 1}}')
+
+    def test_profile_is_cached(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        client = IntervalsClient("i1", "k")
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {"id": "i1", "name": "A"}
+        request = MagicMock(return_value=response)
+        monkeypatch.setattr(client, "request", request)
+        assert fetch_profile(client) == {"id": "REDACTED", "name": "A"}
+        assert fetch_profile(client) == {"id": "REDACTED", "name": "A"}
+        assert request.call_count == 1
+        assert '"i1"' not in (tmp_path / "profile_i1.json").read_text()
+
+    def test_no_revalidate_sends_plain_get(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path)
+        cache = ResponseCache()
+        monkeypatch.setattr("sync.RESPONSE_CACHE", cache)
+        cache.store("k", ["old"], etag='"v1"')
+        cache.lookup("k")["cached_at"] -= 600
+        client = IntervalsClient("i1", "k")
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = ["new"]
+        request = MagicMock(return_value=response)
+        monkeypatch.setattr(client, "request", request)
+        assert _cached_get(client, "k", "/x", policy=CachePolicy(ttl=300, revalidate=False)) == ["new"]
+        assert request.call_args.kwargs["headers"] is None
+
+
+def _synthetic_activities(count, seed=7):
+    import random
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    activities = []
+    for i in range(count):
+        when = now - timedelta(days=rng.uniform(0, 30))
+        activity = {
+            "id": f"i{i}",
+            "type": rng.choice(["Ride", "VirtualRide", "Run", "TrailRun", "Swim", "WeightTraining"]),
+            "moving_time": rng.choice([rng.randint(600, 14400), None, 3600.5, 100000]),
+            "distance": rng.uniform(0, 120000),
+            "icu_joules": rng.choice([rng.uniform(0, 3e6), None]),
+            "calories": rng.uniform(0, 2000),
+            "icu_training_load": rng.choice([rng.uniform(0, 250), None, 0]),
+            "icu_zone_times": rng.choice(
+                [None, [{"id": f"Z{z}", "secs": rng.randint(0, 3000)} for z in range(1, 8)] + [{"id": "SS", "secs": None}]]
+            ),
+        }
+        style = i % 4
+        if style == 0:
+            activity["start_date_local"] = when.strftime("%Y-%m-%dT%H:%M:%S")
+        elif style == 1:
+            activity["startDate"] = when.strftime("%Y-%m-%dT%H:%M:%SZ")
+        elif style == 2:
+            activity["start_date_local"] = when.strftime("%Y-%m-%dT%H:%M:%S")
+            activity["startDate"] = when.strftime("%Y-%m-%dT%H:%M:%S")
+        else:
+            activity["start_date_local"] = "not-a-date"
+        activities.append(activity)
+    return activities
+
+
+class TestAggregateActivities:
+    def test_matches_individual_functions(self):
+        activities = _synthetic_activities(500)
+        result = aggregate_activities(activities, 28)
+        assert result["quick_stats"] == calculate_stats(activities, 28)
+        assert result["sport_totals"] == compute_sport_totals(activities)
+        assert list(result["zone_distribution"].items()) == list(
+            compute_zone_distribution(activities).items()
+        )
+        assert result["week_comparison"] == compute_week_comparison(activities)
+        assert result["weekly_tss"] == compute_weekly_tss_distribution(activities)
+        assert result["daily_load"] == compute_daily_load(activities)
+
+    def test_empty_activities(self):
+        result = aggregate_activities([], 14)
+        assert result["quick_stats"] == calculate_stats([], 14)
+        assert result["week_comparison"] == compute_week_comparison([])
+        assert result["sport_totals"] == {}
+        assert result["daily_load"] == {}
+
+
+class TestColumnarBackend:
+    @pytest.fixture(autouse=True)
+    def require_numpy(self):
+        pytest.importorskip("numpy")
+
+    def test_matches_python_backend(self):
+        activities = _synthetic_activities(2000, seed=11)
+        now = datetime.now()
+        expected = aggregate_activities(activities, 28, now)
+        result = aggregate_activities_columnar(activities, 28, now)
+        assert result["quick_stats"] == expected["quick_stats"]
+        assert result["sport_totals"] == expected["sport_totals"]
+        assert list(result["sport_totals"]) == list(expected["sport_totals"])
+        assert list(result["zone_distribution"].items()) == list(
+            expected["zone_distribution"].items()
+        )
+        assert result["week_comparison"] == expected["week_comparison"]
+        assert result["weekly_tss"] == pytest.approx(expected["weekly_tss"])
+        assert list(result["weekly_tss"]) == list(expected["weekly_tss"])
+        assert result["daily_load"] == pytest.approx(expected["daily_load"])
+        assert list(result["daily_load"]) == list(expected["daily_load"])
+
+    def test_results_are_json_serialisable(self):
+        result = aggregate_activities_columnar(_synthetic_activities(50), 28)
+        json.dumps(result)
+
+    def test_wellness_columns(self):
+        columns = WellnessColumns(
+            [{"id": "2026-01-02", "ctl": 50, "weight": None}, {"id": "2026-01-01", "ctl": 48}]
+        )
+        assert str(columns.days[0]) == "2026-01-01"
+        assert columns.ctl.tolist() == [48.0, 50.0]
+        assert all(v != v for v in columns.weight)
+
+
+class TestPMC:
+    def _reference(self, loads, tau, seed=0.0):
+        import math
+
+        out, y = [], seed
+        for load in loads:
+            y = y + (load - y) * (1 - math.exp(-1 / tau))
+            out.append(y)
+        return out
+
+    def test_matches_reference_recurrence(self):
+        import random
+
+        rng = random.Random(3)
+        start = datetime(2023, 1, 1)
+        daily = {
+            (start + timedelta(days=i)).strftime("%Y-%m-%d"): rng.uniform(0, 200)
+            for i in range(1500)
+            if rng.random() < 0.7
+        }
+        end = (start + timedelta(days=1499)).strftime("%Y-%m-%d")
+        pmc = compute_pmc(daily, "2023-01-01", end, 42, 7, seed_ctl=30, seed_atl=20)
+        loads = [daily.get(d, 0.0) for d in pmc["dates"]]
+        assert len(pmc["dates"]) == 1500
+        assert pmc["ctl"] == pytest.approx(self._reference(loads, 42, 30), abs=1e-6)
+        assert pmc["atl"] == pytest.approx(self._reference(loads, 7, 20), abs=1e-6)
+        assert pmc["tsb"][-1] == pytest.approx(pmc["ctl"][-1] - pmc["atl"][-1])
+
+    def test_incremental_update_matches_full_history(self, tmp_path):
+        activities = [
+            {
+                "id": i,
+                "start_date_local": (datetime(2025, 1, 1) + timedelta(days=i)).strftime(
+                    "%Y-%m-%dT08:00:00"
+                ),
+                "icu_training_load": 50 + i % 40,
+            }
+            for i in range(200)
+        ]
+        store = LocalStore(tmp_path / "a.sqlite3")
+        store.upsert_activities("i1", activities[:120])
+        update_pmc(store, "i1", "2025-04-30")
+        store.upsert_activities("i1", activities[120:])
+        incremental = update_pmc(store, "i1", "2025-07-19")
+
+        fresh = LocalStore(tmp_path / "b.sqlite3")
+        fresh.upsert_activities("i1", activities)
+        full = update_pmc(fresh, "i1", "2025-07-19")
+        assert incremental["dates"] == full["dates"]
+        assert incremental["ctl"] == pytest.approx(full["ctl"])
+        assert store.get_state("i1", "pmc")["checkpoint"] == "2025-07-11"
+
+    def test_refetch_invalidates_stored_days(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        store.upsert_activities(
+            "i1",
+            [{"id": 1, "start_date_local": "2026-01-01T08:00:00", "icu_training_load": 100}],
+        )
+        update_pmc(store, "i1", "2026-02-01")
+        client = MagicMock(athlete_id="i1")
+        with patch(
+            "sync.fetch_activities",
+            return_value=[{"id": 1, "start_date_local": "2026-01-01T08:00:00", "icu_training_load": 10}],
+        ):
+            sync_activities(client, store, datetime(2025, 12, 30), datetime(2026, 2, 1))
+        fresh = LocalStore(tmp_path / "b.sqlite3")
+        fresh.upsert_activities(
+            "i1",
+            [{"id": 1, "start_date_local": "2026-01-01T08:00:00", "icu_training_load": 10}],
+        )
+        assert update_pmc(store, "i1", "2026-02-01")["ctl"] == pytest.approx(
+            update_pmc(fresh, "i1", "2026-02-01")["ctl"]
+        )
+
+    def test_summary_falls_back_to_pmc_without_wellness(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        store.upsert_activities(
+            "i1",
+            [{"id": 1, "start_date_local": "2026-01-05T08:00:00", "icu_training_load": 80}],
+        )
+        data = build_report_data(store, "i1", datetime(2026, 1, 1), datetime(2026, 1, 8))
+        summary = data["weekly_summary"]
+        assert summary["source"] == "pmc"
+        assert summary["ctl"] > 0 and summary["atl"] > summary["ctl"]
+        assert data["pmc"]["dates"][0] == "2026-01-05"
+        assert data["pmc"]["dates"][-1] == "2026-01-08"
+
+
+class TestJsonWriter:
+    DATA = {
+        "athlete_id": "i1",
+        "activities": [{"id": 1, "zones": [1, 2]}, {"id": 2, "name": "Łódź"}],
+        "wellness": [],
+        "quick_stats": {"total_tss": 80.5, "nested": {"a": []}},
+    }
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_stdlib_backend_matches_json_dumps(self, tmp_path, compact):
+        path = tmp_path / "latest.json"
+        write_json_stream(self.DATA, path, compact=compact, backend="json")
+        expected = (
+            json.dumps(self.DATA, separators=(",", ":")) if compact else json.dumps(self.DATA, indent=2)
+        )
+        assert path.read_text() == expected
+
+    def test_streams_iterators(self, tmp_path):
+        path = tmp_path / "latest.json"
+        rows = ({"id": i} for i in range(3))
+        write_json_stream(iter([("rows", rows), ("n", 3)]), path, backend="json")
+        assert json.loads(path.read_text()) == {"rows": [{"id": 0}, {"id": 1}, {"id": 2}], "n": 3}
+
+    def test_orjson_backend_round_trips(self, tmp_path):
+        pytest.importorskip("orjson")
+        path = tmp_path / "latest.json"
+        write_json_stream(self.DATA, path, compact=True, backend="orjson")
+        assert json.loads(path.read_bytes()) == self.DATA
+
+
+class TestWriteReports:
+    def _data(self, tss=80):
+        return {
+            "athlete_id": "i1",
+            "last_updated": datetime.now().isoformat(),
+            "date_range": {"start": "2026-01-01", "end": "2026-01-08"},
+            "wellness": [],
+            "weekly_summary": {"ctl": 50, "atl": 40, "tsb": 10, "ramp_rate": 1},
+            "activities": [],
+            "quick_stats": calculate_stats([{"icu_training_load": tss}], 7),
+            "profile": {},
+        }
+
+    def test_unchanged_reports_are_not_rewritten(self, tmp_path):
+        json_path = tmp_path / "latest.json"
+        paths = write_reports(self._data(), json_path)
+        assert "last_updated" not in json.loads(json_path.read_text())
+
+        for path in paths.values():
+            os.utime(path, ns=(0, 0))
+        write_reports(self._data(), json_path)
+        assert all(os.stat(p).st_mtime_ns == 0 for p in paths.values())
+        stamp = json.loads((tmp_path / "latest.stamp.json").read_text())
+        assert set(stamp["files"]) == {"latest.json", "latest.md", "latest.csv", "latest.html"}
+
+    def test_changed_reports_are_replaced(self, tmp_path):
+        json_path = tmp_path / "latest.json"
+        write_reports(self._data(), json_path)
+        os.utime(json_path, ns=(0, 0))
+        write_reports(self._data(tss=120), json_path)
+        assert os.stat(json_path).st_mtime_ns != 0
+        assert json.loads(json_path.read_text())["quick_stats"]["total_tss"] == 120
+        assert not list(tmp_path.glob(".*.tmp"))
+
+    def test_only_requested_formats_are_rendered(self, tmp_path, monkeypatch):
+        html = MagicMock()
+        monkeypatch.setattr("sync.generate_html_report", html)
+        paths = write_reports(self._data(), tmp_path / "latest.json", {"formats": ("json", "markdown")})
+        assert set(paths) == {"JSON", "Markdown"}
+        assert not (tmp_path / "latest.html").exists()
+        html.assert_not_called()
+
+        write_reports(self._data(), tmp_path / "latest.json", formats="csv")
+        stamp = json.loads((tmp_path / "latest.stamp.json").read_text())
+        assert set(stamp["files"]) == {"latest.json", "latest.md", "latest.csv"}
+
+    def test_parse_formats(self):
+        assert parse_formats("") == ("json", "markdown", "csv", "html")
+        assert parse_formats("html, md") == ("markdown", "html")
+        assert parse_args(["--formats", "json"]).formats == ("json",)
+        batch = parse_args(["batch", "roster.json", "--formats", "json", "--profile"])
+        assert batch.formats == ("json",)
+        assert batch.profile == Path("sync.prof")
+        assert parse_args(["--formats", "csv", "daemon"]).formats == ("csv",)
+        daemon = parse_args(["daemon", "--metrics-textfile", "m.prom"])
+        assert daemon.metrics_textfile == Path("m.prom")
+        assert daemon.formats is None
+        with pytest.raises(ValueError, match="pdf"):
+            parse_formats("json,pdf")
+
+    def test_html_shell_mode(self, tmp_path):
+        json_path = tmp_path / "latest.json"
+        config = {"formats": ("html",), "html_mode": "shell"}
+        paths = write_reports(self._data(), json_path, config)
+        assert set(paths) == {"HTML", "HTML data"}
+        shell = (tmp_path / "latest.html").read_text()
+        assert "report-data.json" in shell and "Training Report" in shell
+        payload = json.loads((tmp_path / "report-data.json").read_text())
+        content = {k: v for k, v in self._data().items() if k != "last_updated"}
+        assert payload == json.loads(json.dumps(html_report_payload(content)))
+
+        os.utime(tmp_path / "latest.html", ns=(0, 0))
+        write_reports(self._data(tss=120), json_path, config)
+        assert os.stat(tmp_path / "latest.html").st_mtime_ns == 0
+        assert json.loads((tmp_path / "report-data.json").read_text())["stats"]["tss"] == "120.0"
+
+    def test_vendored_chart_js(self, tmp_path):
+        local = tmp_path / "chart.js"
+        local.write_text("/* chart */")
+        out = tmp_path / "out"
+        out.mkdir()
+        config = {"formats": ("html",), "html_mode": "shell", "chart_js": str(local)}
+        write_reports(self._data(), out / "latest.json", config)
+        assert (out / "chart.umd.min.js").read_text() == "/* chart */"
+        assert 'src="chart.umd.min.js"' in (out / "latest.html").read_text()
+
+    def test_inline_html_escapes_payload_cells(self):
+        data = self._data()
+        data["activities"] = [{"name": "<script>", "start_date_local": "2026-01-02T08:00:00"}]
+        assert "&lt;script&gt;" in generate_html_report(data)
+
+
+class TestDownsampling:
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        ys = [0.0] * 1000
+        ys[437] = 100.0
+        keep = lttb_indices(list(range(1000)), ys, 50)
+        assert len(keep) == 50
+        assert keep[0] == 0 and keep[-1] == 999 and 437 in keep
+        assert keep == sorted(keep)
+
+    def test_minmax_keeps_bucket_extremes(self):
+        ys = [float(i % 7) for i in range(700)]
+        ys[350] = 99.0
+        keep = minmax_indices(ys, 100)
+        assert len(keep) <= 100
+        assert 350 in keep
+
+    def test_payload_is_downsampled_but_json_is_not(self, tmp_path):
+        start = datetime(2020, 1, 1)
+        days = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(2000)]
+        data = TestWriteReports()._data()
+        data["pmc"] = {"dates": days, "ctl": [i % 50 for i in range(2000)], "atl": [1.0] * 2000, "tsb": [0.0] * 2000}
+        data["daily_load"] = {d: float(i % 30) for i, d in enumerate(days)}
+        payload = html_report_payload(data, max_points=300)
+        assert len(payload["charts"]["fitness"]["labels"]) <= 300
+        assert len(payload["charts"]["daily_load"]["data"]) <= 300
+        assert max(payload["charts"]["daily_load"]["data"]) == 29.0
+        assert len(html_report_payload(data, max_points=0)["charts"]["fitness"]["labels"]) == 2000
+
+        write_reports(data, tmp_path / "latest.json", {"chart_points": 300})
+        assert len(json.loads((tmp_path / "latest.json").read_text())["pmc"]["dates"]) == 2000
+
+
+class TestColumnarExport:
+    def _data(self):
+        data = TestWriteReports()._data()
+        data["activities"] = [
+            {"id": 7, "start_date_local": "2026-01-05T08:00:00", "type": "Ride", "name": "Z2", "icu_training_load": 80},
+            {"id": 8, "start_date_local": "bad", "moving_time": "n/a"},
+        ]
+        data["wellness"] = [{"id": "2026-01-05", "ctl": 50, "weight": 70.5}]
+        data["daily_load"] = {"2026-01-05": 80}
+        data["pmc"] = {"dates": ["2026-01-05", "2026-01-06"], "ctl": [2.0, 1.9], "atl": [11.0, 9.5], "tsb": [-9.0, -7.6]}
+        data["weekly_tss"] = {"2026-W01": 80}
+        return data
+
+    def test_export_tables_are_typed(self):
+        tables = export_tables(self._data())
+        assert tables["activities"]["start_date_local"] == ("datetime", [datetime(2026, 1, 5, 8), None])
+        assert tables["activities"]["moving_time"][1] == [None, None]
+        assert tables["daily"]["load"][1] == [80.0, None]
+        assert tables["daily"]["tsb"][1] == [-9.0, -7.6]
+
+    def test_npz_export(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        config = {"formats": ("json", "columnar"), "export_format": "npz"}
+        paths = write_reports(self._data(), tmp_path / "latest.json", config)
+        assert paths["Columnar activities"] == tmp_path / "activities.npz"
+        with np.load(tmp_path / "activities.npz") as activities:
+            assert activities["id"].tolist() == ["7", "8"]
+            assert activities["icu_training_load"][0] == 80.0
+            assert str(activities["start_date_local"][0]) == "2026-01-05T08:00:00"
+        with np.load(tmp_path / "daily.npz") as daily:
+            assert str(daily["date"].dtype) == "datetime64[D]"
+
+        before = (tmp_path / "activities.npz").read_bytes()
+        os.utime(tmp_path / "activities.npz", ns=(0, 0))
+        write_reports(self._data(), tmp_path / "latest.json", config)
+        assert os.stat(tmp_path / "activities.npz").st_mtime_ns == 0
+        assert (tmp_path / "activities.npz").read_bytes() == before
+
+    def test_parquet_export(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        config = {"formats": ("columnar",), "export_format": "parquet"}
+        write_reports(self._data(), tmp_path / "latest.json", config)
+        table = pq.read_table(tmp_path / "activities.parquet", columns=["id", "icu_training_load"])
+        assert table.column("id").to_pylist() == ["7", "8"]
+
+
+class TestDelta:
+    def test_delta_between_builds(self, tmp_path):
+        store = LocalStore(tmp_path / "store.sqlite3")
+        start, end = datetime(2026, 1, 1), datetime(2026, 1, 8)
+        store.upsert_activities(
+            "i1",
+            [
+                {"id": 1, "start_date_local": "2026-01-02T08:00:00", "icu_training_load": 50},
+                {"id": 2, "start_date_local": "2026-01-03T08:00:00", "icu_training_load": 60},
+            ],
+        )
+        store.upsert_wellness("i1", [{"id": "2026-01-02", "ctl": 40, "atl": 30}])
+        json_path = tmp_path / "latest.json"
+        config = {"output_path": json_path}
+        first = build_report_data(store, "i1", start, end, config)
+        assert first["delta"]["initial"] and len(first["delta"]["activities"]["added"]) == 2
+        unsaved = build_report_data(store, "i1", start, end, config)["delta"]
+        assert unsaved["initial"]
+        save_report_snapshot(json_path, first)
+
+        unchanged = build_report_data(store, "i1", start, end, config)
+        assert not unchanged["delta"]["changed"]
+        assert unchanged["delta"]["since"] == first["delta"]["until"]
+        save_report_snapshot(json_path, unchanged)
+
+        store.replace_activities(
+            "i1",
+            "2026-01-03",
+            "2026-01-08",
+            [
+                {"id": 3, "start_date_local": "2026-01-07T08:00:00", "icu_training_load": 40},
+            ],
+        )
+        store.upsert_wellness("i1", [{"id": "2026-01-02", "ctl": 41, "atl": 30}])
+        delta = build_report_data(store, "i1", start, end, config)["delta"]
+        assert [a["id"] for a in delta["activities"]["added"]] == [3]
+        assert delta["activities"]["removed"] == ["2"]
+        assert delta["wellness"]["updated"][0]["ctl"] == 41
+        assert delta["summary"]["quick_stats.total_tss"] == {"previous": 110, "current": 90}
+
+    def test_snapshot_saved_next_to_reports_after_they_are_written(self, tmp_path):
+        store_path = tmp_path / "store.sqlite3"
+        json_path = tmp_path / "out" / "latest.json"
+        config = {
+            "athlete_id": "i1",
+            "days": 7,
+            "offline": True,
+            "store_path": store_path,
+            "output_path": json_path,
+            "formats": ("json",),
+        }
+        try:
+            failing = Renderer("JSON", None, MagicMock(side_effect=OSError("disk full")))
+            with patch.dict("sync.RENDERERS", {"json": failing}):
+                with pytest.raises(OSError):
+                    sync_athlete(config)
+            assert load_report_snapshot(json_path) is None
+            first = sync_athlete(config)
+            assert load_report_snapshot(json_path)["taken_at"] == first["last_updated"]
+            second = sync_athlete(config)
+            assert second["delta"]["since"] == first["last_updated"]
+            assert get_store(store_path).get_state("i1", "report_snapshot") is None
+        finally:
+            close_stores()
+
+    def test_written_next_to_reports_but_not_inside(self, tmp_path):
+        data = TestWriteReports()._data()
+        data["delta"] = {"changed": False}
+        write_reports(data, tmp_path / "latest.json", {"formats": ("json",)})
+        assert json.loads((tmp_path / "latest.delta.json").read_text()) == {"changed": False}
+        assert "delta" not in json.loads((tmp_path / "latest.json").read_text())
+
+
+class TestStreams:
+    def test_streams_are_fetched_once_and_memory_mapped(self, tmp_path, monkeypatch):
+        np = pytest.importorskip("numpy")
+        store = LocalStore(tmp_path / "store.sqlite3")
+        streams = StreamStore(tmp_path / "streams", store)
+        client = IntervalsClient("i1", "k")
+
+        def respond(path, params=None, headers=None, athlete_scoped=True):
+            assert not athlete_scoped and path.endswith("/streams")
+            response = MagicMock(status_code=200, headers={})
+            response.json.return_value = [
+                {"type": "watts", "data": [200, None, 210]},
+                {"type": "heartrate", "data": [120, 121]},
+            ]
+            return response
+
+        request = MagicMock(side_effect=respond)
+        monkeypatch.setattr(client, "request", request)
+        activities = [{"id": "i7", "icu_training_load": 50}, {"id": "i8"}]
+        assert sync_streams(client, streams, activities) == 2
+        assert sync_streams(client, streams, activities) == 0
+
+        channels = streams.load("i1", "i7")
+        assert isinstance(channels["watts"], np.memmap)
+        assert channels["watts"][0] == 200 and np.isnan(channels["watts"][1])
+        assert np.isnan(channels["heartrate"][2]) and np.isnan(channels["cadence"]).all()
+        assert [row["samples"] for row in store.stream_index("i1")] == [3, 3]
+
+        activities[0]["icu_training_load"] = 55
+        assert sync_streams(client, streams, activities) == 1
+        assert request.call_count == 3
+
+
+class TestPowerCurve:
+    def test_mean_max_matches_brute_force(self):
+        import random
+
+        rng = random.Random(5)
+        watts = [rng.uniform(0, 400) for _ in range(700)]
+        durations = (1, 5, 60, 600, 700, 701)
+        curve = mean_max_curve(watts, durations)
+        for d, value in zip(durations[:-1], curve):
+            best = max(sum(watts[i : i + d]) / d for i in range(len(watts) - d + 1))
+            assert value == pytest.approx(best, abs=0.01)
+        assert curve[-1] is None
+
+    def test_curves_are_cached_and_reported(self, tmp_path):
+        np = pytest.importorskip("numpy")
+        store = LocalStore(tmp_path / "store.sqlite3")
+        streams = StreamStore(tmp_path / "streams", store)
+        store.upsert_activities(
+            "i1",
+            [
+                {"id": "a1", "start_date_local": "2026-01-05T08:00:00"},
+                {"id": "a2", "start_date_local": "2025-06-01T08:00:00"},
+            ],
+        )
+        ride = np.full((4, 1800), np.nan, dtype=np.float32)
+        ride[0] = 250.0
+        old = np.full((4, 1800), np.nan, dtype=np.float32)
+        old[0] = 300.0
+        streams.save("i1", "a1", "d1", ride)
+        streams.save("i1", "a2", "d2", old)
+
+        data = build_report_data(
+            store, "i1", datetime(2026, 1, 1), datetime(2026, 1, 8), {"streams_path": tmp_path / "streams"}
+        )
+        curve = data["power_curve"]
+        twenty = curve["durations"].index(1200)
+        assert curve["windows"]["28d"]["watts"][twenty] == 250.0
+        assert curve["windows"]["365d"]["watts"][twenty] == 300.0
+        assert curve["ftp_estimate"] == round(250 * 0.95)
+        assert update_curves(streams, "i1") == 0
+        assert "Power Curve" in generate_html_report(data)
+
+
+class TestBenchmark:
+    def test_generators_are_seeded(self):
+        import benchmark
+
+        now = datetime(2026, 1, 31)
+        assert benchmark.synthetic_activities(5, 7, now=now) == benchmark.synthetic_activities(
+            5, 7, now=now
+        )
+        assert benchmark.synthetic_activities(5, 7, now=now) != benchmark.synthetic_activities(
+            5, 8, now=now
+        )
+        assert len(benchmark.synthetic_wellness(30, now=now)) == 30
+
+    def test_suite_reports_every_case(self, tmp_path, monkeypatch):
+        import benchmark
+
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path / "cache")
+        results = benchmark.run_suite(sizes=(20,), repeat=1)
+        names = {r["name"] for r in results["results"]}
+        assert {"compute_pmc", "generate_html_report", "fetch_intervals_data"} <= names
+        assert all(r["rows"] == 20 and r["median_s"] >= 0 for r in results["results"])
+        assert results["meta"]["seed"] == benchmark.DEFAULT_SEED
+        assert benchmark.compare(results, results)
+
+
+class TestSyncMetrics:
+    def test_records_phases_calls_and_counters(self):
+        metrics = SyncMetrics()
+        with metrics.phase("fetch") as record:
+            record["bytes"] += 10
+        with metrics.phase("fetch"):
+            pass
+        metrics.http_call("/activity/i123/streams", 200, 0.5, 100)
+        metrics.http_call("/wellness", None, 0.1, 0)
+        metrics.count("cache_hit_total")
+        summary = metrics.to_dict()
+        assert summary["phases"]["fetch"]["count"] == 2
+        assert summary["phases"]["fetch"]["bytes"] == 10
+        assert summary["http"]["endpoints"]["/activity/{id}/streams"]["bytes"] == 100
+        assert summary["http"]["endpoints"]["/wellness"]["errors"] == 1
+        assert summary["counters"] == {"cache_hit_total": 1}
+        text = metrics.prometheus({"athlete": 'a"b'})
+        assert 'intervals_sync_phase_wall_seconds{athlete="a\\"b",phase="fetch"}' in text
+        assert 'intervals_sync_cache_hit_total{athlete="a\\"b"} 1' in text
+
+    def test_concurrent_athletes_report_cpu_for_the_run_only(self):
+        metrics = SyncMetrics()
+        metrics.concurrent_athletes = True
+        with metrics.phase("fetch"):
+            pass
+        summary = metrics.to_dict()
+        assert "cpu_s" not in summary["phases"]["fetch"]
+        assert summary["cpu_s"] >= 0
+        assert "phase_cpu_seconds" not in metrics.prometheus()
+
+    def test_profiler_sees_worker_threads(self, tmp_path):
+        import pstats
+
+        def busy(n):
+            return sum(range(n))
+
+        profiler = RunProfiler()
+        profiler.start()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(busy, [1000] * 8))
+        profiler.stop(tmp_path / "run.prof")
+        stats = pstats.Stats(str(tmp_path / "run.prof")).stats
+        assert any(name == "busy" for _, _, name in stats)
+
+    def test_main_writes_metrics_textfile_and_profile(self, stub_api, tmp_path, monkeypatch):
+        import pstats
+
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path / "cache")
+        monkeypatch.setenv("ATHLETE_ID", "i1")
+        monkeypatch.setenv("INTERVALS_KEY", "k")
+        monkeypatch.setenv("SYNC_DAYS", "7")
+        monkeypatch.setenv(
+            "INTERVALS_API_URL", f"http://127.0.0.1:{stub_api.server_address[1]}/api/v1"
+        )
+        monkeypatch.setenv("OUTPUT_PATH", str(tmp_path / "out" / "latest.json"))
+        monkeypatch.setenv("STORE_PATH", str(tmp_path / "store.sqlite3"))
+        try:
+            main(
+                [
+                    "--profile",
+                    str(tmp_path / "sync.prof"),
+                    "--metrics-textfile",
+                    str(tmp_path / "sync.prom"),
+                ]
+            )
+        finally:
+            close_clients()
+
+        metrics = json.loads((tmp_path / "out" / "sync_metrics.json").read_text())
+        assert {"fetch", "aggregate", "write"} <= set(metrics["phases"])
+        assert metrics["renderers"]["HTML"]["bytes"] > 0
+        assert metrics["renderers"]["HTML"]["written"] is True
+        assert metrics["http"]["endpoints"]["/activities"]["requests"] == 1
+        assert metrics["counters"]["cache_miss_total"] == 3
+        assert "intervals_sync_http_requests_total" in (tmp_path / "sync.prom").read_text()
+        profile = pstats.Stats(str(tmp_path / "sync.prof"))
+        # Work done on the fetch and render worker threads is included
+        assert any(func[2] == "sync_activities" for func in profile.stats)
+        assert any(func[2] == "render_html" for func in profile.stats)
+
+
+class TestDaemon:
+    def test_rerenders_only_on_change_and_obeys_socket(self, stub_api, tmp_path, monkeypatch):
+        import time
+
+        monkeypatch.setattr("sync.CACHE_DIR", tmp_path / "cache")
+        config = {
+            "athlete_id": "i1",
+            "api_key": "k",
+            "verify_ssl": True,
+            "days": 7,
+            "api_url": f"http://127.0.0.1:{stub_api.server_address[1]}/api/v1",
+            "store_path": tmp_path / "store.sqlite3",
+            "output_path": tmp_path / "out" / "latest.json",
+            "formats": ("json", "html"),
+        }
+        socket_path = tmp_path / "d.sock"
+        daemon = SyncDaemon(config, interval=3600, jitter=0, socket_path=socket_path)
+        thread = threading.Thread(target=daemon.run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 10
+            while daemon.status["cycles"] < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            html = tmp_path / "out" / "latest.html"
+            first_write = html.stat().st_mtime_ns
+            first_changed = daemon.status["last_changed"]
+
+            reply = send_daemon_command(socket_path, "sync", timeout=10)
+            assert reply["finished"] and reply["cycles"] == 2
+            assert reply["last_changed"] == first_changed
+            assert html.stat().st_mtime_ns == first_write
+            stamp = json.loads((tmp_path / "out" / "latest.stamp.json").read_text())
+            assert stamp["last_updated"] == daemon.data["last_updated"]
+
+            assert send_daemon_command(socket_path, "stop", timeout=10)["state"] == "stopping"
+            thread.join(10)
+        finally:
+            daemon.stop()
+            thread.join(10)
+        assert not thread.is_alive()
+        assert not socket_path.exists()
+        assert daemon.status["state"] == "stopped"
+
+    @pytest.mark.skipif(not hasattr(__import__("signal"), "SIGUSR1"), reason="POSIX signals")
+    def test_signals_trigger_and_stop_without_locking(self):
+        import signal
+        import time
+
+        daemon = SyncDaemon({"athlete_id": "i1"}, interval=3600, jitter=0)
+        cycles = []
+        daemon.sync_once = lambda: cycles.append(1) or False
+
+        def send_signals():
+            time.sleep(0.2)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            deadline = time.monotonic() + 5
+            while len(cycles) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        previous = signal.getsignal(signal.SIGTERM)
+        threading.Thread(target=send_signals).start()
+        daemon.run()
+        assert len(cycles) == 2
+        assert signal.getsignal(signal.SIGTERM) is previous
+
+    @pytest.mark.parametrize(
+        "reply, code",
+        [
+            ({"finished": True, "last_error": None}, None),
+            ({"finished": True, "last_error": "boom"}, 1),
+            ({"finished": False, "last_error": None}, 1),
+        ],
+    )
+    def test_send_sync_exit_code_reflects_the_cycle(self, reply, code, tmp_path, monkeypatch):
+        monkeypatch.setattr("sync.send_daemon_command", lambda *args: reply)
+        if code is None:
+            main(["daemon", "--send", "sync", "--socket", str(tmp_path / "d.sock")])
+            return
+        with pytest.raises(SystemExit) as exc:
+            main(["daemon", "--send", "sync", "--socket", str(tmp_path / "d.sock")])
+        assert exc.value.code == code
+
+    def test_send_to_stale_socket_fails(self, tmp_path):
+        stale = tmp_path / "d.sock"
+        stale.touch()
+        with pytest.raises(SystemExit) as exc:
+            main(["daemon", "--send", "status", "--socket", str(stale)])
+        assert exc.value.code == 1
+
+
+class TestReportServer:
+    @pytest.fixture
+    def server(self):
+        reports = ReportCache()
+        server = ReportServer(("127.0.0.1", 0), reports)
+        server.start()
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+        server.shutdown()
+        server.server_close()
+
+    def _data(self, tmp_path, tss=60):
+        store = LocalStore(tmp_path / f"store{tss}.sqlite3")
+        store.upsert_activities(
+            "i1",
+            [
+                {"id": "r1", "start_date_local": "2026-01-03T08:00:00", "type": "VirtualRide", "moving_time": 3600, "icu_training_load": tss},
+                {"id": "u1", "start_date_local": "2026-01-06T08:00:00", "type": "Run", "moving_time": 1800, "icu_training_load": 30},
+            ],
+        )
+        data = build_report_data(store, "i1", datetime(2026, 1, 1), datetime(2026, 1, 8))
+        store.close()
+        return data
+
+    def test_serves_reports_with_etag_and_gzip(self, server, tmp_path):
+        server, url = server
+        assert requests.get(f"{url}/data.json").status_code == 503
+        assert server.reports.publish(self._data(tmp_path))
+        assert not server.reports.publish(self._data(tmp_path))
+
+        html = requests.get(f"{url}/report.html", headers={"Accept-Encoding": "gzip"})
+        assert html.status_code == 200
+        assert html.headers["Content-Encoding"] == "gzip"
+        assert "<html" in html.text
+        again = requests.get(f"{url}/report.html", headers={"If-None-Match": html.headers["ETag"]})
+        assert again.status_code == 304
+
+        data = requests.get(f"{url}/data.json").json()
+        assert data["quick_stats"]["total_tss"] == 90
+        assert "last_updated" not in data
+
+        server.reports.publish(self._data(tmp_path, tss=100))
+        changed = requests.get(f"{url}/report.html", headers={"If-None-Match": html.headers["ETag"]})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != html.headers["ETag"]
+
+    def test_api_slices(self, server, tmp_path):
+        server, url = server
+        server.reports.publish(self._data(tmp_path))
+        rides = requests.get(
+            f"{url}/api/activities", params={"start": "2026-01-02", "sport": "ride", "fields": "id,type"}
+        )
+        assert rides.json() == {
+            "start": "2026-01-02",
+            "end": "2026-01-08",
+            "count": 1,
+            "activities": [{"id": "r1", "type": "VirtualRide"}],
+        }
+        assert requests.get(rides.url, headers={"If-None-Match": rides.headers["ETag"]}).status_code == 304
+        other = requests.get(f"{url}/api/activities", params={"start": "2026-01-05"})
+        assert other.headers["ETag"] != rides.headers["ETag"]
+        assert [a["id"] for a in other.json()["activities"]] == ["u1"]
+
+        totals = requests.get(f"{url}/api/sport-totals", params={"end": "2026-01-04"}).json()
+        assert set(totals["sport_totals"]) == {"Ride"}
+        assert requests.get(f"{url}/api/summary").json()["quick_stats"]["total_tss"] == 90
+        assert requests.get(f"{url}/api/activities", params={"start": "soon"}).status_code == 400
+        assert requests.get(f"{url}/nope").status_code == 404